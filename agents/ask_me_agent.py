@@ -1,12 +1,11 @@
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from tasks.ask_me_task import ask_question_task
 from tools.ask_me_tool import AskMeTool
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+from llms.client_pool import get_llm
 from typing import Any, Dict
 
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="ask_me_agent_session",
     file_path="memory/ask_me_agent_memory.json"
 )
@@ -78,11 +77,7 @@ ask_me_agent = AskMeAgent(
         "voice_narration": True,
         "integration_ready": ["BhāṣāGuru", "CoursePlannerAgent"]
     },
-    llm=ChatGoogleGenerativeAI(
-        model="models/gemini-2.5-pro",
-        google_api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=0.3
-    ),
+    llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
     respect_context_window=True,
     code_execution_config={
         "enabled": True,
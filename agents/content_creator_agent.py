@@ -1,14 +1,13 @@
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from tasks.content_creation_tasks import generate_content_task
 from tools.content_creation_tool import ContentCreationTool
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+from llms.client_pool import get_llm
 from typing import Any, Dict
 
 
 # Initialize memory handler
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="content_creator_agent_session",
     file_path="memory/content_creator_agent_memory.json"
 )
@@ -61,11 +60,7 @@ class ContentCreatorAgent(Agent):
                 "subject_areas": "All subjects",
                 "language_support": "Regional dialects supported"
             },
-            llm=ChatGoogleGenerativeAI(
-                model="models/gemini-2.5-pro",
-                google_api_key=os.getenv("GEMINI_API_KEY"),
-                temperature=0.3
-            ),
+            llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
             respect_context_window=True,
             code_execution_config={
                 "enabled": True,
@@ -1,8 +1,8 @@
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from typing import Dict, Any
 
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="course_planner_agent_session",
     file_path="memory/course_planner_agent_memory.json"
 )
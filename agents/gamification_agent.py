@@ -1,12 +1,11 @@
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from tasks.gamification_tasks import generate_gamification_task
 from tools.gamification_tool import GamificationTool
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+from llms.client_pool import get_llm
 from typing import Any, Dict
 
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="gamification_agent_session",
     file_path="memory/gamification_agent_memory.json"
 )
@@ -108,11 +107,7 @@ gamification_agent = GamificationAgentWrapper(
         "author": "EduTech Team",
         "license": "MIT"
     },
-    llm=ChatGoogleGenerativeAI(
-        model="models/gemini-2.5-pro",
-        google_api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=0.3
-    ),
+    llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
     respect_context_window=True,
     code_execution_config={
         "enabled": True,
@@ -1,32 +1,23 @@
 import logging
-import os
 import asyncio
 import types
 from crewflows import Agent
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 from tools.lesson_generation_tool import LessonGenerationTool
 from tasks.lesson_planner_tasks import generate_lesson_task
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-
-# Load API key from env
-google_api_key = os.getenv("GOOGLE_API_KEY")
+from crewflows.memory.log_memory_handler import LogMemoryHandler
+from llms.client_pool import get_llm
 
 
 # Memory handler
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="teacher_lesson_session",
     file_path="memory/lesson_planner_memory.json"
 )
 
 
 # LLM config
-llm = ChatGoogleGenerativeAI(
-    model="models/gemini-2.5-pro",
-    google_api_key=google_api_key,
-    temperature=0.3
-)
+llm = get_llm(model="models/gemini-2.5-pro", temperature=0.3)
 
 
 # Tool for lesson generation
@@ -59,7 +50,7 @@ class LessonPlannerAgent(Agent):
         }
 
         try:
-            result = await asyncio.to_thread(lesson_tool.run, context)
+            result = await lesson_tool.arun(context)
             self._logger.info(f"LessonTool result: {result}")
 
             if not result:
@@ -74,6 +65,10 @@ class LessonPlannerAgent(Agent):
             self._logger.error(f"LessonPlannerAgent process() failed: {e}", exc_info=True)
             return {"error": f"LessonPlannerAgent process() failed: {str(e)}"}
 
+    def stream(self, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Lesson sections as they are generated (see LessonGenerationTool.astream)."""
+        return lesson_tool.astream(inputs)
+
 
 # Instantiate agent
 lesson_planner_agent = LessonPlannerAgent(
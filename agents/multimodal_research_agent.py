@@ -1,14 +1,13 @@
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from tools.multimodal_research_tool import MultimodalResearchTool
 from tasks.multimodal_research_task import MultimodalResearchTask
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+from llms.client_pool import get_llm
 from typing import Any, Dict
 
 
 # Initialize memory handler
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="multimodal_research_session",
     file_path="memory/multimodal_research_memory.json"
 )
@@ -57,11 +56,7 @@ class MultimodalResearchAgent(Agent):
                 "resource_types": "papers, videos, websites",
                 "grade_levels": "1-10, 11-12, UG"
             },
-            llm=ChatGoogleGenerativeAI(
-                model="models/gemini-2.5-pro",
-                google_api_key=os.getenv("GEMINI_API_KEY"),
-                temperature=0.3
-            ),
+            llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
             respect_context_window=True,
             code_execution_config={"enabled": True, "executor_type": "kirchhoff-async"},
             **kwargs
@@ -1,14 +1,13 @@
-import os
 from typing import Any, Dict
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from tools.predictive_analytics_tool import PredictiveAnalyticsTool
 from tasks.predictive_analytics_task import PredictiveAnalyticsTask
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llms.client_pool import get_llm
 
 
 # Initialize memory handler
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="predictive_analytics_session",
     file_path="memory/predictive_analytics_memory.json"
 )
@@ -61,11 +60,7 @@ class PredictiveAnalyticsAgent(Agent):
                 "data_sources": "quiz results, assignments",
                 "analysis_level": "class, individual"
             },
-            llm=ChatGoogleGenerativeAI(
-                model="models/gemini-2.5-pro",
-                google_api_key=os.getenv("GEMINI_API_KEY"),
-                temperature=0.3
-            ),
+            llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
             respect_context_window=True,
             code_execution_config={"enabled": True, "executor_type": "kirchhoff-async"},
             **kwargs
@@ -1,14 +1,13 @@
-import os
-import json
 import types
 import logging
 from typing import Any, Dict, Optional
 
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
-from langchain_google_genai import ChatGoogleGenerativeAI
+from crewflows.memory.log_memory_handler import LogMemoryHandler
+from llms.client_pool import get_llm
 
 from tools.quiz_generation_tool import QuizGenerationTool
+from tools.utils.json_extract import JSONExtractionError, extract_json
 from tasks.quiz_tasks import QuizTask
 
 # ✅ Setup logging
@@ -16,7 +15,7 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 # ✅ Initialize memory handler
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="quiz_agent_session",
     file_path="memory/quiz_agent_memory.json"
 )
@@ -114,7 +113,7 @@ def get_quiz_fallback() -> Dict[str, Any]:
 def validate_quiz_output(model_output: Any) -> Dict[str, Any]:
     """Ensure the quiz output is valid and contains required keys."""
     try:
-        data = json.loads(model_output) if isinstance(model_output, str) else model_output
+        data = extract_json(model_output) if isinstance(model_output, str) else model_output
         if not isinstance(data, dict):
             logger.warning("Model output is not a dict. Using fallback.")
             return get_quiz_fallback()
@@ -125,7 +124,7 @@ def validate_quiz_output(model_output: Any) -> Dict[str, Any]:
             return get_quiz_fallback()
 
         return data
-    except json.JSONDecodeError:
+    except JSONExtractionError:
         logger.error("Invalid JSON. Using fallback.")
         return get_quiz_fallback()
 
@@ -142,11 +141,7 @@ quiz_agent = QuizAgent(
     verbose=True,
     tools=[quiz_tool],
     tasks=[],
-    llm=ChatGoogleGenerativeAI(
-        model="models/gemini-2.5-pro",
-        google_api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=0.3
-    ),
+    llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
     respect_context_window=True,
     code_execution_config={"enabled": True, "executor_type": "kirchhoff-async"},
     user_type="teacher",
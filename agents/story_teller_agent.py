@@ -1,7 +1,8 @@
 import json
 import logging
-from typing import Dict
+from typing import AsyncIterator, Dict
 from crewflows import Agent
+from tools.story_generation_tool import StoryGenerationTool
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,7 @@ class StoryTellerAgent(Agent):
             **kwargs
         )
         self._name = "story_teller_agent"
+        self.story_tool = StoryGenerationTool()
     
     @property
     def name(self) -> str:
@@ -75,6 +77,10 @@ class StoryTellerAgent(Agent):
                 "audio_narration": ""
             }
 
+    def stream(self, inputs: Dict) -> AsyncIterator[Dict]:
+        """Story sections from Gemini as they are generated (see StoryGenerationTool.astream)."""
+        return self.story_tool.astream(inputs)
+
 
 # Instantiate the single StoryTellerAgent for use
 story_teller_agent = StoryTellerAgent()
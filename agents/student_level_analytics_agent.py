@@ -1,8 +1,8 @@
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from tools.student_level_analytics_tool import student_level_analytics_tool
 from tasks.student_level_analytics_task import StudentLevelAnalyticsTask
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llms.client_pool import get_llm
 from dotenv import load_dotenv
 import os
 from typing import Any, Dict, Optional
@@ -16,7 +16,7 @@ if not GOOGLE_API_KEY:
 
 
 # Initialize memory handler
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="student_analytics_session",
     file_path="memory/student_analytics_memory.json"
 )
@@ -94,11 +94,7 @@ student_level_analytics_agent = StudentLevelAnalyticsAgent(
         "analysis_type": "student",
         "output_format": "JSON"
     },
-    llm=ChatGoogleGenerativeAI(
-        model="models/gemini-2.5-pro",
-        google_api_key=GOOGLE_API_KEY,
-        temperature=0.3
-    ),
+    llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
     respect_context_window=True,
     code_execution_config={"enabled": True, "executor_type": "kirchhoff-async"},
 )
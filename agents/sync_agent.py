@@ -1,8 +1,9 @@
 from crewflows import Agent
 from tools.sync_tool import SyncTool
+from tools.utils.local_store import LocalStore
 from tasks.sync_tasks import SyncTask
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
-from langchain_google_genai import ChatGoogleGenerativeAI
+from crewflows.memory.log_memory_handler import LogMemoryHandler
+from llms.client_pool import get_llm
 from typing import Any, Dict
 from dotenv import load_dotenv
 import firebase_admin
@@ -23,20 +24,12 @@ if not firebase_admin._apps:
 
 firestore_client = firestore.client()
 
-# Minimal IndexedDB client stub: replace with actual implementation if available
-class IndexedDBMock:
-    def put(self, *args, **kwargs):
-        pass
-    def get(self, *args, **kwargs):
-        return {}
-    def delete(self, *args, **kwargs):
-        pass
-    # Add other necessary methods expected by SyncTool here
-
-indexeddb_client = IndexedDBMock()
+# Server-side stand-in for the browser's IndexedDB: an embedded SQLite document
+# store, so an edge node keeps serving synced lessons and quizzes offline
+indexeddb_client = LocalStore(os.getenv("LOCAL_STORE_PATH", "memory/local_store.sqlite3"))
 
 # Memory handler
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="sync_agent_session",
     file_path="memory/sync_agent_memory.json"
 )
@@ -46,7 +39,7 @@ class SyncAgentWrapper(Agent):
     def __init__(self, *args, name: str = "sync_agent", **kwargs):
         # Instantiate SyncTool with required clients
         self.sync_tool = SyncTool(firestore_client, indexeddb_client)
-        self.sync_task = SyncTask()
+        self.sync_task = SyncTask(self.sync_tool)
 
         super().__init__(
             *args,
@@ -73,11 +66,7 @@ class SyncAgentWrapper(Agent):
             memory_handler=memory_handler,
             allow_delegation=True,
             verbose=True,
-            llm=ChatGoogleGenerativeAI(
-                model="models/gemini-2.5-pro",
-                google_api_key=os.getenv("GEMINI_API_KEY"),
-                temperature=0.3
-            ),
+            llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
             respect_context_window=True,
             code_execution_config={"enabled": True, "executor_type": "kirchhoff-async"},
             user_type="teacher",
@@ -1,16 +1,15 @@
 from crewflows import Agent
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from tools.dashboard_tool import TeacherDashboardTool
 from tasks.dashboard_tasks import generate_dashboard_metrics_task
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+from llms.client_pool import get_llm
 from typing import Any, Dict
 
 # Initialize dashboard tool
 teacher_dashboard_tool = TeacherDashboardTool()
 
 # Initialize memory handler
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="teacher_dashboard_agent_session",
     file_path="memory/teacher_dashboard_agent_memory.json"
 )
@@ -76,11 +75,7 @@ teacher_dashboard_agent = TeacherDashboardAgent(
     memory_handler=memory_handler,
     allow_delegation=True,
     verbose=True,
-    llm=ChatGoogleGenerativeAI(
-        model="models/gemini-2.5-pro",
-        google_api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=0.3
-    ),
+    llm=get_llm(model="models/gemini-2.5-pro", temperature=0.3),
     respect_context_window=True,
     code_execution_config={"enabled": True, "executor_type": "kirchhoff-async"},
     user_type="teacher",
@@ -1,20 +1,38 @@
 from crewflows import Agent
 from tools.visual_generation_tool import VisualGenerationTool
 from tasks.visual_generation_task import VisualGenerationTask
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+from crewflows.memory.log_memory_handler import LogMemoryHandler
+from llms.client_pool import get_llm
 from typing import Any, Dict
+import json
 
 # Initialize the visual generation tool instance
 visual_generation_tool = VisualGenerationTool()
 
 # Memory handler for visual agent
-memory_handler = LocalMemoryHandler(
+memory_handler = LogMemoryHandler(
     session_id="visual_agent_session",
     file_path="memory/visual_agent_memory.json"
 )
 
+
+def visual_inputs(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Map agent inputs onto the concept/grade/dialect the visual_scenes prompt expects."""
+    lesson = inputs.get("lesson_plan_json") or {}
+    if isinstance(lesson, str):
+        try:
+            lesson = json.loads(lesson)
+        except ValueError:
+            lesson = {}
+    if not isinstance(lesson, dict):
+        lesson = {}
+    return {
+        "concept": inputs.get("concept") or inputs.get("topic") or lesson.get("topic_title"),
+        "grade": inputs.get("grade") or inputs.get("grade_level") or lesson.get("grade"),
+        "dialect": inputs.get("dialect"),
+    }
+
+
 class VisualAgent(Agent):
     def __init__(self, *args, name: str = "visual_agent", **kwargs):
         super().__init__(
@@ -53,12 +71,7 @@ class VisualAgent(Agent):
             memory_handler=memory_handler,
             allow_delegation=True,
             verbose=True,
-            llm=ChatGoogleGenerativeAI(
-                model="models/gemini-2.5-pro",
-                google_api_key=os.getenv("GEMINI_API_KEY"),
-                temperature=0.7,
-                max_tokens=2048
-            ),
+            llm=get_llm(model="models/gemini-2.5-pro", temperature=0.7, max_tokens=2048),
             respect_context_window=True,
             code_execution_config={
                 "enabled": True,
@@ -95,11 +108,7 @@ class VisualAgent(Agent):
             dict: Dictionary with dalle_prompts, generated_images, scene_descriptions or error.
         """
         try:
-            context = {
-                "lesson_plan_json": inputs.get("lesson_plan_json"),
-                "story_text": inputs.get("story_text"),
-                "dialect": inputs.get("dialect", "default")
-            }
+            context = visual_inputs(inputs)
             # Access the task instance and run it
             result = await self.visual_generation_task_instance.run(context)
             return result
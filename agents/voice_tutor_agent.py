@@ -1,8 +1,8 @@
 import logging
-from typing import Dict
+from typing import AsyncIterator, Dict
 from crewflows import Agent
 from tasks.voice_tutor_task import VoiceTutorTask
-from tools.utils.prompt_loader import load_prompt
+from tools.utils.prompt_registry import prompt_registry
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +35,7 @@ class VoiceTutorAgent(Agent):
         )
         # Load the system prompt for TTS support
         try:
-            self.system_prompt = load_prompt("voice_tutor.txt")
+            self.system_prompt = prompt_registry.text("voice_tutor")
             logger.info("Loaded system prompt for VoiceTutorAgent successfully.")
         except Exception as e:
             logger.error(f"Failed to load system prompt for VoiceTutorAgent: {e}")
@@ -57,6 +57,10 @@ class VoiceTutorAgent(Agent):
     async def execute(self, prompt: str, dialect: str = "default") -> Dict:
         return await self.task.run(prompt, dialect)
 
+    def stream(self, prompt: str, dialect: str = "default") -> AsyncIterator[bytes]:
+        """Stream narration audio chunk by chunk instead of waiting for the whole file."""
+        return self.task.stream(prompt, dialect)
+
     async def process(self, inputs: Dict) -> Dict:
         logger.info(f"VoiceTutorAgent received inputs: {inputs}")
         prompt = inputs.get("prompt")
@@ -29,3 +29,11 @@ def decode_access_token(token: str):
         return payload
     except JWTError:
         return None
+
+def role_from_authorization(header: Optional[str]) -> Optional[str]:
+    """Role claim of a valid "Bearer <token>" issued by /login, or None."""
+    scheme, _, token = (header or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    payload = decode_access_token(token.strip()) or {}
+    return str(payload.get("role") or "").lower() or None
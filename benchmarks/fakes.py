@@ -0,0 +1,199 @@
+"""
+Deterministic stand-ins for every upstream the API calls, for offline load
+benchmarks: Gemini (ChatGoogleGenerativeAI), Google Cloud TTS
+(TextToSpeechClient), Firestore (firestore.testing.AsyncFakeFirestore) and
+Sarvam (an httpx.MockTransport). Each takes an UpstreamProfile with the
+latency and payload size to simulate; the same input always gets the same
+output.
+
+    with install_fakes(llm=UpstreamProfile(latency=1.5, payload_bytes=6000)) as fakes:
+        ...  # drive main.app; fakes.firestore can be seeded
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from types import SimpleNamespace
+from typing import Optional
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from firestore.testing import AsyncFakeFirestore  # noqa: E402
+
+FILLER = "Plants use sunlight, water and carbon dioxide to make their own food. "
+
+
+@dataclass(frozen=True)
+class UpstreamProfile:
+    latency: float = 0.0       # seconds per call; an LLM stream spreads it over its chunks
+    payload_bytes: int = 2048  # size of each response body
+    chunks: int = 8            # chunks per streamed LLM response
+
+
+def fake_generation(payload_bytes: int) -> str:
+    """
+    One JSON object with the fields of every generation schema (lesson, story,
+    quiz, ask-me, ...), padded to about `payload_bytes`, so any tool accepts it.
+    """
+    document = {
+        "topic_title": "Photosynthesis", "topic": "Photosynthesis", "grade_level": "5",
+        "introduction": "How do plants eat?",
+        "core_concepts": ["Chlorophyll", "Sunlight", "Glucose"],
+        "explanation": "",
+        "examples": ["A tulasi plant on the balcony", "Paddy fields in Telangana"],
+        "summary": "Plants make food from light.",
+        "title": "Ravi and the Sunflower", "story_body": "Ravi watched the sunflower turn to the sun.",
+        "moral": "Every leaf is a kitchen.", "suggested_visuals": ["A sunflower at dawn"], "dialect": "default",
+        "answer": "Leaves are green because of chlorophyll.", "follow_up_question": "Why do leaves change colour?",
+        "questions": [{"question": "What do plants need to make food?",
+                       "options": ["Sunlight", "Sand", "Salt", "Smoke"],
+                       "answer": "Sunlight", "explanation": "Light powers photosynthesis."}],
+        "format_type": "MCQ", "total_marks": 1, "dialect_adapted": False,
+    }
+    padding = max(0, payload_bytes - len(json.dumps(document)))
+    document["explanation"] = (FILLER * (padding // len(FILLER) + 1))[:padding]
+    return json.dumps(document)
+
+
+class FakeChatModel:
+    """Takes ChatGoogleGenerativeAI's keyword arguments; answers fake_generation()."""
+
+    def __init__(self, profile: UpstreamProfile = UpstreamProfile(), model: str = "models/fake",
+                 temperature: float = 0.6, **kwargs):
+        self.profile = profile
+        self.model = model
+        self.temperature = temperature
+        self.calls = 0
+        self._content = fake_generation(profile.payload_bytes)
+
+    def _message(self):
+        self.calls += 1
+        return SimpleNamespace(content=self._content)
+
+    def _chunks(self):
+        size = -(-len(self._content) // max(1, self.profile.chunks))
+        return [self._content[i:i + size] for i in range(0, len(self._content), size)]
+
+    def invoke(self, prompt, *args, **kwargs):
+        time.sleep(self.profile.latency)
+        return self._message()
+
+    predict = invoke
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        await asyncio.sleep(self.profile.latency)
+        return self._message()
+
+    def stream(self, prompt, *args, **kwargs):
+        self.calls += 1
+        chunks = self._chunks()
+        for chunk in chunks:
+            time.sleep(self.profile.latency / len(chunks))
+            yield SimpleNamespace(content=chunk)
+
+    async def astream(self, prompt, *args, **kwargs):
+        self.calls += 1
+        chunks = self._chunks()
+        for chunk in chunks:
+            await asyncio.sleep(self.profile.latency / len(chunks))
+            yield SimpleNamespace(content=chunk)
+
+
+class FakeTextToSpeechClient:
+    """synthesize_speech() returns `payload_bytes` of audio derived from the SSML."""
+
+    def __init__(self, *args, profile: UpstreamProfile = UpstreamProfile(), **kwargs):
+        self.profile = profile
+        self.calls = 0
+
+    def synthesize_speech(self, input=None, voice=None, audio_config=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.profile.latency)
+        seed = hashlib.sha256(str(getattr(input, "ssml", input)).encode("utf-8")).digest()
+        audio = (seed * (self.profile.payload_bytes // len(seed) + 1))[:self.profile.payload_bytes]
+        return SimpleNamespace(audio_content=audio)
+
+
+def sarvam_transport(profile: UpstreamProfile = UpstreamProfile()) -> httpx.MockTransport:
+    """Sarvam's /translate: the input, bracketed and padded to `payload_bytes`."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(profile.latency)
+        payload = json.loads(request.content)
+        text = f"[{payload['target_language_code']}] {payload['input']}"
+        return httpx.Response(200, json={"translated_text": text.ljust(profile.payload_bytes)})
+
+    return httpx.MockTransport(handler)
+
+
+def seed_documents(client: AsyncFakeFirestore, user_id: str, count: int, collection: str = "lesson_plans"):
+    start = datetime(2025, 1, 1)
+    for index in range(count):
+        client._docs[f"{collection}/{user_id}-{index:05d}"] = {
+            "user_id": user_id,
+            "topic_title": f"Lesson {index}",
+            "summary": FILLER,
+            "created_at": start + timedelta(minutes=index),
+        }
+
+
+@dataclass
+class Fakes:
+    llm: UpstreamProfile
+    tts: UpstreamProfile
+    firestore: AsyncFakeFirestore
+    sarvam: UpstreamProfile
+
+
+@contextmanager
+def install_fakes(llm: UpstreamProfile = UpstreamProfile(), tts: UpstreamProfile = UpstreamProfile(),
+                  firestore_rpc_latency: float = 0.0, sarvam: UpstreamProfile = UpstreamProfile(),
+                  firestore_client: Optional[AsyncFakeFirestore] = None):
+    """
+    Patch the upstream clients for the duration of the block, and restore the
+    previous ones on exit. The shared LLM pool is emptied and rebuilt with fake
+    clients, so agents built earlier (in the same process) get fakes too.
+    """
+    import langchain_google_genai
+    from google.cloud import texttospeech
+
+    import sarvam_client
+    from firestore import async_repository
+    from llms.client_pool import llm_pool
+    from sarvam_client import SarvamTranslator
+
+    client = firestore_client or AsyncFakeFirestore(rpc_latency=firestore_rpc_latency)
+    patches = [
+        mock.patch.object(langchain_google_genai, "ChatGoogleGenerativeAI", partial(FakeChatModel, llm)),
+        mock.patch.object(texttospeech, "TextToSpeechClient", partial(FakeTextToSpeechClient, profile=tts)),
+    ]
+    for patch in patches:
+        patch.start()
+    with llm_pool._lock:
+        previous_factory, previous_clients = llm_pool.factory, dict(llm_pool._clients)
+        llm_pool.factory = lambda model, temperature, max_tokens: FakeChatModel(llm, model, temperature)
+        llm_pool._clients.clear()
+    previous_db = async_repository.set_async_db(client)
+    previous_translator = sarvam_client.set_translator(
+        SarvamTranslator(api_key="benchmark", transport=sarvam_transport(sarvam))
+    )
+    try:
+        yield Fakes(llm, tts, client, sarvam)
+    finally:
+        for patch in reversed(patches):
+            patch.stop()
+        with llm_pool._lock:
+            llm_pool.factory = previous_factory
+            llm_pool._clients.clear()
+            llm_pool._clients.update(previous_clients)
+        async_repository.set_async_db(previous_db)
+        sarvam_client.set_translator(previous_translator)
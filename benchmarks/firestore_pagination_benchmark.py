@@ -0,0 +1,81 @@
+"""
+Compare the old "stream everything into a list" getters with cursor pagination,
+projection and streamed responses, against the in-memory Firestore stand-in
+(firestore/testing.py) with emulator-like latencies.
+
+    python benchmarks/firestore_pagination_benchmark.py --documents 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from firestore.pagination import fetch_page, iter_documents  # noqa: E402
+from firestore.testing import FakeFirestore  # noqa: E402
+
+
+def seed(client, count):
+    quizzes = client.collection("quiz_results")
+    start = datetime(2025, 1, 1)
+    for index in range(count):
+        client._docs[f"quiz_results/q{index:06d}"] = {
+            "user_id": "heavy_user",
+            "score": index % 100,
+            "questions": [{"question": f"Question {n}", "answer": "Photosynthesis"} for n in range(10)],
+            "submitted_at": start + timedelta(minutes=index),
+        }
+    return quizzes
+
+
+def measure(label, func):
+    client.rpcs = client.documents_read = 0
+    started = time.perf_counter()
+    first_byte, payload = func()
+    total = time.perf_counter() - started
+    print(f"{label:<34} first byte {first_byte - started:7.3f}s  total {total:7.3f}s  "
+          f"{len(payload) / 1024:9.1f} KiB  {client.documents_read:6d} docs  {client.rpcs:3d} RPCs")
+
+
+def full_list():
+    docs = [doc.to_dict() for doc in quizzes.where("user_id", "==", "heavy_user").stream()]
+    body = json.dumps(jsonable_encoder(docs))
+    return time.perf_counter(), body
+
+
+def first_page(fields=None):
+    def run():
+        page = fetch_page(quizzes, quizzes.where("user_id", "==", "heavy_user"), "submitted_at",
+                          limit=50, fields=fields)
+        body = json.dumps(jsonable_encoder(page.to_dict()))
+        return time.perf_counter(), body
+    return run
+
+
+def streamed_all():
+    chunks, first_byte = [], None
+    for item in iter_documents(quizzes.where("user_id", "==", "heavy_user"), "submitted_at"):
+        chunks.append(json.dumps(jsonable_encoder(item)))
+        first_byte = first_byte or time.perf_counter()
+    return first_byte, "[" + ",".join(chunks) + "]"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--rpc-latency", type=float, default=0.02)
+    parser.add_argument("--per-document-latency", type=float, default=0.00005)
+    args = parser.parse_args()
+
+    client = FakeFirestore(rpc_latency=args.rpc_latency, per_document_latency=args.per_document_latency)
+    quizzes = seed(client, args.documents)
+
+    measure("full list (old getter)", full_list)
+    measure("first page, limit=50", first_page())
+    measure("first page, limit=50, fields=score", first_page(["score"]))
+    measure("all documents, streamed", streamed_all)
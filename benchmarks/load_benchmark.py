@@ -0,0 +1,309 @@
+"""
+Offline load benchmark for the API: drives main.app in-process through an ASGI
+client, with Gemini, TTS, Firestore and Sarvam replaced by deterministic fakes
+(benchmarks/fakes.py), so no quota or credentials are needed.
+
+Each endpoint is run at every concurrency level (closed loop: N clients send
+their next request as soon as the previous one returns) and reports latency
+percentiles, requests per second, event-loop lag and memory growth.
+
+    python benchmarks/load_benchmark.py --endpoints lesson_planner,translate_batch \\
+        --concurrency 1,8,32 --requests 200 --llm-latency 1.5 --json results.json
+
+The response cache is off unless --llm-cache is given, and every request uses
+a distinct prompt, so each one reaches the fake upstreams. Streamed responses
+are timed to their last byte.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+BENCH_USER = "bench_user"
+
+# main.py refuses to start without these; the fakes never read them
+for _name, _value in (("GOOGLE_API_KEY", "benchmark"), ("GOOGLE_APPLICATION_CREDENTIALS", "benchmark.json"),
+                      ("VIDYAVAHINI_API_KEY", "benchmark"), ("VIDYAVAHINI_WARM_AGENTS", "")):
+    os.environ.setdefault(_name, _value)
+# Whatever key main.py was started with
+API_KEY = os.environ["VIDYAVAHINI_API_KEY"]
+
+import httpx  # noqa: E402
+
+from benchmarks.fakes import UpstreamProfile, install_fakes, seed_documents  # noqa: E402
+
+
+@dataclass(frozen=True)
+class Scenario:
+    method: str
+    path: str
+    body: Optional[Callable[[int], dict]] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def _body(prompt: str, **context) -> Callable[[int], dict]:
+    # The request index keeps prompts distinct, so caches do not answer them
+    return lambda i: {"prompt": f"{prompt} ({i})",
+                      "context": {key: value.format(i=i) if isinstance(value, str) else value
+                                  for key, value in context.items()}}
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "health": Scenario("GET", "/health"),
+    "lesson_planner": Scenario("POST", "/api/lesson_planner", _body("Photosynthesis", topic="Photosynthesis {i}")),
+    "story_teller": Scenario("POST", "/api/story_teller", _body("The water cycle", topic="The water cycle {i}")),
+    "quiz": Scenario("POST", "/api/quiz", _body(
+        "Quiz on fractions", lesson_plan_json={"topic_title": "Fractions", "core_concepts": ["Halves", "Quarters"]},
+        story_body="Ravi cut the roti into four equal parts {i}.",
+    )),
+    "ask_me": Scenario("POST", "/api/ask_me", _body("Why is the sky blue", user_question="Why is the sky blue? {i}",
+                                                    user_grade="5")),
+    "lesson_planner_stream": Scenario("POST", "/api/lesson_planner/stream", _body("Photosynthesis")),
+    "voice_tutor_stream": Scenario("POST", "/api/voice_tutor/stream", _body("Plants make food. They need light")),
+    "translate_batch": Scenario(
+        "POST", "/api/translate/batch",
+        lambda i: {"texts": [f"Sentence {n} of lesson {i}." for n in range(10)], "target": "te-IN"},
+    ),
+    "firestore_lessons": Scenario("GET", f"/firestore/get_lessons/{BENCH_USER}?limit=50"),
+    "crew_student": Scenario("POST", "/api/run", _body("Plants for grade 5"), {"x-user-role": "student"}),
+}
+DEFAULT_ENDPOINTS = [name for name in SCENARIOS if name != "crew_student"]
+
+
+# ---------------- measurements ----------------
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class LoopLagMonitor:
+    """How late asyncio.sleep(interval) wakes up: time the loop spent blocked."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+async def _send(client: httpx.AsyncClient, scenario: Scenario, index: int) -> str:
+    """The response status; "<status> error" when an agent answered 200 with an error result."""
+    headers = {"x-api-key": API_KEY, "x-user-role": "teacher", **scenario.headers}
+    body = scenario.body(index) if scenario.body else None
+    async with client.stream(scenario.method, scenario.path, json=body, headers=headers) as response:
+        content = b"".join([chunk async for chunk in response.aiter_bytes()])
+    status = str(response.status_code)
+    if response.headers.get("content-type", "").startswith("application/json"):
+        result = json.loads(content or b"null")
+        result = result.get("result", result) if isinstance(result, dict) else result
+        if isinstance(result, dict) and "error" in result:
+            status += " error"
+    elif b"event: error" in content:
+        status += " error"
+    return status
+
+
+async def run_level(client: httpx.AsyncClient, name: str, concurrency: int, requests: int,
+                    offset: int = 0, trace_memory: bool = False) -> dict:
+    scenario = SCENARIOS[name]
+    indices = itertools.count(offset)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    monitor = LoopLagMonitor()
+
+    async def worker():
+        while True:
+            index = next(indices)
+            if index >= offset + requests:
+                return
+            started = time.perf_counter()
+            try:
+                status = await _send(client, scenario, index)
+            except Exception as e:  # the app raised instead of answering
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    rss_before = rss_bytes()
+    if trace_memory:
+        tracemalloc.start()
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "endpoint": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2") or "error" in status),
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "loop_lag_p99_ms": ms(percentile(monitor.samples, 0.99)),
+        "loop_lag_max_ms": ms(max(monitor.samples, default=None)),
+        "rss_delta_mb": round((rss_bytes() - rss_before) / 2 ** 20, 2),
+        "traced_peak_mb": round(traced_peak / 2 ** 20, 2) if traced_peak is not None else None,
+    }
+
+
+@contextmanager
+def _working_directory(path: str):
+    # Agents write audio, caches and local stores relative to the working directory
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+async def _run(endpoints, levels, requests, warmup, llm_cache, trace_memory, fakes) -> List[dict]:
+    import main
+    from llms.response_cache import llm_cache as cache
+    from rate_limit import RateLimit, RateLimiter
+
+    # One client IP sends everything: lift the per-client limits
+    previous_limiter, previous_cache = main.rate_limiter, cache.enabled
+    main.rate_limiter = RateLimiter.from_env(default=RateLimit(10 ** 9, 1))
+    cache.enabled = llm_cache
+    seed_documents(fakes.firestore, BENCH_USER, 200)
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                offset = 0
+                for name in endpoints:
+                    # Builds the agent and fills pools and caches outside the measurement
+                    await run_level(client, name, max(levels), warmup * max(levels), offset)
+                    offset += warmup * max(levels)
+                    for concurrency in levels:
+                        result = await run_level(client, name, concurrency, requests, offset, trace_memory)
+                        offset += requests
+                        results.append(result)
+    finally:
+        main.rate_limiter, cache.enabled = previous_limiter, previous_cache
+    return results
+
+
+def run_benchmark(endpoints=DEFAULT_ENDPOINTS, levels=(1, 4, 16), requests=50, warmup=2,
+                  llm: UpstreamProfile = UpstreamProfile(latency=0.5, payload_bytes=4096),
+                  tts: UpstreamProfile = UpstreamProfile(latency=0.2, payload_bytes=16384),
+                  sarvam: UpstreamProfile = UpstreamProfile(latency=0.1, payload_bytes=256),
+                  firestore_rpc_latency: float = 0.01, llm_cache: bool = False, trace_memory: bool = False,
+                  workdir: Optional[str] = None) -> List[dict]:
+    """One result dict per (endpoint, concurrency level)."""
+    unknown = [name for name in endpoints if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown endpoints {unknown}; choose from {list(SCENARIOS)}")
+    workdir = workdir or tempfile.mkdtemp(prefix="vidyavahini-bench-")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+    with _working_directory(workdir), \
+            install_fakes(llm=llm, tts=tts, sarvam=sarvam, firestore_rpc_latency=firestore_rpc_latency) as fakes:
+        return asyncio.run(_run(endpoints, levels, requests, warmup, llm_cache, trace_memory, fakes))
+
+
+def print_table(results: List[dict]):
+    columns = ("endpoint", "concurrency", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms",
+               "loop_lag_p99_ms", "rss_delta_mb")
+    widths = [max(len(column), 8) for column in columns]
+    widths[0] = max(widths[0], *(len(result["endpoint"]) for result in results))
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result[column]).rjust(width) for column, width in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests per client before each endpoint")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-bytes", type=int, default=4096)
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--tts-bytes", type=int, default=16384)
+    parser.add_argument("--sarvam-latency", type=float, default=0.1)
+    parser.add_argument("--firestore-latency", type=float, default=0.01)
+    parser.add_argument("--llm-cache", action="store_true", help="leave the LLM response cache on")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also report tracemalloc peaks (slows every request down)")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        endpoints=[name.strip() for name in args.endpoints.split(",") if name.strip()],
+        levels=[int(level) for level in args.concurrency.split(",")],
+        requests=args.requests,
+        warmup=args.warmup,
+        llm=UpstreamProfile(latency=args.llm_latency, payload_bytes=args.llm_bytes),
+        tts=UpstreamProfile(latency=args.tts_latency, payload_bytes=args.tts_bytes),
+        sarvam=UpstreamProfile(latency=args.sarvam_latency),
+        firestore_rpc_latency=args.firestore_latency,
+        llm_cache=args.llm_cache,
+        trace_memory=args.trace_memory,
+    )
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Cold-start benchmark for the API process: eager vs lazy agent boot.
+
+Each trial starts a fresh interpreter and imports `main`:
+- lazy:  agents are only registered (what App Engine pays before serving /health)
+- eager: every registered agent is built right away, like the old top-level imports
+
+Run from the repository root with the same environment the server uses
+(GOOGLE_API_KEY, GOOGLE_APPLICATION_CREDENTIALS, VIDYAVAHINI_API_KEY, ...):
+
+    python benchmarks/startup_benchmark.py --trials 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_BOOT = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter() - started
+errors = dict()
+if {eager}:
+    errors = {{name: error for name, error in main.agent_registry.warm_up().items() if error}}
+print(json.dumps({{"import_seconds": imported, "total_seconds": time.perf_counter() - started, "errors": errors}}))
+"""
+
+
+def boot_once(eager: bool) -> dict:
+    env = dict(os.environ, VIDYAVAHINI_WARM_AGENTS="")
+    completed = subprocess.run(
+        [sys.executable, "-c", _BOOT.format(eager=eager)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Boot failed:\n{completed.stderr.strip()}")
+    # The last stdout line is ours; main logs to stdout as well
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    totals = [sample["total_seconds"] for sample in samples]
+    return {
+        "median_seconds": round(statistics.median(totals), 3),
+        "min_seconds": round(min(totals), 3),
+        "max_seconds": round(max(totals), 3),
+        "agent_errors": samples[-1]["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for mode, eager in (("lazy", False), ("eager", True)):
+        results[mode] = summarize([boot_once(eager) for _ in range(args.trials)])
+        print(f"{mode:>5}: median {results[mode]['median_seconds']}s "
+              f"(min {results[mode]['min_seconds']}s, max {results[mode]['max_seconds']}s)")
+        for name, error in results[mode]["agent_errors"].items():
+            print(f"       {name} failed to build: {error}")
+
+    speedup = results["eager"]["median_seconds"] / max(results["lazy"]["median_seconds"], 1e-9)
+    print(f"lazy boot is {speedup:.1f}x faster than eager boot")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,5 +3,5 @@ from .crew import Crew
 
 
 from .agent import Agent
-
-
+from .registry import AgentRegistry
+from .single_flight import SingleFlight
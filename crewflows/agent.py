@@ -1,3 +1,6 @@
+from tools.utils.metrics import traced
+
+
 class Agent:
     def __init__(self, name, role, goal, **kwargs):
         # Store the name privately
@@ -14,20 +17,45 @@ class Agent:
         self.verbose = kwargs.get("verbose", False)
         self.llm = kwargs.get("llm", None)
         self.user_type = kwargs.get("user_type", "teacher")
-        # etc.
+        self.metadata = kwargs.get("metadata") or {}
+        # Declared inputs/outputs, used by Crew to build the dependency graph
+        self.inputs = []
+        self.outputs = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every agent's process() is timed as an "agent" span (see tools/utils/metrics.py)
+        process = cls.__dict__.get("process")
+        if process is not None and not getattr(process, "__traced__", False):
+            cls.process = traced("agent", cls.__name__)(process)
 
     @property
     def name(self):
         return self._name
 
     def add_input(self, input_name):
-        # TODO: implement storing accepted inputs
-        pass
+        """Declare an accepted input (a field name or another agent's name). Accepts a list too."""
+        names = input_name if isinstance(input_name, (list, tuple)) else [input_name]
+        for name in names:
+            if name not in self.inputs:
+                self.inputs.append(name)
 
     def add_output(self, output_name):
-        # TODO: implement storing expected outputs
-        pass
+        """Declare a produced output field. Accepts a list too."""
+        names = output_name if isinstance(output_name, (list, tuple)) else [output_name]
+        for name in names:
+            if name not in self.outputs:
+                self.outputs.append(name)
 
-    async def run(self, *args, **kwargs):
-        # TODO: implement agent execution logic
-        pass
+    async def run(self, prompt=None, context=None, **kwargs):
+        """
+        Entry point used by the API endpoints: merges prompt and context into one
+        inputs dict and awaits the agent's async process().
+        """
+        process = getattr(self, "process", None)
+        if process is None:
+            raise NotImplementedError(f"{self.__class__.__name__} does not implement process()")
+        inputs = {**(context or {}), **kwargs}
+        if prompt is not None:
+            inputs.setdefault("prompt", prompt)
+        return await process(inputs)
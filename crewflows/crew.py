@@ -1,5 +1,8 @@
 import asyncio
 import logging
+import time
+
+from .graph import DependencyGraph, NodeTiming, RunReport
 
 logger = logging.getLogger(__name__)
 
@@ -8,7 +11,18 @@ class Crew:
         self.agents = agents
         self.tasks = tasks or []
         self.verbose = verbose
-        
+        process_config = kwargs.get("process_config") or {}
+        # Optional cap on agents running at the same time (None = unbounded)
+        self.max_concurrency = process_config.get("max_concurrency")
+        self.last_report = None
+        self._graph = None
+
+    @property
+    def graph(self) -> DependencyGraph:
+        """Dependency graph built from the agents' declared inputs/outputs and metadata."""
+        if self._graph is None or self._graph.agents != list(self.agents):
+            self._graph = DependencyGraph(self.agents)
+        return self._graph
 
     def kickoff(self, inputs: dict):
         """
@@ -27,25 +41,72 @@ class Crew:
     async def run(self, inputs: dict):
         """
         Async method to run all agents with the provided inputs.
-        Orchestrate tasks and agents as needed.
+        Agents run as soon as the agents they depend on have finished.
+        """
+        results, _ = await self.run_with_report(inputs)
+        return results
+
+    async def run_with_report(self, inputs: dict, on_result=None):
         """
+        Run the crew as a dependency graph and return (results, RunReport).
+
+        Independent agents run concurrently; each agent receives the crew inputs plus the
+        results of its upstream agents. A failing agent is reported under its name and
+        does not stop its dependants. `on_result(name, result, timing)`, a coroutine
+        function, is awaited as each agent finishes, before its dependants start.
+        """
+        graph = self.graph
+        agents_by_name = {agent.name: agent for agent in self.agents}
         results = {}
+        report = RunReport()
+        self.last_report = report
+        semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        node_tasks = {}
 
-        # Example simple orchestration: run agents sequentially
-        for agent in self.agents:
+        async def run_node(name):
+            deps = graph.dependencies[name]
+            timing = NodeTiming(name=name, dependencies=sorted(deps, key=graph.order.index))
+            report.nodes[name] = timing
+            if deps:
+                await asyncio.gather(*(node_tasks[dep] for dep in deps))
+            agent = agents_by_name[name]
+            node_inputs = graph.inputs_for(name, inputs, results)
+            if semaphore:
+                await semaphore.acquire()
+            timing.started_at = time.perf_counter()
+            timing.status = "running"
             if self.verbose:
-                logger.info(f"Running agent: {agent.name}")
-            # Assuming each agent has an async method 'process' that takes inputs dict
+                logger.info(f"Running agent: {name}")
             try:
-                result = await agent.process(inputs)
-                results[agent.name] = result
+                results[name] = await agent.process(node_inputs)
+                timing.status = "completed"
                 if self.verbose:
-                    logger.info(f"Agent {agent.name} completed")
+                    logger.info(f"Agent {name} completed")
             except Exception as e:
-                logger.error(f"Agent {agent.name} failed: {e}")
-                results[agent.name] = {"error": str(e)}
+                logger.error(f"Agent {name} failed: {e}")
+                results[name] = {"error": str(e)}
+                timing.status = "failed"
+            finally:
+                timing.finished_at = time.perf_counter()
+                if semaphore:
+                    semaphore.release()
+            if on_result is not None:
+                await on_result(name, results[name], timing)
 
-        
+        for name in graph.topological_order():
+            node_tasks[name] = asyncio.ensure_future(run_node(name))
 
-        return results
+        try:
+            await asyncio.gather(*node_tasks.values())
+        finally:
+            for task in node_tasks.values():
+                if not task.done():
+                    task.cancel()
+            report.finished_at = time.perf_counter()
+
+        if self.verbose:
+            logger.info("Crew run finished in %.2fs, critical path: %s",
+                        report.wall_time, " -> ".join(report.critical_path()))
 
+        # Keep the declaration order of the agents in the returned dict
+        return {name: results[name] for name in graph.order if name in results}, report
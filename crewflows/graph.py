@@ -0,0 +1,189 @@
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def agent_aliases(agent) -> set:
+    """
+    Names other agents may use to refer to this agent in add_input() and metadata,
+    e.g. "quiz_agent", "QuizAgent" and the class name.
+    """
+    aliases = {agent.name}
+    camel = "".join(part.capitalize() for part in re.split(r"[_\s]+", agent.name) if part)
+    aliases.add(camel)
+    if not camel.endswith("Agent"):
+        aliases.add(camel + "Agent")
+    class_name = type(agent).__name__
+    aliases.add(class_name)
+    if class_name.endswith("Wrapper"):
+        aliases.add(class_name[: -len("Wrapper")])
+    return aliases
+
+
+class DependencyGraph:
+    """
+    Dependency graph between the agents of a Crew.
+
+    An edge A -> B means B waits for A. Edges come from:
+    - B.add_input(<alias of A>)
+    - B.add_input(<field>) where A.add_output(<field>) and A does not also take <field> as input
+    - A.metadata["downstream"] listing B
+    - B.metadata["delegates_to"] listing A (B consumes the work it delegates)
+
+    Cycles are broken by keeping only the edges that follow the declaration order.
+    """
+
+    def __init__(self, agents: List):
+        self.agents = list(agents)
+        self.order = [agent.name for agent in self.agents]
+        self.dependencies: Dict[str, set] = {name: set() for name in self.order}
+        # Input key under which a consumer receives a producer's whole result
+        self.input_aliases: Dict[str, Dict[str, str]] = {name: {} for name in self.order}
+        # Output fields a producer hands over to its consumers
+        self.produced_fields: Dict[str, set] = {}
+        self._build()
+
+    def _build(self):
+        alias_to_name = {}
+        for agent in self.agents:
+            for alias in agent_aliases(agent):
+                alias_to_name.setdefault(alias, agent.name)
+
+        field_producers: Dict[str, List[str]] = {}
+        for agent in self.agents:
+            produced = set(getattr(agent, "outputs", [])) - set(getattr(agent, "inputs", []))
+            self.produced_fields[agent.name] = produced
+            for output in produced:
+                field_producers.setdefault(output, []).append(agent.name)
+
+        for agent in self.agents:
+            metadata = getattr(agent, "metadata", None) or {}
+            for input_name in getattr(agent, "inputs", []):
+                producer = alias_to_name.get(input_name)
+                if producer:
+                    self._add_edge(producer, agent.name)
+                    self.input_aliases[agent.name][producer] = input_name
+                for producer in field_producers.get(input_name, []):
+                    self._add_edge(producer, agent.name)
+            for downstream in metadata.get("downstream", []) or []:
+                consumer = alias_to_name.get(downstream)
+                if consumer:
+                    self._add_edge(agent.name, consumer)
+            for delegate in metadata.get("delegates_to", []) or []:
+                producer = alias_to_name.get(delegate)
+                if producer:
+                    self._add_edge(producer, agent.name)
+
+        self._break_cycles()
+
+    def _add_edge(self, producer: str, consumer: str):
+        if producer != consumer:
+            self.dependencies[consumer].add(producer)
+
+    def _break_cycles(self):
+        remaining = self._unsorted_nodes()
+        if not remaining:
+            return
+        logger.warning("Dependency cycle among agents %s; falling back to declaration order", sorted(remaining))
+        position = {name: index for index, name in enumerate(self.order)}
+        for name in remaining:
+            self.dependencies[name] = {
+                dep for dep in self.dependencies[name]
+                if dep not in remaining or position[dep] < position[name]
+            }
+
+    def _unsorted_nodes(self) -> set:
+        pending = {name: set(deps) for name, deps in self.dependencies.items()}
+        ready = [name for name in self.order if not pending[name]]
+        while ready:
+            done = ready.pop()
+            del pending[done]
+            for name, deps in pending.items():
+                if done in deps:
+                    deps.discard(done)
+                    if not deps and name not in ready:
+                        ready.append(name)
+        return set(pending)
+
+    def topological_order(self) -> List[str]:
+        """Agent names ordered so that every agent comes after its dependencies."""
+        ordered, placed = [], set()
+        while len(ordered) < len(self.order):
+            for name in self.order:
+                if name not in placed and self.dependencies[name] <= placed:
+                    ordered.append(name)
+                    placed.add(name)
+        return ordered
+
+    def inputs_for(self, name: str, inputs: dict, results: dict) -> dict:
+        """Crew inputs enriched with upstream results; caller-provided keys always win."""
+        node_inputs = dict(inputs)
+        for producer in sorted(self.dependencies[name], key=self.order.index):
+            result = results.get(producer)
+            if not isinstance(result, dict) or "error" in result:
+                continue
+            alias = self.input_aliases[name].get(producer)
+            if alias:
+                node_inputs.setdefault(alias, result)
+            for output in self.produced_fields[producer]:
+                if output in result:
+                    node_inputs.setdefault(output, result[output])
+        return node_inputs
+
+
+@dataclass
+class NodeTiming:
+    name: str
+    dependencies: List[str]
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    status: str = "pending"
+
+    @property
+    def duration(self) -> float:
+        return max(self.finished_at - self.started_at, 0.0)
+
+
+@dataclass
+class RunReport:
+    """Per-agent timings of one Crew run. Times are seconds relative to the run start."""
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float = 0.0
+    nodes: Dict[str, NodeTiming] = field(default_factory=dict)
+
+    @property
+    def wall_time(self) -> float:
+        return max(self.finished_at - self.started_at, 0.0)
+
+    def critical_path(self) -> List[str]:
+        """Chain of agents that determined the total wall time, first to last."""
+        finished = [node for node in self.nodes.values() if node.finished_at]
+        if not finished:
+            return []
+        node: Optional[NodeTiming] = max(finished, key=lambda n: n.finished_at)
+        path = []
+        while node is not None:
+            path.append(node.name)
+            deps = [self.nodes[d] for d in node.dependencies if d in self.nodes and self.nodes[d].finished_at]
+            node = max(deps, key=lambda n: n.finished_at) if deps else None
+        return list(reversed(path))
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_time": round(self.wall_time, 4),
+            "critical_path": self.critical_path(),
+            "agents": {
+                name: {
+                    "start": round(node.started_at - self.started_at, 4),
+                    "end": round(node.finished_at - self.started_at, 4),
+                    "duration": round(node.duration, 4),
+                    "depends_on": node.dependencies,
+                    "status": node.status,
+                }
+                for name, node in self.nodes.items()
+            },
+        }
@@ -0,0 +1,478 @@
+"""
+Background crew runs.
+
+POST /api/jobs puts a crew run on a JobQueue and answers with its id straight
+away; a fixed number of worker tasks run the queued jobs, so at most `workers`
+crews run at once. Each agent's result is written to the job store the moment
+the agent finishes, so a client that lost its connection can poll
+GET /api/jobs/{id}?after=<cursor> and carry on from the last result it saw.
+
+FirestoreJobStore (the default) is shared by every App Engine instance: a poll
+may land on any of them, and a job left by an instance that went away is
+claimed and rerun by another once its lease expires. JobStore keeps jobs in a
+local SQLite file and is only correct with a single instance (JOB_STORE=sqlite).
+When a job ends, its webhook (if any) gets the final job document; webhooks
+only go to https URLs on public addresses (check_webhook_url).
+"""
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+from google.api_core.exceptions import AlreadyExists
+
+from tools.utils.retry_handler import CircuitOpenError, RetryPolicy, acall_with_retry
+
+logger = logging.getLogger(__name__)
+
+JOB_STORE = os.getenv("JOB_STORE", "firestore")  # or "sqlite", for a single instance
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "memory/jobs.sqlite3")
+# A running job not heard from for this long is rerun by another instance; above the crew's 120 s timeout
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+INSTANCE_ID = os.getenv("GAE_INSTANCE") or uuid.uuid4().hex
+WEBHOOK_RETRY = RetryPolicy(retries=3, delay=1.0, max_delay=30.0)
+# Comma-separated hosts webhooks may be sent to; unset means any public host
+WEBHOOK_ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",")
+                         if host.strip()}
+
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+# runner(request, on_result) runs the crew for a stored request and returns its timings;
+# on_result(name, result, timing) is awaited as each agent finishes
+JobRunner = Callable[[dict, Callable[..., Awaitable[None]]], Awaitable[Optional[dict]]]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class UnsafeWebhookURL(ValueError):
+    pass
+
+
+def _resolve(host: str) -> List[str]:
+    return [info[4][0] for info in socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)]
+
+
+def check_webhook_url(url: str, allowed_hosts: Optional[Collection[str]] = None):
+    """
+    Raise UnsafeWebhookURL unless `url` is https, its host is in `allowed_hosts`
+    (default WEBHOOK_ALLOWED_HOSTS) when that is set, and every address it
+    resolves to is public: no loopback, private, link-local (the metadata
+    server) or reserved ranges. Blocking (DNS); run it in a thread.
+    """
+    allowed = WEBHOOK_ALLOWED_HOSTS if allowed_hosts is None else allowed_hosts
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme != "https" or not host:
+        raise UnsafeWebhookURL("webhook_url must be an https URL")
+    if allowed and host not in allowed:
+        raise UnsafeWebhookURL(f"{host} is not an allowed webhook host")
+    try:
+        addresses = [ipaddress.ip_address(host)]
+    except ValueError:
+        try:
+            addresses = [ipaddress.ip_address(address.split("%")[0]) for address in _resolve(host)]
+        except OSError as e:
+            raise UnsafeWebhookURL(f"{host} does not resolve") from e
+    for address in addresses:
+        if not address.is_global or address.is_multicast:
+            raise UnsafeWebhookURL(f"{host} is not a public address")
+
+
+class JobStore:
+    """
+    Jobs and their per-agent results in SQLite (a file path or ":memory:").
+    Local to one process: with several instances use FirestoreJobStore.
+    """
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, webhook_url TEXT,"
+            " error TEXT, timings TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, agent TEXT NOT NULL,"
+            " status TEXT NOT NULL, duration REAL NOT NULL, result TEXT NOT NULL, finished_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS job_results_job ON job_results (job_id, seq)")
+
+    def create(self, request: dict, webhook_url: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, request, webhook_url, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(request, ensure_ascii=False), webhook_url, time.time()),
+            )
+        return job_id
+
+    def request(self, job_id: str) -> dict:
+        with self._lock:
+            row = self._conn.execute("SELECT request FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0])
+
+    def start(self, job_id: str) -> bool:
+        with self._lock:
+            # A rerun (after a restart) starts from a clean slate
+            self._conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            self._conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                               (RUNNING, time.time(), job_id))
+        return True
+
+    def add_result(self, job_id: str, agent: str, result: Any, status: str, duration: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO job_results (job_id, agent, status, duration, result, finished_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, agent, status, duration, json.dumps(result, ensure_ascii=False, default=str), time.time()),
+            )
+            return cursor.lastrowid
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None, timings: Optional[dict] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, timings = ?, finished_at = ? WHERE id = ?",
+                (status, error, json.dumps(timings) if timings is not None else None, time.time(), job_id),
+            )
+
+    def get(self, job_id: str, after: int = 0) -> Optional[dict]:
+        """The job with the agent results recorded after cursor `after` (0 = all of them)."""
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT id, status, webhook_url, error, timings, created_at, started_at, finished_at"
+                " FROM jobs WHERE id = ?", (job_id,),
+            ).fetchone()
+            if job is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT seq, agent, status, duration, result FROM job_results"
+                " WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after),
+            ).fetchall()
+        return {
+            "job_id": job[0],
+            "status": job[1],
+            "webhook_url": job[2],
+            "error": job[3],
+            "timings": json.loads(job[4]) if job[4] else None,
+            "created_at": job[5],
+            "started_at": job[6],
+            "finished_at": job[7],
+            "results": {agent: json.loads(result) for _, agent, _, _, result in rows},
+            "agents": [{"agent": agent, "status": status, "duration": round(duration, 4), "cursor": seq}
+                       for seq, agent, status, duration, _ in rows],
+            "cursor": rows[-1][0] if rows else after,
+        }
+
+    def unfinished(self) -> List[str]:
+        """Jobs queued or running when the previous process stopped, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FirestoreJobStore:
+    """
+    Jobs in the Firestore collection `jobs`, read and written with the shared
+    AsyncClient; the same methods as JobStore, as coroutines.
+
+    Each (re)run of a job is claimed by creating jobs/{id}/runs/{n}: the create
+    fails on every instance but one, so a job never runs twice at once. Its
+    results go under that run (results/{seq}), so a rerun starts from a clean
+    slate without deleting anything. The claiming instance renews the job's
+    lease with every result; unfinished() offers queued jobs and running ones
+    whose lease ran out.
+    """
+
+    def __init__(self, client=None, collection: str = "jobs", lease_seconds: float = JOB_LEASE_SECONDS):
+        self._client = client
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        # {job id: [run, last seq]} for the jobs this instance is running
+        self._runs: Dict[str, List[int]] = {}
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        from firestore.async_repository import get_async_db
+
+        return get_async_db()
+
+    def _job(self, job_id: str):
+        return self.client.collection(self.collection).document(job_id)
+
+    def _results(self, job_id: str, run: int):
+        return self._job(job_id).collection("runs").document(str(run)).collection("results")
+
+    async def create(self, request: dict, webhook_url: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        await self._job(job_id).set({
+            "status": QUEUED, "request": json.dumps(request, ensure_ascii=False), "webhook_url": webhook_url,
+            "error": None, "timings": None, "created_at": time.time(), "started_at": None, "finished_at": None,
+            "run": 0, "lease_until": None,
+        })
+        return job_id
+
+    async def request(self, job_id: str) -> dict:
+        snapshot = await self._job(job_id).get()
+        return json.loads(snapshot.to_dict()["request"])
+
+    async def start(self, job_id: str) -> bool:
+        """Claim the job's next run; False if it is finished or another instance holds it."""
+        job_ref = self._job(job_id)
+        snapshot = await job_ref.get()
+        if not snapshot.exists:
+            return False
+        job = snapshot.to_dict()
+        now = time.time()
+        if job["status"] in (COMPLETED, FAILED) or (job["status"] == RUNNING and (job["lease_until"] or 0) > now):
+            return False
+        run = job["run"] + 1
+        batch = self.client.batch()
+        batch.create(job_ref.collection("runs").document(str(run)), {"instance": INSTANCE_ID, "started_at": now})
+        batch.update(job_ref, {"status": RUNNING, "run": run, "started_at": now,
+                               "lease_until": now + self.lease_seconds})
+        try:
+            await batch.commit()
+        except AlreadyExists:
+            return False  # another instance claimed this run first
+        self._runs[job_id] = [run, 0]
+        return True
+
+    async def add_result(self, job_id: str, agent: str, result: Any, status: str, duration: float) -> int:
+        state = self._runs[job_id]
+        state[1] += 1
+        run, seq = state
+        now = time.time()
+        batch = self.client.batch()
+        batch.set(self._results(job_id, run).document(f"{seq:08d}"), {
+            "seq": seq, "agent": agent, "status": status, "duration": duration,
+            "result": json.dumps(result, ensure_ascii=False, default=str), "finished_at": now,
+        })
+        batch.update(self._job(job_id), {"lease_until": now + self.lease_seconds})
+        await batch.commit()
+        return seq
+
+    async def finish(self, job_id: str, status: str, error: Optional[str] = None, timings: Optional[dict] = None):
+        self._runs.pop(job_id, None)
+        await self._job(job_id).update({
+            "status": status, "error": error, "timings": json.dumps(timings) if timings is not None else None,
+            "finished_at": time.time(), "lease_until": None,
+        })
+
+    async def get(self, job_id: str, after: int = 0) -> Optional[dict]:
+        """The job with the agent results of its current run recorded after cursor `after`."""
+        snapshot = await self._job(job_id).get()
+        if not snapshot.exists:
+            return None
+        job = snapshot.to_dict()
+        rows = []
+        if job["run"]:
+            query = self._results(job_id, job["run"]).where("seq", ">", after).order_by("seq")
+            rows = [result.to_dict() async for result in query.stream()]
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "webhook_url": job["webhook_url"],
+            "error": job["error"],
+            "timings": json.loads(job["timings"]) if job["timings"] else None,
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "results": {row["agent"]: json.loads(row["result"]) for row in rows},
+            "agents": [{"agent": row["agent"], "status": row["status"], "duration": round(row["duration"], 4),
+                        "cursor": row["seq"]} for row in rows],
+            "cursor": rows[-1]["seq"] if rows else after,
+        }
+
+    async def unfinished(self) -> List[str]:
+        """Queued jobs and running jobs whose lease expired, oldest first."""
+        now = time.time()
+        jobs = []
+        for status in (QUEUED, RUNNING):
+            async for snapshot in self.client.collection(self.collection).where("status", "==", status).stream():
+                job = snapshot.to_dict()
+                if status == QUEUED or (job["lease_until"] or 0) <= now:
+                    jobs.append((job["created_at"], snapshot.id))
+        return [job_id for _, job_id in sorted(jobs)]
+
+    async def close(self):
+        pass
+
+
+def default_job_store():
+    """The store JobQueue opens when given none: Firestore unless JOB_STORE=sqlite."""
+    if JOB_STORE == "sqlite":
+        logger.warning("JOB_STORE=sqlite keeps jobs on this instance only; run a single instance")
+        return JobStore()
+    return FirestoreJobStore()
+
+
+class JobQueue:
+    """
+    Runs stored jobs on `workers` worker tasks. At most `max_queued` jobs wait;
+    submit() raises JobQueueFull beyond that. Unfinished jobs in the store (left
+    by a previous process, or by another instance whose lease ran out) are
+    queued on start() and every `recover_interval` seconds after. Without a
+    store, start() opens default_job_store().
+    """
+
+    def __init__(self, store, runner: JobRunner, workers: int = 2, max_queued: int = 100,
+                 webhook_timeout: float = 10.0, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 recover_interval: float = 60.0):
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.webhook_timeout = webhook_timeout
+        self._transport = transport
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self.recover_interval = recover_interval
+        # Jobs queued or running here, so recovery does not queue them twice
+        self._held: Set[str] = set()
+        self.running = 0
+        self.counts = {"submitted": 0, "completed": 0, "failed": 0, "webhooks_failed": 0}
+
+    async def _store(self, method: str, *args):
+        # JobStore (SQLite) blocks, so it runs in a thread; FirestoreJobStore is async
+        call = getattr(self.store, method)
+        if asyncio.iscoroutinefunction(call):
+            return await call(*args)
+        return await asyncio.to_thread(call, *args)
+
+    def _put(self, job_id: str):
+        self._held.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def start(self):
+        if self.store is None:
+            self.store = await asyncio.to_thread(default_job_store)
+        self._queue = asyncio.Queue()
+        self._held = set()
+        self._client = httpx.AsyncClient(timeout=self.webhook_timeout, transport=self._transport)
+        await self._recover_once()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._recover()))
+
+    async def _recover_once(self):
+        for job_id in await self._store("unfinished"):
+            if job_id not in self._held:
+                self._put(job_id)
+
+    async def _recover(self):
+        while True:
+            await asyncio.sleep(self.recover_interval)
+            try:
+                await self._recover_once()
+            except Exception as e:
+                logger.warning("Looking for unfinished jobs failed: %s", e)
+
+    async def stop(self):
+        """Cancel the workers; interrupted and queued jobs stay in the store and rerun on the next start()."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def submit(self, request: dict, webhook_url: Optional[str] = None) -> dict:
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() has not been awaited")
+        if self._queue.qsize() >= self.max_queued:
+            raise JobQueueFull(f"{self._queue.qsize()} jobs are already waiting")
+        job_id = await self._store("create", request, webhook_url)
+        self._put(job_id)
+        self.counts["submitted"] += 1
+        return await self.get(job_id)
+
+    async def get(self, job_id: str, after: int = 0) -> Optional[dict]:
+        return await self._store("get", job_id, after)
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self.running += 1
+            try:
+                await self._run(job_id)
+            except Exception as e:  # the store itself failed; keep the worker alive
+                logger.error("Job %s could not be run: %s", job_id, e)
+            finally:
+                self.running -= 1
+                self._held.discard(job_id)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        if not await self._store("start", job_id):
+            return  # finished meanwhile, or claimed by another instance
+        request = await self._store("request", job_id)
+
+        async def on_result(name, result, timing):
+            await self._store("add_result", job_id, name, result, timing.status, timing.duration)
+
+        try:
+            timings = await self.runner(request, on_result)
+        except asyncio.CancelledError:
+            raise  # shutting down: the job stays "running" and reruns on the next start()
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            self.counts["failed"] += 1
+            await self._store("finish", job_id, FAILED, str(e) or type(e).__name__)
+        else:
+            self.counts["completed"] += 1
+            await self._store("finish", job_id, COMPLETED, None, timings)
+        job = await self.get(job_id)
+        if job["webhook_url"]:
+            await self._notify(job)
+
+    async def _post_webhook(self, job: dict):
+        response = await self._client.post(job["webhook_url"], json=job, headers={"X-VidyaVahini-Job": job["job_id"]})
+        response.raise_for_status()
+
+    async def _notify(self, job: dict):
+        try:
+            # Checked again at send time: the host may resolve elsewhere than at submit
+            await asyncio.to_thread(check_webhook_url, job["webhook_url"])
+            # One circuit breaker per receiving host: a dead receiver does not stop the others
+            upstream = f"webhook:{httpx.URL(job['webhook_url']).host}"
+            await acall_with_retry(self._post_webhook, job, policy=WEBHOOK_RETRY, upstream=upstream)
+        except (CircuitOpenError, httpx.HTTPError, UnsafeWebhookURL) as e:
+            # The result is still in the store; the client can poll for it
+            self.counts["webhooks_failed"] += 1
+            logger.warning("Webhook for job %s failed: %s", job["job_id"], e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            **self.counts,
+        }
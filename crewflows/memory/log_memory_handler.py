@@ -0,0 +1,352 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from crewflows.memory.base import BaseMemoryHandler
+
+try:  # POSIX advisory locks; without them only threads of one process are serialized
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Where a record lives on disk, plus a digest of its value to detect no-op writes
+Location = namedtuple("Location", ["seq", "offset", "length", "digest"])
+
+
+def _digest(value_json: str) -> str:
+    return hashlib.sha1(value_json.encode("utf-8")).hexdigest()[:16]
+
+
+class SegmentLog:
+    """
+    Append-only, multi-session key/value log stored as JSONL segments.
+
+    Every write appends records ({"s": session, "op": "put"|"del"|"clear", ...}) to
+    the newest segment; an in-memory index maps each session's keys to the byte
+    range of their latest record, so values are only read when asked for.
+    Writers take an exclusive flock on the directory's LOCK file and readers a
+    shared one; before each operation the index catches up with records other
+    processes appended. When dead records outweigh live ones the log is
+    compacted in a background thread into a single new segment.
+    """
+
+    PREFIX = "segment-"
+    SUFFIX = ".jsonl"
+
+    _instances: Dict[str, "SegmentLog"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str, max_segment_bytes: int = 4 * 1024 * 1024,
+                 compact_min_bytes: int = 1024 * 1024, compact_dead_ratio: float = 0.5,
+                 background_compaction: bool = True):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.compact_min_bytes = compact_min_bytes
+        self.compact_dead_ratio = compact_dead_ratio
+        self.background_compaction = background_compaction
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, "LOCK")
+        self._thread_lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._reset()
+
+    @classmethod
+    def open(cls, directory: str, **options) -> "SegmentLog":
+        """One SegmentLog (and index) per directory per process."""
+        key = os.path.abspath(directory)
+        with cls._instances_lock:
+            log = cls._instances.get(key)
+            if log is None:
+                log = cls._instances[key] = cls(directory, **options)
+            return log
+
+    def _reset(self):
+        self._index: Dict[str, "OrderedDict[str, Location]"] = {}
+        self._scanned: Dict[int, int] = {}  # segment seq -> bytes indexed
+        self.total_bytes = 0
+
+    # ---------------- locking ----------------
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, "a+") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---------------- segments and index ----------------
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{self.PREFIX}{seq:06d}{self.SUFFIX}")
+
+    def _segments(self):
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith(self.PREFIX) and name.endswith(self.SUFFIX):
+                try:
+                    seqs.append(int(name[len(self.PREFIX):-len(self.SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(seqs)
+
+    def _refresh(self):
+        """Index records appended since the last call (by this or another process)."""
+        seqs = self._segments()
+        if any(seq not in seqs for seq in self._scanned):
+            # Segments were compacted away by another process: rebuild from scratch
+            self._reset()
+        for seq in seqs:
+            path = self._segment_path(seq)
+            size = os.path.getsize(path)
+            position = self._scanned.get(seq, 0)
+            if size <= position:
+                continue
+            with open(path, "rb") as segment:
+                segment.seek(position)
+                for line in segment:
+                    if not line.endswith(b"\n"):
+                        break  # torn tail from a crashed writer; the next append starts a new line
+                    self._apply_line(line, seq, position)
+                    position += len(line)
+            self.total_bytes += position - self._scanned.get(seq, 0)
+            self._scanned[seq] = position
+
+    def _apply_line(self, line: bytes, seq: int, offset: int):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning("Skipping unreadable memory record in %s at %d", self._segment_path(seq), offset)
+            return
+        session = self._index.setdefault(record.get("s"), OrderedDict())
+        op = record.get("op")
+        if op == "put":
+            session[record["k"]] = Location(seq, offset, len(line), record.get("h"))
+        elif op == "del":
+            session.pop(record["k"], None)
+        elif op == "clear":
+            session.clear()
+
+    def _read(self, location: Location) -> Any:
+        with open(self._segment_path(location.seq), "rb") as segment:
+            segment.seek(location.offset)
+            return json.loads(segment.read(location.length))["v"]
+
+    @property
+    def live_bytes(self) -> int:
+        return sum(loc.length for session in self._index.values() for loc in session.values())
+
+    # ---------------- writes ----------------
+
+    def write(self, session_id: str, records) -> int:
+        """
+        Append records for a session: ("put", key, value), ("del", key) or ("clear",).
+        Puts whose value is unchanged are skipped. Returns the number of records written.
+        """
+        with self._locked(exclusive=True):
+            self._refresh()
+            current = self._index.get(session_id, {})
+            lines = []
+            for record in records:
+                op = record[0]
+                if op == "put":
+                    value_json = json.dumps(record[2], ensure_ascii=False, sort_keys=True)
+                    digest = _digest(value_json)
+                    existing = current.get(record[1])
+                    if existing is not None and existing.digest == digest:
+                        continue
+                    head = json.dumps({"s": session_id, "op": "put", "k": record[1], "h": digest}, ensure_ascii=False)
+                    lines.append(f'{head[:-1]}, "v": {value_json}}}\n')
+                elif op == "del":
+                    if record[1] in current:
+                        lines.append(json.dumps({"s": session_id, "op": "del", "k": record[1]}, ensure_ascii=False) + "\n")
+                elif op == "clear":
+                    if current:
+                        lines.append(json.dumps({"s": session_id, "op": "clear"}) + "\n")
+                else:
+                    raise ValueError(f"Unknown memory log operation: {op}")
+            if lines:
+                self._append(lines)
+        if lines:
+            self._maybe_compact()
+        return len(lines)
+
+    def _append(self, lines):
+        seqs = self._segments()
+        seq = seqs[-1] if seqs else 1
+        path = self._segment_path(seq)
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_segment_bytes:
+            seq += 1
+            path = self._segment_path(seq)
+        with open(path, "ab") as segment:
+            if segment.tell() > 0 and self._scanned.get(seq, 0) < segment.tell():
+                segment.write(b"\n")  # terminate a torn tail so our records parse
+            for line in lines:
+                segment.write(line.encode("utf-8"))
+            segment.flush()
+        self._refresh()
+
+    # ---------------- reads ----------------
+
+    def keys(self, session_id: str):
+        with self._locked(exclusive=False):
+            self._refresh()
+            return list(self._index.get(session_id, {}))
+
+    def get(self, session_id: str, key: str, default: Any = None) -> Any:
+        with self._locked(exclusive=False):
+            self._refresh()
+            location = self._index.get(session_id, {}).get(key)
+            return default if location is None else self._read(location)
+
+    def items(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Any]]:
+        """Lazily yield (key, value) in insertion order, reading `limit` values at most."""
+        with self._locked(exclusive=False):
+            self._refresh()
+            locations = list(self._index.get(session_id, {}).items())
+        end = None if limit is None else offset + limit
+        for key, location in locations[offset:end]:
+            with self._locked(exclusive=False):
+                try:
+                    value = self._read(location)
+                except FileNotFoundError:
+                    # Compacted since we listed the keys; look the key up again
+                    self._refresh()
+                    location = self._index.get(session_id, {}).get(key)
+                    if location is None:
+                        continue
+                    value = self._read(location)
+            yield key, value
+
+    def count(self, session_id: str) -> int:
+        with self._locked(exclusive=False):
+            self._refresh()
+            return len(self._index.get(session_id, {}))
+
+    # ---------------- compaction ----------------
+
+    def needs_compaction(self) -> bool:
+        if self.total_bytes < self.compact_min_bytes:
+            return False
+        return (self.total_bytes - self.live_bytes) / self.total_bytes >= self.compact_dead_ratio
+
+    def _maybe_compact(self):
+        if not self.needs_compaction():
+            return
+        if not self.background_compaction:
+            self.compact()
+            return
+        with self._thread_lock:
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(target=self.compact, name="memory-log-compaction", daemon=True)
+            self._compaction_thread.start()
+
+    def compact(self):
+        """Rewrite live records into one new segment and drop the old segments."""
+        with self._locked(exclusive=True):
+            self._refresh()
+            old_seqs = self._segments()
+            if not old_seqs:
+                return
+            new_seq = old_seqs[-1] + 1
+            tmp_path = self._segment_path(new_seq) + ".tmp"
+            with open(tmp_path, "wb") as out:
+                for session in self._index.values():
+                    for location in session.values():
+                        with open(self._segment_path(location.seq), "rb") as segment:
+                            segment.seek(location.offset)
+                            out.write(segment.read(location.length))
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, self._segment_path(new_seq))
+            for seq in old_seqs:
+                os.remove(self._segment_path(seq))
+            before = self.total_bytes
+            self._reset()
+            self._refresh()
+            logger.info("Compacted memory log %s: %d -> %d bytes", self.directory, before, self.total_bytes)
+
+    def wait_for_compaction(self, timeout: Optional[float] = None):
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+class LogMemoryHandler(BaseMemoryHandler):
+    """
+    Drop-in replacement for LocalMemoryHandler backed by a SegmentLog.
+
+    `save(data)` appends only the keys that changed instead of rewriting the whole
+    file, and `load()` can page through a session lazily. The log lives next to
+    the old JSON file (memory/quiz_memory.json -> memory/quiz_memory.log/); an
+    existing JSON file is imported on first use and renamed to *.json.migrated.
+    """
+
+    def __init__(self, session_id: str, file_path: str, log_dir: Optional[str] = None, **log_options):
+        self.session_id = session_id
+        self.file_path = file_path
+        self.log_dir = log_dir or os.path.splitext(file_path)[0] + ".log"
+        self.log = SegmentLog.open(self.log_dir, **log_options)
+        self._migrate_legacy_file()
+
+    def _migrate_legacy_file(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Not migrating unreadable memory file %s: %s", self.file_path, e)
+            return
+        if not isinstance(data, dict):
+            logger.warning("Not migrating memory file %s: expected a JSON object", self.file_path)
+            return
+        if self.log.count(self.session_id) == 0:
+            self.log.write(self.session_id, [("put", key, value) for key, value in data.items()])
+        os.replace(self.file_path, self.file_path + ".migrated")
+        logger.info("Migrated %d memory entries from %s", len(data), self.file_path)
+
+    def load(self, offset: int = 0, limit: Optional[int] = None) -> dict:
+        """Whole session by default; pass offset/limit to read one page of keys."""
+        return dict(self.log.items(self.session_id, offset, limit))
+
+    def iter_items(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Any]]:
+        return self.log.items(self.session_id, offset, limit)
+
+    def keys(self):
+        return self.log.keys(self.session_id)
+
+    def count(self) -> int:
+        return self.log.count(self.session_id)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.log.get(self.session_id, key, default)
+
+    def put(self, key: str, value: Any):
+        self.log.write(self.session_id, [("put", key, value)])
+
+    def delete(self, key: str):
+        self.log.write(self.session_id, [("del", key)])
+
+    def save(self, data):
+        """Make the session equal to `data`, appending only what changed."""
+        if not isinstance(data, dict):
+            raise TypeError("LogMemoryHandler.save() expects a dict")
+        removed = [("del", key) for key in self.keys() if key not in data]
+        self.log.write(self.session_id, removed + [("put", key, value) for key, value in data.items()])
+
+    def clear(self):
+        self.log.write(self.session_id, [("clear",)])
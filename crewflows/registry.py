@@ -0,0 +1,126 @@
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+AgentFactory = Union[str, Callable[[], Any]]
+
+
+def _resolve(factory: AgentFactory) -> Any:
+    """
+    Build an agent from its factory. A string "package.module:attribute" imports the
+    module on first use (agent modules build their instance at import time); a
+    callable is simply called.
+    """
+    if callable(factory):
+        return factory()
+    module_name, _, attribute = factory.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
+
+
+@dataclass
+class _Entry:
+    endpoint: str
+    instance_name: str
+    factory: AgentFactory
+    agent: Any = None
+    build_seconds: Optional[float] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class AgentRegistry:
+    """
+    Agents by endpoint name, built on first use.
+
+    Importing an agent module builds its LLM clients, memory handlers and cloud
+    clients, so the API registers factories instead of importing every agent at
+    startup. Each agent is built at most once, even under concurrent requests.
+    Agents can be looked up by endpoint name ("voice_tutor") or instance name
+    ("voice_tutor_agent").
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._aliases: Dict[str, str] = {}
+
+    def register(self, endpoint: str, factory: AgentFactory, instance_name: Optional[str] = None):
+        if instance_name is None:
+            if isinstance(factory, str) and ":" in factory:
+                instance_name = factory.rsplit(":", 1)[1]
+            else:
+                instance_name = f"{endpoint}_agent"
+        self._entries[endpoint] = _Entry(endpoint=endpoint, instance_name=instance_name, factory=factory)
+        self._aliases[endpoint] = endpoint
+        self._aliases[instance_name] = endpoint
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._aliases
+
+    def endpoints(self) -> List[str]:
+        return list(self._entries)
+
+    def instance_name(self, name: str) -> str:
+        return self._entry(name).instance_name
+
+    def is_built(self, name: str) -> bool:
+        return self._entry(name).agent is not None
+
+    def _entry(self, name: str) -> _Entry:
+        try:
+            return self._entries[self._aliases[name]]
+        except KeyError:
+            raise KeyError(f"Unknown agent: {name}") from None
+
+    def get(self, name: str) -> Any:
+        """Return the agent, building it (and its tools and clients) on first use."""
+        entry = self._entry(name)
+        if entry.agent is not None:
+            return entry.agent
+        with entry.lock:
+            if entry.agent is None:
+                started = time.perf_counter()
+                entry.agent = _resolve(entry.factory)
+                entry.build_seconds = time.perf_counter() - started
+                logger.info("Built agent %s in %.3fs", entry.endpoint, entry.build_seconds)
+        return entry.agent
+
+    async def aget(self, name: str) -> Any:
+        """Async get(); a first build runs in a worker thread so the event loop keeps serving."""
+        entry = self._entry(name)
+        if entry.agent is not None:
+            return entry.agent
+        return await asyncio.to_thread(self.get, name)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Build the given agents (all when None) ahead of their first request.
+        Returns {endpoint: error or None}; a failing agent does not stop the others.
+        """
+        errors = {}
+        for name in (self.endpoints() if names is None else names):
+            try:
+                self.get(name)
+                errors[self._entry(name).endpoint] = None
+            except Exception as e:
+                logger.error("Warm-up failed for agent %s: %s", name, e)
+                errors[name] = str(e)
+        return errors
+
+    async def awarm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, Optional[str]]:
+        return await asyncio.to_thread(self.warm_up, names)
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            endpoint: {
+                "instance_name": entry.instance_name,
+                "built": entry.agent is not None,
+                "build_seconds": entry.build_seconds,
+            }
+            for endpoint, entry in self._entries.items()
+        }
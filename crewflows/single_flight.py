@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import json
+import re
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from tools.utils import metrics
+
+COALESCED = metrics.registry.counter(
+    "vidyavahini_single_flight_coalesced",
+    "Agent requests answered by joining an identical request already in flight.",
+    ("endpoint",),
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case and whitespace do not change what an agent generates."""
+    return re.sub(r"\s+", " ", (prompt or "").strip()).casefold()
+
+
+def make_key(endpoint: str, prompt: str, context: Optional[Dict] = None) -> str:
+    context_hash = hashlib.sha256(
+        json.dumps(context or {}, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+    prompt_hash = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    return f"{endpoint}:{prompt_hash[:16]}:{context_hash[:16]}"
+
+
+@dataclass
+class _Flight:
+    endpoint: str
+    task: "asyncio.Task"
+    waiters: int = 1
+
+
+@dataclass
+class _LoopState:
+    flights: Dict[str, _Flight] = field(default_factory=dict)
+
+
+class SingleFlight:
+    """
+    Concurrent identical calls share one execution.
+
+    The first caller for a key starts `factory()` as a task; callers arriving
+    while it runs await the same task and get the same result or exception.
+    Nothing is kept once the task finishes: this only merges requests that
+    overlap (30 students opening the same quiz), the response cache handles
+    the rest. A caller that disconnects does not cancel the others' result.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self.executions = 0
+        self.coalesced = 0
+
+    def _state(self) -> _LoopState:
+        # Tasks belong to the loop that started them, so keep the flights per loop
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = _LoopState()
+        return state
+
+    async def run(self, endpoint: str, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await factory()
+        state = self._state()
+        flight = state.flights.get(key)
+        if flight is None:
+            self.executions += 1
+            task = asyncio.create_task(factory())
+            flight = state.flights[key] = _Flight(endpoint, task)
+            task.add_done_callback(lambda done: self._landed(state, key, done))
+        else:
+            flight.waiters += 1
+            self.coalesced += 1
+            COALESCED.inc(endpoint=endpoint)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+
+    @staticmethod
+    def _landed(state: _LoopState, key: str, task: "asyncio.Task"):
+        state.flights.pop(key, None)
+        # Every waiter may have gone; mark the exception retrieved so it is not logged as lost
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> Iterator[Tuple[str, _Flight]]:
+        for state in list(self._loops.values()):
+            yield from list(state.flights.items())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": {key: {"endpoint": flight.endpoint, "waiters": flight.waiters}
+                          for key, flight in self.in_flight()},
+        }
+
+    def collect_metrics(self):
+        """Scrape-time gauge of callers waiting on each in-flight key."""
+        for key, flight in self.in_flight():
+            yield metrics.Sample("vidyavahini_single_flight_waiters", "gauge",
+                                 "Callers sharing one in-flight agent call, per key.",
+                                 flight.waiters, {"endpoint": flight.endpoint, "key": key})
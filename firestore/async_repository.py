@@ -0,0 +1,307 @@
+"""
+Async counterparts of firestore_utils, class_utils, quiz_utils and user_utils,
+on firestore.AsyncClient so route handlers await Firestore on the event loop
+instead of holding one of the default thread pool's 40 workers per call.
+
+Every operation runs under a per-event-loop semaphore of
+FIRESTORE_MAX_CONCURRENCY (default 32): a burst of dashboard loads queues here
+rather than opening hundreds of concurrent RPCs. The few calls with no async
+API (Firebase Auth) go through to_thread() under the same guard, so they can
+never take more than that many pool threads.
+"""
+import asyncio
+import functools
+import os
+import uuid
+import weakref
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+
+from firebase_admin import auth, firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+
+from firestore.batch_writer import acommit_grouped_writes, enrollment_chunks, quiz_result_writes, summarize_status
+from firestore.pagination import ORDER_FIELDS, Page, afetch_page, aiter_documents
+from tools.utils.metrics import span
+from tools.utils.sync_engine import SYNC_COLLECTIONS, server_write
+
+MAX_CONCURRENCY = int(os.getenv("FIRESTORE_MAX_CONCURRENCY", "32"))
+
+_client = None
+_guards: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_async_db():
+    """The shared AsyncClient, created on first use from the default Firebase app."""
+    global _client
+    if _client is None:
+        import firestore.firebase_config  # noqa: F401  initializes the default app
+        from firebase_admin import firestore_async
+
+        _client = firestore_async.client()
+    return _client
+
+
+def set_async_db(client):
+    """Swap the client, e.g. for firestore.testing.AsyncFakeFirestore; returns the previous one."""
+    global _client
+    previous, _client = _client, client
+    return previous
+
+
+def _guard() -> asyncio.Semaphore:
+    # Semaphores bind to the loop they first wait on, so keep one per loop
+    loop = asyncio.get_running_loop()
+    guard = _guards.get(loop)
+    if guard is None:
+        guard = _guards[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+    return guard
+
+
+def guarded(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with _guard():
+            with span("firestore", func.__name__):
+                return await func(*args, **kwargs)
+    return wrapper
+
+
+async def _add(collection: str, user_id: str, data: dict, timestamp_field: str):
+    document = {
+        **data,
+        "user_id": user_id,
+        timestamp_field: firestore.SERVER_TIMESTAMP
+    }
+    if collection in SYNC_COLLECTIONS:
+        # Devices that already pulled this user's documents only see stamped writes
+        document = server_write(document)
+    await get_async_db().collection(collection).add(document)
+
+# -------------------------------
+# User profiles
+# -------------------------------
+@guarded
+async def create_user_profile(user_id: str, user_data: dict):
+    await get_async_db().collection("users").document(user_id).set({
+        **user_data,
+        "created_at": firestore.SERVER_TIMESTAMP
+    })
+
+@guarded
+async def get_user_profile(user_id: str) -> Optional[dict]:
+    doc = await get_async_db().collection("users").document(user_id).get()
+    return doc.to_dict() if doc.exists else None
+
+@guarded
+async def register_user(email: str, password: str, role: str, user_data: dict):
+    # Firebase Auth has no async API; the guard caps how many threads this can hold
+    user_record = await asyncio.to_thread(auth.create_user, email=email, password=password)
+    user_id = user_record.uid
+    db = get_async_db()
+
+    await db.collection("users").document(user_id).set({
+        "email": email,
+        "role": role,
+        **user_data,
+        "created_at": datetime.utcnow()
+    })
+
+    if role == "student":
+        await db.collection("students").document(user_data["student_id"]).set({
+            "uid": user_id,
+            "name": user_data.get("name"),
+            "email": email,
+            "grade": user_data.get("grade"),
+            "linked_classes": [],
+            "added_by": None,
+            "created_at": datetime.utcnow()
+        })
+
+    return user_id
+
+# -------------------------------
+# Classes and quizzes
+# -------------------------------
+@guarded
+async def create_class(class_id: str, class_data: dict, teacher_uid: str, subject: str):
+    """Async class_utils.create_class(): one read-free batch."""
+    db = get_async_db()
+    batch = db.batch()
+    batch.create(db.collection("classes").document(class_id), {
+        **class_data,
+        "students": [],
+        "subjects": {subject: teacher_uid},
+        "created_at": firestore.SERVER_TIMESTAMP,
+    })
+    batch.update(db.collection("users").document(teacher_uid), {"teacherOf": firestore.ArrayUnion([class_id])})
+    try:
+        await batch.commit()
+    except AlreadyExists:
+        raise ValueError("Class already exists") from None
+    except NotFound:
+        raise ValueError("Teacher not found") from None
+
+def _enrollment_batch(db, class_ref, class_id: str, student_ids: list):
+    batch = db.batch()
+    batch.update(class_ref, {"students": firestore.ArrayUnion(student_ids)})
+    for student_id in student_ids:
+        batch.update(db.collection("students").document(student_id),
+                     {"linked_classes": firestore.ArrayUnion([class_id])})
+    return batch
+
+@guarded
+async def enroll_students(class_id: str, student_ids: list) -> dict:
+    """Async class_utils.enroll_students(); same batching and return value."""
+    db = get_async_db()
+    class_ref = db.collection("classes").document(class_id)
+    enrolled, missing = [], []
+    for chunk in enrollment_chunks(student_ids):
+        try:
+            await _enrollment_batch(db, class_ref, class_id, chunk).commit()
+            enrolled.extend(chunk)
+            continue
+        except NotFound:
+            pass
+        refs = [db.collection("students").document(student_id) for student_id in chunk]
+        existing = {snapshot.reference.path async for snapshot in db.get_all([class_ref, *refs]) if snapshot.exists}
+        if class_ref.path not in existing:
+            raise ValueError("Class not found")
+        present = [ref.id for ref in refs if ref.path in existing]
+        missing.extend(ref.id for ref in refs if ref.path not in existing)
+        if present:
+            await _enrollment_batch(db, class_ref, class_id, present).commit()
+            enrolled.extend(present)
+    return {"class_id": class_id, "enrolled": enrolled, "missing": missing}
+
+async def add_student_to_class(class_id: str, student_id: str):
+    if (await enroll_students(class_id, [student_id]))["missing"]:
+        raise ValueError("Class or student not found")
+
+@guarded
+async def post_quiz_result(teacher_uid: str, class_id: str, subject: str, quiz_data: dict) -> dict:
+    """Async quiz_utils.post_quiz_result(); same ids, batching and return value."""
+    db = get_async_db()
+    class_ref = db.collection("classes").document(class_id)
+    class_doc = await class_ref.get()
+    if not class_doc.exists:
+        raise ValueError("Class does not exist")
+
+    student_ids = class_doc.to_dict().get("students", [])
+    quiz_id = uuid.uuid4().hex
+    writes = quiz_result_writes(db, class_ref, class_id, student_ids, teacher_uid, subject, quiz_id, quiz_data)
+    status = await acommit_grouped_writes(db, writes)
+    return {"quiz_id": quiz_id, "students": status, **summarize_status(status)}
+
+# -------------------------------
+# Paginated per-user reads
+# -------------------------------
+@guarded
+async def get_user_documents_page(collection: str, user_id: str, limit: int = 50, start_after: Optional[str] = None,
+                                  fields: Optional[Sequence[str]] = None) -> Page:
+    ref = get_async_db().collection(collection)
+    return await afetch_page(ref, ref.where("user_id", "==", user_id), ORDER_FIELDS[collection],
+                             limit=limit, start_after=start_after, fields=fields)
+
+async def iter_user_documents(collection: str, user_id: str,
+                              fields: Optional[Sequence[str]] = None) -> AsyncIterator[dict]:
+    # Not guarded as a whole: a slow client reading a long stream would pin a slot
+    query = get_async_db().collection(collection).where("user_id", "==", user_id)
+    async for item in aiter_documents(query, ORDER_FIELDS[collection], fields=fields):
+        yield item
+
+@guarded
+async def _list_user_documents(collection: str, user_id: str) -> list:
+    return [item async for item in iter_user_documents(collection, user_id)]
+
+# -------------------------------
+# Lesson Planner Agent
+# -------------------------------
+@guarded
+async def create_lesson_plan(user_id: str, plan_data: dict):
+    await _add("lesson_plans", user_id, plan_data, "created_at")
+
+async def get_lesson_plans(user_id: str):
+    return await _list_user_documents("lesson_plans", user_id)
+
+async def get_lesson_plans_page(user_id: str, limit: int = 50, start_after: Optional[str] = None,
+                                fields: Optional[Sequence[str]] = None) -> Page:
+    return await get_user_documents_page("lesson_plans", user_id, limit, start_after, fields)
+
+# -------------------------------
+# Story Teller Agent
+# -------------------------------
+@guarded
+async def save_story(user_id: str, story_data: dict):
+    await _add("stories", user_id, story_data, "created_at")
+
+async def get_stories(user_id: str):
+    return await _list_user_documents("stories", user_id)
+
+async def get_stories_page(user_id: str, limit: int = 50, start_after: Optional[str] = None,
+                           fields: Optional[Sequence[str]] = None) -> Page:
+    return await get_user_documents_page("stories", user_id, limit, start_after, fields)
+
+# -------------------------------
+# Course Planner Agent
+# -------------------------------
+@guarded
+async def save_course_plan(user_id: str, course_data: dict):
+    await _add("course_plans", user_id, course_data, "created_at")
+
+# -------------------------------
+# Quiz Agent
+# -------------------------------
+@guarded
+async def save_quiz_result(user_id: str, quiz_data: dict):
+    await _add("quiz_results", user_id, quiz_data, "submitted_at")
+
+async def get_quiz_results(user_id: str):
+    return await _list_user_documents("quiz_results", user_id)
+
+async def get_quiz_results_page(user_id: str, limit: int = 50, start_after: Optional[str] = None,
+                                fields: Optional[Sequence[str]] = None) -> Page:
+    return await get_user_documents_page("quiz_results", user_id, limit, start_after, fields)
+
+# -------------------------------
+# Agent logs
+# -------------------------------
+@guarded
+async def log_voice_session(user_id: str, session_data: dict):
+    await _add("voice_sessions", user_id, session_data, "timestamp")
+
+@guarded
+async def save_visual_asset(user_id: str, visual_data: dict):
+    await _add("visual_assets", user_id, visual_data, "created_at")
+
+@guarded
+async def log_qa(user_id: str, question: str, answer: str):
+    await _add("qa_sessions", user_id, {"question": question, "answer": answer}, "asked_at")
+
+@guarded
+async def log_sync_event(user_id: str, sync_data: dict):
+    await _add("sync_events", user_id, sync_data, "synced_at")
+
+@guarded
+async def record_teacher_metrics(user_id: str, dashboard_data: dict):
+    await _add("teacher_dashboards", user_id, dashboard_data, "recorded_at")
+
+@guarded
+async def save_generated_content(user_id: str, content_data: dict):
+    await _add("generated_content", user_id, content_data, "generated_at")
+
+@guarded
+async def save_game_result(user_id: str, game_data: dict):
+    await _add("game_results", user_id, game_data, "played_at")
+
+@guarded
+async def save_prediction(user_id: str, prediction_data: dict):
+    await _add("analytics_predictions", user_id, prediction_data, "predicted_at")
+
+@guarded
+async def log_multimodal_result(user_id: str, research_data: dict):
+    await _add("multimodal_research", user_id, research_data, "generated_at")
+
+@guarded
+async def log_student_analytics(user_id: str, analytics_data: dict):
+    await _add("student_analytics", user_id, analytics_data, "recorded_at")
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from tools.utils.retry_handler import retry_with_backoff
+from tools.utils.sync_engine import server_write
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects a WriteBatch with more than 500 operations
+MAX_BATCH_OPS = 500
+
+# (document reference, data) pairs that must land together, keyed by e.g. student id
+WriteGroups = Dict[str, List[Tuple[Any, dict]]]
+
+
+def quiz_result_writes(client, class_ref, class_id: str, student_ids: list, teacher_uid: str,
+                       subject: str, quiz_id: str, quiz_data: dict) -> WriteGroups:
+    """One write group per student: the top-level and the class copy of their entry."""
+    timestamp = datetime.utcnow()
+    writes = {}
+    for student_id in student_ids:
+        # Stamped for the sync engine, which pulls quiz results by "student_id" too
+        quiz_entry = server_write({
+            **quiz_data,
+            "timestamp": timestamp,
+            "subject": subject,
+            "class_id": class_id,
+            "student_id": student_id,
+            "teacher_id": teacher_uid,
+            "quiz_id": quiz_id,
+        })
+        doc_id = f"{quiz_id}_{student_id}"
+        writes[student_id] = [
+            (client.collection("quiz_results").document(doc_id), quiz_entry),
+            (class_ref.collection("quiz_results").document(doc_id), quiz_entry),
+        ]
+    return writes
+
+
+def enrollment_chunks(student_ids: List[str], max_ops: int = MAX_BATCH_OPS) -> List[List[str]]:
+    """Deduplicated student ids, in chunks that fit one batch alongside the class update."""
+    ids = list(dict.fromkeys(student_ids))
+    size = max_ops - 1
+    return [ids[start:start + size] for start in range(0, len(ids), size)]
+
+
+def chunk_groups(groups: WriteGroups, max_ops: int = MAX_BATCH_OPS) -> List[List[str]]:
+    """Split group keys into batches of at most `max_ops` writes, never splitting a group."""
+    chunks, current, size = [], [], 0
+    for key, writes in groups.items():
+        if len(writes) > max_ops:
+            raise ValueError(f"Write group {key!r} has {len(writes)} writes, more than one batch allows")
+        if current and size + len(writes) > max_ops:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(key)
+        size += len(writes)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def commit_grouped_writes(client, groups: WriteGroups, max_ops: int = MAX_BATCH_OPS,
+                          max_workers: int = 4, retries: int = 3, retry_delay: float = 0.5) -> Dict[str, str]:
+    """
+    Commit grouped set() writes in WriteBatches of up to `max_ops`, in parallel.
+
+    A batch is atomic, so each group (e.g. the two copies of one student's quiz
+    result) is either fully written or not at all. Failed batches are retried with
+    backoff; set() on fixed document ids makes retries idempotent. Returns
+    {group key: "ok" | "failed: <error>"}.
+    """
+    @retry_with_backoff(retries=retries, delay=retry_delay)
+    def commit(keys: List[str]):
+        batch = client.batch()
+        for key in keys:
+            for ref, data in groups[key]:
+                batch.set(ref, data)
+        batch.commit()
+
+    def commit_chunk(keys: List[str]) -> Dict[str, str]:
+        try:
+            commit(keys)
+            return {key: "ok" for key in keys}
+        except Exception as e:
+            logger.error("Firestore batch of %d groups failed after %d attempts: %s", len(keys), retries, e)
+            return {key: f"failed: {e}" for key in keys}
+
+    chunks = chunk_groups(groups, max_ops)
+    status: Dict[str, str] = {}
+    if not chunks:
+        return status
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        for chunk_status in pool.map(commit_chunk, chunks):
+            status.update(chunk_status)
+    return status
+
+
+async def acommit_grouped_writes(client, groups: WriteGroups, max_ops: int = MAX_BATCH_OPS,
+                                 max_concurrency: int = 4, retries: int = 3,
+                                 retry_delay: float = 0.5) -> Dict[str, str]:
+    """commit_grouped_writes() for firestore.AsyncClient: batches commit concurrently on the event loop."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    @retry_with_backoff(retries=retries, delay=retry_delay)
+    async def commit(keys: List[str]):
+        batch = client.batch()
+        for key in keys:
+            for ref, data in groups[key]:
+                batch.set(ref, data)
+        await batch.commit()
+
+    async def commit_chunk(keys: List[str]) -> Dict[str, str]:
+        async with semaphore:
+            try:
+                await commit(keys)
+                return {key: "ok" for key in keys}
+            except Exception as e:
+                logger.error("Firestore batch of %d groups failed after %d attempts: %s", len(keys), retries, e)
+                return {key: f"failed: {e}" for key in keys}
+
+    status: Dict[str, str] = {}
+    for chunk_status in await asyncio.gather(*(commit_chunk(keys) for keys in chunk_groups(groups, max_ops))):
+        status.update(chunk_status)
+    return status
+
+
+def summarize_status(status: Dict[str, str]) -> dict:
+    """Counts for a commit_grouped_writes() result."""
+    failed = sum(1 for result in status.values() if result != "ok")
+    return {"posted": len(status) - failed, "failed": failed}
@@ -1,29 +1,67 @@
+from google.api_core.exceptions import AlreadyExists, NotFound
 from firestore.firebase_config import db
+from firestore.batch_writer import enrollment_chunks
 from firebase_admin import firestore  # for ArrayUnion and SERVER_TIMESTAMP
 
 def create_class(class_id: str, class_data: dict, teacher_uid: str, subject: str):
-    db.collection("classes").document(class_id).set({
+    """
+    Create the class and link it to its teacher in one atomic batch, without reads.
+    create() refuses to overwrite an existing class and its roster; update() fails
+    if the teacher has no profile. ArrayUnion lets concurrent class creations for
+    the same teacher merge instead of overwriting each other's teacherOf.
+    """
+    batch = db.batch()
+    batch.create(db.collection("classes").document(class_id), {
         **class_data,
         "students": [],
         "subjects": {subject: teacher_uid},
         "created_at": firestore.SERVER_TIMESTAMP,
     })
+    batch.update(db.collection("users").document(teacher_uid), {"teacherOf": firestore.ArrayUnion([class_id])})
+    try:
+        batch.commit()
+    except AlreadyExists:
+        raise ValueError("Class already exists") from None
+    except NotFound:
+        raise ValueError("Teacher not found") from None
 
-    teacher_ref = db.collection("users").document(teacher_uid)
-    teacher_doc = teacher_ref.get()
-    if teacher_doc.exists:
-        teacher_data = teacher_doc.to_dict()
-        teacher_classes = teacher_data.get("teacherOf", [])
-        if class_id not in teacher_classes:
-            teacher_classes.append(class_id)
-            teacher_ref.update({"teacherOf": teacher_classes})
+def _enrollment_batch(class_ref, class_id: str, student_ids: list):
+    batch = db.batch()
+    batch.update(class_ref, {"students": firestore.ArrayUnion(student_ids)})
+    for student_id in student_ids:
+        batch.update(db.collection("students").document(student_id),
+                     {"linked_classes": firestore.ArrayUnion([class_id])})
+    return batch
 
-def add_student_to_class(class_id: str, student_id: str):
+def enroll_students(class_id: str, student_ids: list) -> dict:
+    """
+    Add students to a class, one batch per 499 students (plus the class update).
+
+    update() only succeeds on existing documents, so nothing is read up front. If a
+    batch fails because a student does not exist, its documents are looked up with
+    a single get_all() and the batch is retried without the missing students.
+    Returns {"class_id", "enrolled": [...], "missing": [...]}.
+    """
     class_ref = db.collection("classes").document(class_id)
-    student_ref = db.collection("students").document(student_id)
+    enrolled, missing = [], []
+    for chunk in enrollment_chunks(student_ids):
+        try:
+            _enrollment_batch(class_ref, class_id, chunk).commit()
+            enrolled.extend(chunk)
+            continue
+        except NotFound:
+            pass
+        refs = [db.collection("students").document(student_id) for student_id in chunk]
+        existing = {snapshot.reference.path for snapshot in db.get_all([class_ref, *refs]) if snapshot.exists}
+        if class_ref.path not in existing:
+            raise ValueError("Class not found")
+        present = [ref.id for ref in refs if ref.path in existing]
+        missing.extend(ref.id for ref in refs if ref.path not in existing)
+        if present:
+            _enrollment_batch(class_ref, class_id, present).commit()
+            enrolled.extend(present)
+    return {"class_id": class_id, "enrolled": enrolled, "missing": missing}
 
-    if not class_ref.get().exists or not student_ref.get().exists:
+def add_student_to_class(class_id: str, student_id: str):
+    if enroll_students(class_id, [student_id])["missing"]:
         raise ValueError("Class or student not found")
-
-    class_ref.update({"students": firestore.ArrayUnion([student_id])})
-    student_ref.update({"linked_classes": firestore.ArrayUnion([class_id])})
@@ -112,34 +112,58 @@ from firestore.firebase_config import db
 
 
 
+from typing import Iterator, Optional, Sequence
 from firebase_admin import firestore
 from firestore.firebase_config import db
+from firestore.pagination import ORDER_FIELDS, Page, fetch_page, iter_documents
+from tools.utils.sync_engine import server_write
+
+# -------------------------------
+# Paginated per-user reads
+# -------------------------------
+def get_user_documents_page(collection: str, user_id: str, limit: int = 50, start_after: Optional[str] = None,
+                            fields: Optional[Sequence[str]] = None) -> Page:
+    ref = db.collection(collection)
+    return fetch_page(ref, ref.where("user_id", "==", user_id), ORDER_FIELDS[collection],
+                      limit=limit, start_after=start_after, fields=fields)
+
+def iter_user_documents(collection: str, user_id: str, fields: Optional[Sequence[str]] = None) -> Iterator[dict]:
+    query = db.collection(collection).where("user_id", "==", user_id)
+    return iter_documents(query, ORDER_FIELDS[collection], fields=fields)
 
 # -------------------------------
 # Lesson Planner Agent
 # -------------------------------
 def create_lesson_plan(user_id: str, plan_data: dict):
-    db.collection("lesson_plans").add({
+    db.collection("lesson_plans").add(server_write({
         **plan_data,
         "user_id": user_id,
         "created_at": firestore.SERVER_TIMESTAMP
-    })
+    }))
 
 def get_lesson_plans(user_id: str):
-    return [doc.to_dict() for doc in db.collection("lesson_plans").where("user_id", "==", user_id).stream()]
+    return list(iter_user_documents("lesson_plans", user_id))
+
+def get_lesson_plans_page(user_id: str, limit: int = 50, start_after: Optional[str] = None,
+                          fields: Optional[Sequence[str]] = None) -> Page:
+    return get_user_documents_page("lesson_plans", user_id, limit, start_after, fields)
 
 # -------------------------------
 # Story Teller Agent
 # -------------------------------
 def save_story(user_id: str, story_data: dict):
-    db.collection("stories").add({
+    db.collection("stories").add(server_write({
         **story_data,
         "user_id": user_id,
         "created_at": firestore.SERVER_TIMESTAMP
-    })
+    }))
 
 def get_stories(user_id: str):
-    return [doc.to_dict() for doc in db.collection("stories").where("user_id", "==", user_id).stream()]
+    return list(iter_user_documents("stories", user_id))
+
+def get_stories_page(user_id: str, limit: int = 50, start_after: Optional[str] = None,
+                     fields: Optional[Sequence[str]] = None) -> Page:
+    return get_user_documents_page("stories", user_id, limit, start_after, fields)
 
 # -------------------------------
 # Course Planner Agent
@@ -155,14 +179,18 @@ def save_course_plan(user_id: str, course_data: dict):
 # Quiz Agent
 # -------------------------------
 def save_quiz_result(user_id: str, quiz_data: dict):
-    db.collection("quiz_results").add({
+    db.collection("quiz_results").add(server_write({
         **quiz_data,
         "user_id": user_id,
         "submitted_at": firestore.SERVER_TIMESTAMP
-    })
+    }))
 
 def get_quiz_results(user_id: str):
-    return [doc.to_dict() for doc in db.collection("quiz_results").where("user_id", "==", user_id).stream()]
+    return list(iter_user_documents("quiz_results", user_id))
+
+def get_quiz_results_page(user_id: str, limit: int = 50, start_after: Optional[str] = None,
+                          fields: Optional[Sequence[str]] = None) -> Page:
+    return get_user_documents_page("quiz_results", user_id, limit, start_after, fields)
 
 # -------------------------------
 # Voice Tutor Agent
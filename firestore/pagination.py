@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+DESCENDING = "DESCENDING"
+DOCUMENT_ID = "__name__"
+
+# Timestamp each per-user collection is listed by (newest first)
+ORDER_FIELDS = {
+    "lesson_plans": "created_at",
+    "stories": "created_at",
+    "quiz_results": "submitted_at",
+}
+
+# Hard cap on a single page, whatever the caller asks for
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class Page:
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    # Document id of the last item; pass it back as `start_after` for the next page
+    next_cursor: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {"items": self.items, "next_cursor": self.next_cursor}
+
+
+def _ordered(query, order_field: str, fields: Optional[Sequence[str]]):
+    # Document id breaks ties between equal timestamps so cursors never skip or repeat.
+    # With the owner filter this needs the composite indexes in firestore.indexes.json.
+    query = query.order_by(order_field, direction=DESCENDING).order_by(DOCUMENT_ID, direction=DESCENDING)
+    if fields:
+        # start_after(snapshot) reads the order field from the snapshot, so keep it projected
+        query = query.select(list(dict.fromkeys([*fields, order_field])))
+    return query
+
+
+def _to_item(snapshot) -> Dict[str, Any]:
+    return {"id": snapshot.id, **(snapshot.to_dict() or {})}
+
+
+def _page(snapshots: list, limit: int) -> Page:
+    items = [_to_item(snapshot) for snapshot in snapshots[:limit]]
+    next_cursor = items[-1]["id"] if len(snapshots) > limit else None
+    return Page(items=items, next_cursor=next_cursor)
+
+
+def fetch_page(collection, query, order_field: str, limit: int = 50, start_after: Optional[str] = None,
+               fields: Optional[Sequence[str]] = None) -> Page:
+    """
+    One page of `query`, newest first by `order_field`.
+
+    `collection` is the collection the query runs on; it resolves the cursor (a
+    document id) into the snapshot Firestore's start_after() needs. `fields`
+    projects the documents with select(). Fetches limit + 1 documents to know
+    whether another page exists.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = _ordered(query, order_field, fields)
+    if start_after:
+        cursor = collection.document(start_after).get()
+        if not cursor.exists:
+            raise ValueError(f"Unknown cursor: {start_after}")
+        query = query.start_after(cursor)
+    return _page(list(query.limit(limit + 1).stream()), limit)
+
+
+async def afetch_page(collection, query, order_field: str, limit: int = 50, start_after: Optional[str] = None,
+                      fields: Optional[Sequence[str]] = None) -> Page:
+    """fetch_page() for firestore.AsyncClient queries."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = _ordered(query, order_field, fields)
+    if start_after:
+        cursor = await collection.document(start_after).get()
+        if not cursor.exists:
+            raise ValueError(f"Unknown cursor: {start_after}")
+        query = query.start_after(cursor)
+    return _page([snapshot async for snapshot in query.limit(limit + 1).stream()], limit)
+
+
+def iter_documents(query, order_field: str, fields: Optional[Sequence[str]] = None,
+                   page_size: int = 200) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every document of `query`, newest first, `page_size` at a time, so at
+    most one page is held in memory. Continues from the last snapshot of the
+    previous page, without the extra cursor read fetch_page() needs.
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    ordered = _ordered(query, order_field, fields)
+    last = None
+    while True:
+        page_query = ordered.start_after(last) if last is not None else ordered
+        snapshots = list(page_query.limit(page_size).stream())
+        for snapshot in snapshots:
+            yield _to_item(snapshot)
+        if len(snapshots) < page_size:
+            return
+        last = snapshots[-1]
+
+
+async def aiter_documents(query, order_field: str, fields: Optional[Sequence[str]] = None,
+                          page_size: int = 200) -> AsyncIterator[Dict[str, Any]]:
+    """iter_documents() for firestore.AsyncClient queries."""
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    ordered = _ordered(query, order_field, fields)
+    last = None
+    while True:
+        page_query = ordered.start_after(last) if last is not None else ordered
+        snapshots = [snapshot async for snapshot in page_query.limit(page_size).stream()]
+        for snapshot in snapshots:
+            yield _to_item(snapshot)
+        if len(snapshots) < page_size:
+            return
+        last = snapshots[-1]
@@ -1,22 +1,22 @@
+import uuid
 from firestore.firebase_config import db
-from datetime import datetime
+from firestore.batch_writer import commit_grouped_writes, quiz_result_writes, summarize_status
 
-def post_quiz_result(teacher_uid: str, class_id: str, subject: str, quiz_data: dict):
-    class_doc = db.collection("classes").document(class_id).get()
+def post_quiz_result(teacher_uid: str, class_id: str, subject: str, quiz_data: dict) -> dict:
+    """
+    Post a quiz to every student of a class.
+
+    Each student's entry is written to `quiz_results` and `classes/{id}/quiz_results`
+    in the same batch, under the id "<quiz_id>_<student_id>" so retried batches
+    overwrite instead of duplicating. Returns the quiz id and per-student status.
+    """
+    class_ref = db.collection("classes").document(class_id)
+    class_doc = class_ref.get()
     if not class_doc.exists:
         raise ValueError("Class does not exist")
 
     student_ids = class_doc.to_dict().get("students", [])
-
-    for student_id in student_ids:
-        quiz_entry = {
-            **quiz_data,
-            "timestamp": datetime.utcnow(),
-            "subject": subject,
-            "class_id": class_id,
-            "student_id": student_id,
-            "teacher_id": teacher_uid
-        }
-
-        db.collection("quiz_results").add(quiz_entry)
-        db.collection("classes").document(class_id).collection("quiz_results").add(quiz_entry)
+    quiz_id = uuid.uuid4().hex
+    writes = quiz_result_writes(db, class_ref, class_id, student_ids, teacher_uid, subject, quiz_id, quiz_data)
+    status = commit_grouped_writes(db, writes)
+    return {"quiz_id": quiz_id, "students": status, **summarize_status(status)}
@@ -0,0 +1,323 @@
+"""
+In-memory stand-in for the parts of the Firestore client the backend uses, in
+the spirit of the Firestore emulator: collections, comparison filters and
+order_by on (dotted) field paths, select, limit, start_after cursors, batches,
+merge writes and optional per-RPC latency.
+AsyncFakeFirestore mirrors firestore.AsyncClient on the same data model.
+Used by tests and benchmarks; never imported by the application.
+"""
+import asyncio
+import copy
+import operator
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+DOCUMENT_ID = "__name__"
+
+
+_OPERATORS = {"==": operator.eq, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+_MISSING = object()
+
+
+def _lookup(data: Optional[dict], path: str):
+    value = data
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _apply(existing: Optional[dict], data: dict, merge: bool = False) -> dict:
+    """
+    Write `data` over `existing` like the server: SERVER_TIMESTAMP, ArrayUnion and
+    DELETE_FIELD are resolved, and with `merge` nested maps are merged, not replaced.
+    """
+    merged = dict(existing or {})
+    for field, value in data.items():
+        if value is transforms.DELETE_FIELD:
+            merged.pop(field, None)
+            continue
+        if value is transforms.SERVER_TIMESTAMP:
+            value = datetime.now(timezone.utc)
+        elif isinstance(value, transforms.ArrayUnion):
+            current = list(merged.get(field) or [])
+            value = current + [item for item in value.values if item not in current]
+        elif isinstance(value, dict):
+            current = merged.get(field) if merge and isinstance(merged.get(field), dict) else None
+            value = _apply(current, value, merge)
+        else:
+            value = copy.deepcopy(value)
+        merged[field] = value
+    return merged
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocument", data: Optional[dict]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def get(self, field: str):
+        if field == DOCUMENT_ID:
+            return self.id
+        value = _lookup(self._data, field)
+        return None if value is _MISSING else value
+
+    def to_dict(self) -> Optional[dict]:
+        return copy.deepcopy(self._data)
+
+
+class FakeDocument:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self.client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def get(self) -> FakeSnapshot:
+        self.client._rpc()
+        return FakeSnapshot(self, self.client._docs.get(self.path))
+
+    def set(self, data: dict, merge: bool = False):
+        self.client._rpc()
+        self.client._docs[self.path] = _apply(self.client._docs.get(self.path) if merge else None, data, merge)
+
+    def update(self, data: dict):
+        self.client._rpc()
+        if self.path not in self.client._docs:
+            raise NotFound(f"No document to update: {self.path}")
+        self.client._docs[self.path] = _apply(self.client._docs[self.path], data)
+
+    def delete(self):
+        self.client._rpc()
+        self.client._docs.pop(self.path, None)
+
+    def collection(self, name: str) -> "FakeQuery":
+        return self.client.query_class(self.client, f"{self.path}/{name}")
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeFirestore", collection_path: str, filters=(), orders=(),
+                 fields=None, limit_to=None, cursor=None):
+        self.client = client
+        self.collection_path = collection_path
+        self.filters = list(filters)
+        self.orders = list(orders)
+        self.fields = fields
+        self.limit_to = limit_to
+        self.cursor = cursor
+
+    def _copy(self, **changes) -> "FakeQuery":
+        state = dict(filters=self.filters, orders=self.orders, fields=self.fields,
+                     limit_to=self.limit_to, cursor=self.cursor)
+        state.update(changes)
+        return type(self)(self.client, self.collection_path, **state)
+
+    # Collection-reference API
+    def document(self, doc_id: Optional[str] = None) -> FakeDocument:
+        return self.client.document_class(self.client, f"{self.collection_path}/{doc_id or uuid.uuid4().hex}")
+
+    def add(self, data: dict):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    # Query API
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        if op not in _OPERATORS:
+            raise NotImplementedError(f"FakeQuery does not support {op!r} filters")
+        return self._copy(filters=self.filters + [(field, _OPERATORS[op], value)])
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self._copy(orders=self.orders + [(field, direction == "DESCENDING")])
+
+    def select(self, fields: List[str]) -> "FakeQuery":
+        return self._copy(fields=list(fields))
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(limit_to=count)
+
+    def start_after(self, snapshot: FakeSnapshot) -> "FakeQuery":
+        return self._copy(cursor=snapshot)
+
+    def _sort_key(self, snapshot: FakeSnapshot):
+        return tuple(snapshot.get(field) for field, _ in self.orders)
+
+    def _results(self) -> List[FakeSnapshot]:
+        prefix = self.collection_path + "/"
+        snapshots = [
+            FakeSnapshot(self.client.document_class(self.client, path), data)
+            for path, data in self.client._docs.items()
+            if path.startswith(prefix) and "/" not in path[len(prefix):]
+            and all(_lookup(data, field) is not _MISSING and compare(_lookup(data, field), value)
+                    for field, compare, value in self.filters)
+            # Like Firestore, ordering on a field leaves out documents without it
+            and all(field == DOCUMENT_ID or _lookup(data, field) is not _MISSING for field, _ in self.orders)
+        ]
+        for field, descending in reversed(self.orders):
+            snapshots.sort(key=lambda s: s.get(field), reverse=descending)
+        if self.cursor is not None:
+            cursor_key = self._sort_key(self.cursor)
+
+            def after_cursor(snapshot):
+                for (field, descending), value, cursor_value in zip(self.orders, self._sort_key(snapshot), cursor_key):
+                    if value != cursor_value:
+                        return value < cursor_value if descending else value > cursor_value
+                return False
+
+            snapshots = [s for s in snapshots if after_cursor(s)]
+        if self.limit_to is not None:
+            snapshots = snapshots[: self.limit_to]
+        self.client.documents_read += len(snapshots)
+        if self.fields is not None:
+            snapshots = [
+                FakeSnapshot(s.reference, {field: s._data[field] for field in self.fields if field in s._data})
+                for s in snapshots
+            ]
+        return snapshots
+
+    def stream(self):
+        self.client._rpc()
+        for snapshot in self._results():
+            time.sleep(self.client.per_document_latency)
+            yield snapshot
+
+
+class FakeBatch:
+    """Writes are checked and applied together: a failed precondition aborts the whole batch."""
+
+    def __init__(self, client: "FakeFirestore"):
+        self.client = client
+        self._writes = []
+
+    def set(self, ref: FakeDocument, data: dict, merge: bool = False):
+        self._writes.append(("merge" if merge else "set", ref.path, data))
+
+    def create(self, ref: FakeDocument, data: dict):
+        self._writes.append(("create", ref.path, data))
+
+    def update(self, ref: FakeDocument, data: dict):
+        self._writes.append(("update", ref.path, data))
+
+    def _apply_writes(self):
+        docs = dict(self.client._docs)
+        for op, path, data in self._writes:
+            if op == "create" and path in docs:
+                raise AlreadyExists(f"Document already exists: {path}")
+            if op == "update" and path not in docs:
+                raise NotFound(f"No document to update: {path}")
+            docs[path] = _apply(docs.get(path) if op in ("update", "merge") else None, data, op == "merge")
+        self.client._docs.clear()
+        self.client._docs.update(docs)
+
+    def commit(self):
+        self.client._rpc()
+        self._apply_writes()
+
+
+class FakeFirestore:
+    document_class = FakeDocument
+    query_class = FakeQuery
+    batch_class = FakeBatch
+
+    def __init__(self, rpc_latency: float = 0.0, per_document_latency: float = 0.0):
+        self.rpc_latency = rpc_latency
+        self.per_document_latency = per_document_latency
+        self._docs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.rpcs = 0
+        self.documents_read = 0
+
+    def _rpc(self):
+        with self._lock:
+            self.rpcs += 1
+        if self.rpc_latency:
+            time.sleep(self.rpc_latency)
+
+    def collection(self, name: str) -> FakeQuery:
+        return self.query_class(self, name)
+
+    def batch(self) -> FakeBatch:
+        return self.batch_class(self)
+
+    def get_all(self, references):
+        self._rpc()
+        for ref in references:
+            yield FakeSnapshot(ref, self._docs.get(ref.path))
+
+
+class AsyncFakeDocument(FakeDocument):
+    async def get(self) -> FakeSnapshot:
+        await self.client._arpc()
+        return FakeSnapshot(self, self.client._docs.get(self.path))
+
+    async def set(self, data: dict, merge: bool = False):
+        await self.client._arpc()
+        self.client._docs[self.path] = _apply(self.client._docs.get(self.path) if merge else None, data, merge)
+
+    async def update(self, data: dict):
+        await self.client._arpc()
+        if self.path not in self.client._docs:
+            raise NotFound(f"No document to update: {self.path}")
+        self.client._docs[self.path] = _apply(self.client._docs[self.path], data)
+
+    async def delete(self):
+        await self.client._arpc()
+        self.client._docs.pop(self.path, None)
+
+
+class AsyncFakeQuery(FakeQuery):
+    async def add(self, data: dict):
+        ref = self.document()
+        await ref.set(data)
+        return None, ref
+
+    async def stream(self):
+        await self.client._arpc()
+        for snapshot in self._results():
+            if self.client.per_document_latency:
+                await asyncio.sleep(self.client.per_document_latency)
+            yield snapshot
+
+
+class AsyncFakeBatch(FakeBatch):
+    async def commit(self):
+        await self.client._arpc()
+        self._apply_writes()
+
+
+class AsyncFakeFirestore(FakeFirestore):
+    """Latency is awaited rather than slept, like a real AsyncClient waiting on gRPC."""
+    document_class = AsyncFakeDocument
+    query_class = AsyncFakeQuery
+    batch_class = AsyncFakeBatch
+
+    def __init__(self, rpc_latency: float = 0.0, per_document_latency: float = 0.0):
+        super().__init__(rpc_latency, per_document_latency)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_all(self, references):
+        await self._arpc()
+        for ref in references:
+            yield FakeSnapshot(ref, self._docs.get(ref.path))
+
+    async def _arpc(self):
+        self.rpcs += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.rpc_latency:
+                await asyncio.sleep(self.rpc_latency)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from llms.llm_config import custom_llm_config
+from llms.response_cache import chunk_text, render_prompt
+from tools.utils.metrics import record_llm_usage, span
+from tools.utils.retry_handler import RetryPolicy, acall_with_retry, call_with_retry, get_breaker
+
+# Gemini calls retry 429/503/timeouts only; see tools/utils/retry_handler.py
+GEMINI_UPSTREAM = "gemini"
+GEMINI_RETRY = RetryPolicy(retries=3, delay=1.0, max_delay=20.0)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_model(model: str) -> str:
+    """'gemini-2.5-pro' and 'models/gemini-2.5-pro' are the same Gemini model."""
+    return model if model.startswith("models/") else f"models/{model}"
+
+
+def _percentile(samples, fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ModelGate:
+    """
+    In-flight cap and latency metrics for one model.
+
+    Usable from worker threads (`hold()`) and from the event loop (`ahold()`); async
+    waiters get a future resolved on release instead of parking a thread.
+    """
+
+    LATENCY_WINDOW = 500
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._async_waiters: deque = deque()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self._latencies: deque = deque(maxlen=self.LATENCY_WINDOW)
+
+    def _take(self):
+        self.in_flight += 1
+        self.requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def acquire(self):
+        with self._cond:
+            if self.in_flight >= self.limit:
+                self.waiting += 1
+                while self.in_flight >= self.limit:
+                    self._cond.wait()
+                self.waiting -= 1
+            self._take()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < self.limit and not self._async_waiters:
+                self._take()
+                return
+            waiter = {"loop": loop, "future": loop.create_future(), "granted": False}
+            self._async_waiters.append(waiter)
+            self.waiting += 1
+        try:
+            await waiter["future"]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter["granted"]:
+                    # The slot was handed over just before cancellation; pass it on
+                    self.requests -= 1
+                    self._free_slot()
+                else:
+                    self._async_waiters.remove(waiter)
+                    self.waiting -= 1
+            raise
+
+    def release(self, latency: Optional[float], failed: bool = False):
+        with self._lock:
+            if latency is not None:
+                self.total_latency += latency
+                self._latencies.append(latency)
+            if failed:
+                self.errors += 1
+            self._free_slot()
+
+    def _free_slot(self):
+        self.in_flight -= 1
+        # Async waiters queue without holding a thread, so they are served first
+        if self._async_waiters:
+            waiter = self._async_waiters.popleft()
+            self.waiting -= 1
+            waiter["granted"] = True
+            self._take()
+            waiter["loop"].call_soon_threadsafe(_resolve_future, waiter["future"])
+        else:
+            self._cond.notify()
+
+    @contextmanager
+    def hold(self):
+        self.acquire()
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(time.perf_counter() - started, failed)
+
+    @asynccontextmanager
+    async def ahold(self):
+        await self.aacquire()
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(time.perf_counter() - started, failed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            completed = self.requests - self.in_flight
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "waiting": self.waiting,
+                "requests": self.requests,
+                "errors": self.errors,
+                "avg_latency": self.total_latency / completed if completed else None,
+                "p50_latency": _percentile(latencies, 0.50),
+                "p95_latency": _percentile(latencies, 0.95),
+            }
+
+
+def _resolve_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class PooledLLM:
+    """
+    Shared chat client for one (model, temperature, max_tokens) configuration.
+
+    Calls go through the model's gate; every other attribute (model, temperature,
+    ...) is read from the wrapped client, so the response cache keys stay the same.
+    Transient failures are retried with GEMINI_RETRY outside the gate, so a
+    backoff does not hold an in-flight slot; streams are not retried, but all
+    calls feed the Gemini circuit breaker.
+    """
+
+    def __init__(self, client: Any, gate: ModelGate):
+        self.client = client
+        self.gate = gate
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _invoke(self, method: str, *args, **kwargs):
+        with self.gate.hold():
+            return getattr(self.client, method)(*args, **kwargs)
+
+    async def _ainvoke(self, *args, **kwargs):
+        async with self.gate.ahold():
+            return await self.client.ainvoke(*args, **kwargs)
+
+    @property
+    def model_label(self) -> str:
+        return str(getattr(self.client, "model", type(self.client).__name__))
+
+    def _call(self, method: str, prompt, *args, **kwargs):
+        with span("llm", self.model_label):
+            result = call_with_retry(self._invoke, method, prompt, *args, policy=GEMINI_RETRY,
+                                     upstream=GEMINI_UPSTREAM, **kwargs)
+            record_llm_usage(self.model_label, render_prompt(prompt), result)
+            return result
+
+    def invoke(self, prompt, *args, **kwargs):
+        return self._call("invoke", prompt, *args, **kwargs)
+
+    def predict(self, prompt, *args, **kwargs):
+        return self._call("predict", prompt, *args, **kwargs)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        with span("llm", self.model_label):
+            result = await acall_with_retry(self._ainvoke, prompt, *args, policy=GEMINI_RETRY,
+                                            upstream=GEMINI_UPSTREAM, **kwargs)
+            record_llm_usage(self.model_label, render_prompt(prompt), result)
+            return result
+
+    def stream(self, prompt, *args, **kwargs):
+        parts = []
+        with span("llm", self.model_label, activate=False) as current:
+            with get_breaker(GEMINI_UPSTREAM).guard(), self.gate.hold():
+                for chunk in self.client.stream(prompt, *args, **kwargs):
+                    parts.append(chunk_text(chunk))
+                    yield chunk
+            record_llm_usage(self.model_label, render_prompt(prompt), response_text="".join(parts), target=current)
+
+    async def astream(self, prompt, *args, **kwargs):
+        parts = []
+        with span("llm", self.model_label, activate=False) as current:
+            with get_breaker(GEMINI_UPSTREAM).guard():
+                async with self.gate.ahold():
+                    async for chunk in self.client.astream(prompt, *args, **kwargs):
+                        parts.append(chunk_text(chunk))
+                        yield chunk
+            record_llm_usage(self.model_label, render_prompt(prompt), response_text="".join(parts), target=current)
+
+
+def _default_factory(model: str, temperature: float, max_tokens: Optional[int]) -> Any:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    kwargs = {
+        "model": model,
+        "temperature": temperature,
+        "google_api_key": os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY"),
+        "convert_system_message_to_human": True,
+    }
+    if max_tokens is not None:
+        kwargs["max_output_tokens"] = max_tokens
+    return ChatGoogleGenerativeAI(**kwargs)
+
+
+class LLMClientPool:
+    """
+    Process-wide pool of chat clients keyed by (model, temperature, max_tokens).
+
+    Building a ChatGoogleGenerativeAI calls genai.configure(), which resets the
+    google-generativeai client and its connections; sharing one client per
+    configuration keeps connections alive across tools and agents. In-flight
+    requests are capped per model (across temperatures), to stay within quota.
+    """
+
+    def __init__(self, default_model: str = "models/gemini-2.5-pro", default_temperature: float = 0.6,
+                 max_in_flight: int = 8, model_limits: Optional[Dict[str, int]] = None,
+                 factory: Callable[[str, float, Optional[int]], Any] = _default_factory):
+        self.default_model = normalize_model(default_model)
+        self.default_temperature = default_temperature
+        self.max_in_flight = max_in_flight
+        self.model_limits = {normalize_model(m): limit for m, limit in (model_limits or {}).items()}
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, float, Optional[int]], PooledLLM] = {}
+        self._gates: Dict[str, ModelGate] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "LLMClientPool":
+        return cls(
+            default_model=config.get("model", "models/gemini-2.5-pro"),
+            default_temperature=config.get("temperature", 0.6),
+            max_in_flight=config.get("max_in_flight_per_model", 8),
+            model_limits=config.get("max_in_flight_overrides"),
+        )
+
+    def gate_for(self, model: str) -> ModelGate:
+        model = normalize_model(model)
+        with self._lock:
+            gate = self._gates.get(model)
+            if gate is None:
+                gate = self._gates[model] = ModelGate(self.model_limits.get(model, self.max_in_flight))
+            return gate
+
+    def get(self, model: Optional[str] = None, temperature: Optional[float] = None,
+            max_tokens: Optional[int] = None) -> PooledLLM:
+        model = normalize_model(model or self.default_model)
+        temperature = self.default_temperature if temperature is None else temperature
+        key = (model, float(temperature), max_tokens)
+        with self._lock:
+            client = self._clients.get(key)
+        if client is not None:
+            return client
+        gate = self.gate_for(model)
+        with self._lock:
+            # Build under the lock: concurrent first calls must not create two clients
+            client = self._clients.get(key)
+            if client is None:
+                client = PooledLLM(self.factory(model, temperature, max_tokens), gate)
+                self._clients[key] = client
+                logger.info("Created pooled LLM client model=%s temperature=%s max_tokens=%s",
+                            model, temperature, max_tokens)
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            gates = dict(self._gates)
+            clients = list(self._clients)
+        return {
+            "clients": len(clients),
+            "models": {
+                model: dict(gate.stats(), clients=sum(1 for key in clients if key[0] == model))
+                for model, gate in gates.items()
+            },
+        }
+
+
+llm_pool = LLMClientPool.from_config(custom_llm_config)
+
+
+def get_llm(model: Optional[str] = None, temperature: Optional[float] = None,
+            max_tokens: Optional[int] = None) -> PooledLLM:
+    """Shared client from the process-wide pool."""
+    return llm_pool.get(model, temperature, max_tokens)
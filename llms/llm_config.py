@@ -7,6 +7,12 @@ custom_llm_config = {
     "streaming": False,
     "timeout": 60,
     "use_cache": True,
+    "cache_path": "cache/llm_responses.sqlite3",
+    "cache_ttl_seconds": 7 * 24 * 3600,
+    "cache_max_memory_entries": 512,
+    "cache_max_disk_mb": 256,
+    "max_in_flight_per_model": 8,
+    "max_in_flight_overrides": {},
     "num_beams": 1,
     "early_stopping": False
-}
\ No newline at end of file
+}
@@ -0,0 +1,297 @@
+"""
+Content-addressed cache for LLM responses shared by the generation tools.
+
+Responses are keyed on (model, temperature, sha256 of the rendered prompt) and kept in
+two tiers: an in-process LRU and an on-disk SQLite table with TTL and size-based
+eviction. Tools opt in with a `use_cache` class attribute; the whole cache is switched
+by `use_cache` in llms/llm_config.py.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Optional
+
+from llms.llm_config import custom_llm_config
+from tools.utils.metrics import annotate
+
+logger = logging.getLogger(__name__)
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def is_json_response(text: str) -> bool:
+    """True if the text (optionally wrapped in ``` fences) parses as JSON."""
+    try:
+        json.loads(_FENCE_RE.sub("", text.strip()))
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def render_prompt(prompt: Any) -> str:
+    """Stable text form of a prompt: a string or a list of chat messages."""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return "\n".join(f"{getattr(m, 'type', 'human')}: {getattr(m, 'content', m)}" for m in prompt)
+    return str(prompt)
+
+
+class CachedResponse:
+    """Minimal stand-in for an AIMessage so tools can read `.content` on a hit."""
+
+    def __init__(self, content: str):
+        self.content = content
+
+    def __repr__(self):
+        return f"CachedResponse(content={self.content[:40]!r})"
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 512,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 3600,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._clock = clock
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_bytes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0, "expired": 0}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "LLMResponseCache":
+        return cls(
+            path=config.get("cache_path"),
+            max_memory_entries=config.get("cache_max_memory_entries", 512),
+            max_disk_bytes=int(config.get("cache_max_disk_mb", 256) * 1024 * 1024),
+            ttl_seconds=config.get("cache_ttl_seconds", 7 * 24 * 3600),
+            enabled=config.get("use_cache", False),
+        )
+
+    # ---------------- keys ----------------
+
+    @staticmethod
+    def make_key(model: Any, temperature: Any, prompt: Any) -> str:
+        prompt_hash = hashlib.sha256(render_prompt(prompt).encode("utf-8")).hexdigest()
+        return hashlib.sha256(json.dumps([str(model), temperature, prompt_hash]).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def key_for(cls, llm: Any, prompt: Any) -> str:
+        return cls.make_key(getattr(llm, "model", type(llm).__name__), getattr(llm, "temperature", None), prompt)
+
+    # ---------------- disk tier ----------------
+
+    def _db(self):
+        if self._conn is None and self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                " key TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses(last_access)")
+            row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+            self._disk_bytes = row[0]
+        return self._conn
+
+    def _evict_disk(self, conn):
+        target = int(self.max_disk_bytes * 0.9)
+        rows = conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if self._disk_bytes <= target:
+                break
+            conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._disk_bytes -= size
+            self._stats["evictions"] += 1
+
+    # ---------------- public API ----------------
+
+    def get(self, key: str) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                content, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return content
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            conn = self._db()
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT content, size, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    content, size, created_at = row
+                    if now - created_at <= self.ttl_seconds:
+                        conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+                        self._remember(key, content, created_at)
+                        self._stats["disk_hits"] += 1
+                        return content
+                    conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._disk_bytes -= size
+                    self._stats["expired"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, content: str):
+        now = self._clock()
+        with self._lock:
+            self._remember(key, content, now)
+            self._stats["writes"] += 1
+            conn = self._db()
+            if conn is None:
+                return
+            size = len(content.encode("utf-8"))
+            previous = conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, content, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, content, size, now, now),
+            )
+            self._disk_bytes += size - (previous[0] if previous else 0)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk(conn)
+
+    def _remember(self, key: str, content: str, created_at: float):
+        self._memory[key] = (content, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._db()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_responses")
+                self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hits": hits,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "enabled": self.enabled,
+            }
+
+
+llm_cache = LLMResponseCache.from_config(custom_llm_config)
+
+
+async def _aget(cache: LLMResponseCache, key: str) -> Optional[str]:
+    # A lookup may read SQLite; keep that off the event loop. Memory-only caches stay inline.
+    return await asyncio.to_thread(cache.get, key) if cache.path else cache.get(key)
+
+
+async def _aset(cache: LLMResponseCache, key: str, content: str):
+    if cache.path:
+        await asyncio.to_thread(cache.set, key, content)
+    else:
+        cache.set(key, content)
+
+
+def cached_invoke(llm, prompt, enabled: bool = True, is_valid: Callable[[str], bool] = is_json_response,
+                  cache: Optional[LLMResponseCache] = None):
+    """
+    llm.invoke(prompt) through the response cache. Only responses accepted by
+    `is_valid` are stored, so a malformed generation is never replayed.
+    """
+    cache = cache or llm_cache
+    if not (enabled and cache.enabled):
+        return llm.invoke(prompt)
+    key = cache.key_for(llm, prompt)
+    content = cache.get(key)
+    annotate(cache_hit=content is not None)
+    if content is not None:
+        return CachedResponse(content)
+    result = llm.invoke(prompt)
+    content = str(getattr(result, "content", result))
+    if is_valid(content):
+        cache.set(key, content)
+    return result
+
+
+async def cached_ainvoke(llm, prompt, enabled: bool = True, is_valid: Callable[[str], bool] = is_json_response,
+                         cache: Optional[LLMResponseCache] = None):
+    """Async version of cached_invoke() built on llm.ainvoke."""
+    cache = cache or llm_cache
+    if not (enabled and cache.enabled):
+        return await llm.ainvoke(prompt)
+    key = cache.key_for(llm, prompt)
+    content = await _aget(cache, key)
+    annotate(cache_hit=content is not None)
+    if content is not None:
+        return CachedResponse(content)
+    result = await llm.ainvoke(prompt)
+    content = str(getattr(result, "content", result))
+    if is_valid(content):
+        await _aset(cache, key, content)
+    return result
+
+
+def chunk_text(chunk) -> str:
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, list):  # Gemini may stream a message as a list of parts
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return str(content)
+
+
+async def cached_astream(llm, prompt, enabled: bool = True, is_valid: Callable[[str], bool] = is_json_response,
+                         cache: Optional[LLMResponseCache] = None) -> AsyncIterator[str]:
+    """
+    Text chunks of llm.astream(prompt) through the response cache. A hit is
+    replayed as a single chunk; a streamed response is stored once it has been
+    read to the end and `is_valid` accepts it.
+    """
+    cache = cache or llm_cache
+    enabled = enabled and cache.enabled
+    if enabled:
+        key = cache.key_for(llm, prompt)
+        content = await _aget(cache, key)
+        annotate(cache_hit=content is not None)
+        if content is not None:
+            yield content
+            return
+    parts = []
+    async for chunk in llm.astream(prompt):
+        text = chunk_text(chunk)
+        if text:
+            parts.append(text)
+            yield text
+    if enabled:
+        content = "".join(parts)
+        if is_valid(content):
+            await _aset(cache, key, content)
@@ -6,18 +6,20 @@ import sys
 import signal
 import time
 import asyncio
+import json
 import logging
 from fastapi import FastAPI, Request, HTTPException, Depends, status, APIRouter
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from pydantic import BaseModel, Field, field_validator # Using Pydantic v2
-from typing import Optional, Dict, AsyncIterator # Import AsyncIterator
+from pydantic import AnyHttpUrl, BaseModel, Field, field_validator # Using Pydantic v2
+from typing import Optional, Dict, List, AsyncIterator # Import AsyncIterator
 from functools import wraps
 import structlog
 import traceback
 from contextlib import asynccontextmanager
 from users import router as user_router
+from auth import role_from_authorization
 from fastapi.middleware.cors import CORSMiddleware
 
 # Logging setup (moved up to be available early)
@@ -29,28 +31,50 @@ logging.basicConfig(
 logger = structlog.get_logger("vidyavahini_main")
 
  
-from agents.lesson_planner_agent import lesson_planner_agent
-from agents.story_teller_agent import story_teller_agent
-from agents.quiz_agent import quiz_agent
-from agents.sync_agent import sync_agent
-from agents.course_planner_agent import course_planner_agent
-from agents.ask_me_agent import ask_me_agent
-from agents.teacher_dashboard_agent import teacher_dashboard_agent
-from agents.voice_tutor_agent import voice_tutor_agent
-from agents.student_level_analytics_agent import student_level_analytics_agent
-from agents.visual_agent import visual_agent
-from agents.multimodal_research_agent import multimodal_research_agent
-from agents.predictive_analytics_agent import predictive_analytics_agent
-from agents.gamification_agent import gamification_agent
-from agents.content_creator_agent import content_creator_agent
-
-from crewflows import Crew
-from crewflows.memory.local_memory_handler import LocalMemoryHandler
+from crewflows import AgentRegistry, Crew, SingleFlight
+from crewflows.single_flight import make_key as single_flight_key
+from crewflows.jobs import JobQueue, JobQueueFull, UnsafeWebhookURL, check_webhook_url
+from crewflows.memory.log_memory_handler import LogMemoryHandler
 from llms.llm_config import custom_llm_config
+from llms.response_cache import llm_cache
+from llms.client_pool import llm_pool
+from rate_limit import RateLimit, RateLimiter
+from tools.utils.prompt_registry import prompt_registry
+from tools.utils.retry_handler import breaker_stats, retry_budget
+from sarvam_client import aclose_translator
+from tools.utils import metrics
 from routes.firestore_routes import router as firestore_router
-from firestore.user_utils import register_user
-from firestore.class_utils import create_class, add_student_to_class
-from firestore.quiz_utils import post_quiz_result
+from firestore.async_repository import (
+    register_user, create_class, add_student_to_class, enroll_students, post_quiz_result
+)
+
+# Agents are built on first use: importing an agent module creates its LLM,
+# TTS, Firebase and memory clients, which made every cold start pay for all 14.
+agent_registry = AgentRegistry()
+for _endpoint in (
+    "lesson_planner",
+    "story_teller",
+    "quiz",
+    "sync",
+    "course_planner",
+    "ask_me",
+    "teacher_dashboard",
+    "voice_tutor",
+    "student_level_analytics",
+    "content_creator",
+    "gamification",
+    "multimodal_research",
+    "predictive_analytics",
+    "visual",
+):
+    agent_registry.register(_endpoint, f"agents.{_endpoint}_agent:{_endpoint}_agent")
+
+# Identical concurrent requests to one agent endpoint (a class opening the same quiz)
+# share a single agent call; SINGLE_FLIGHT=0 turns this off
+single_flight = SingleFlight(enabled=os.getenv("SINGLE_FLIGHT", "1") != "0")
+
+# Comma-separated endpoint names to build in the background at startup ("all" for every agent)
+WARM_AGENTS = [name.strip() for name in os.getenv("VIDYAVAHINI_WARM_AGENTS", "").split(",") if name.strip()]
 
 
 
@@ -68,9 +92,8 @@ if not google_api_key:
     raise ValueError("GOOGLE_API_KEY is not set in environment variables!")
 
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-llm = ChatGoogleGenerativeAI(google_api_key=google_api_key, model="models/gemini-2.5-pro") # Remove convert_system_message_to_human
+# Agents build their own Gemini clients when the registry first loads them;
+# main.py no longer imports langchain_google_genai at startup.
 
 # SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
 # if not SARVAM_API_KEY:
@@ -81,11 +104,22 @@ llm = ChatGoogleGenerativeAI(google_api_key=google_api_key, model="models/gemini
 async def lifespan(app: FastAPI):
     # Startup logic
     logger.info("FastAPI lifespan startup event triggered. Initializing resources...")
-    # Add any startup code here
+    # Compile every prompt once and report placeholders no tool fills
+    prompt_registry.check()
+    warm_up_task = None
+    if WARM_AGENTS:
+        names = None if WARM_AGENTS == ["all"] else WARM_AGENTS
+        # Warm up in the background so /health answers while agents are being built
+        warm_up_task = asyncio.create_task(agent_registry.awarm_up(names))
+    # Background crew runs (/api/jobs); unfinished jobs in the store are picked up and rerun
+    await job_queue.start()
     yield
     # Shutdown logic
     logger.info("FastAPI lifespan shutdown event triggered. Cleaning up resources...")
-    # Add any shutdown code here
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    await job_queue.stop()
+    await aclose_translator()
     await asyncio.sleep(0.1)
 
 # Initialize FastAPI app once here
@@ -108,6 +142,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Upstream retries (Gemini, TTS, Sarvam) made while serving one request share this budget,
+# so a degraded upstream cannot turn one /api/run into dozens of calls
+REQUEST_RETRY_BUDGET = int(os.getenv("REQUEST_RETRY_BUDGET", "6"))
+
+@app.middleware("http")
+async def request_retry_budget(request: Request, call_next):
+    with retry_budget(REQUEST_RETRY_BUDGET):
+        return await call_next(request)
+
+async def end_span_after_body(body_iterator, end):
+    """Pass the body through and end the request span once it has been sent (or the client went away)."""
+    error = None
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        end(error)
+
+# Every request is the root span of the agent, tool, LLM and Firestore spans it starts
+@app.middleware("http")
+async def request_span(request: Request, call_next):
+    current, end = metrics.start_span("request", request.method)
+    try:
+        with metrics.use_span(current):
+            response = await call_next(request)
+    except BaseException as exc:
+        end(exc)
+        raise
+    route = request.scope.get("route")
+    # The route template, not the path, keeps the label set bounded
+    current.name = f"{request.method} {getattr(route, 'path', 'unmatched')}"
+    current.set_attribute("status_code", response.status_code)
+    # call_next returns once the headers are ready; SSE, NDJSON and audio bodies
+    # are still being generated, so the span ends with the body, not here
+    response.body_iterator = end_span_after_body(response.body_iterator, end)
+    return response
+
 # Include your routes after app is created
 from routes import translate_routes
 app.include_router(translate_routes.router, prefix="/api/translate")
@@ -174,6 +248,10 @@ class AddStudent(BaseModel):
     class_id: str
     student_id: str
 
+class ClassEnroll(BaseModel):
+    class_id: str
+    student_ids: List[str]
+
 class QuizPost(BaseModel):
     teacher_uid: str
     class_id: str
@@ -181,36 +259,47 @@ class QuizPost(BaseModel):
     quiz_data: dict
 
 @app.post("/register")
-def register(user: UserRegister):
+async def register(user: UserRegister):
     try:
-        user_id = register_user(user.email, user.password, user.role, user.user_data)
+        user_id = await register_user(user.email, user.password, user.role, user.user_data)
         return {"message": "User registered", "uid": user_id}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/class/create")
-def create_class_endpoint(cls: ClassCreate):
+async def create_class_endpoint(cls: ClassCreate):
     try:
-        create_class(cls.class_id, cls.class_data, cls.teacher_uid, cls.subject)
+        await create_class(cls.class_id, cls.class_data, cls.teacher_uid, cls.subject)
         return {"message": "Class created"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/class/add-student")
-def add_student(cls: AddStudent):
+async def add_student(cls: AddStudent):
     try:
-        add_student_to_class(cls.class_id, cls.student_id)
+        await add_student_to_class(cls.class_id, cls.student_id)
         return {"message": "Student added to class"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/class/enroll")
+async def enroll(cls: ClassEnroll):
+    try:
+        result = await enroll_students(cls.class_id, cls.student_ids)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": f"Enrolled {len(result['enrolled'])} students", **result}
+
 @app.post("/quiz/post")
-def post_quiz(q: QuizPost):
+async def post_quiz(q: QuizPost):
     try:
-        post_quiz_result(q.teacher_uid, q.class_id, q.subject, q.quiz_data)
-        return {"message": "Quiz posted to class"}
+        result = await post_quiz_result(q.teacher_uid, q.class_id, q.subject, q.quiz_data)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if result["failed"] and not result["posted"]:
+        raise HTTPException(status_code=502, detail={"message": "Quiz could not be posted", **result})
+    message = "Quiz posted to class" if not result["failed"] else "Quiz posted to class with failures"
+    return {"message": message, **result}
 
 class CoursePlannerInput(BaseModel):
     current_topic: str
@@ -238,20 +327,24 @@ if not API_KEY:
 def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
-RATE_LIMIT = 20
-RATE_LIMIT_INTERVAL = 60
-client_requests = {}
-
-def rate_limiter(client_ip: str) -> bool:
-    current_time = time.time()
-    window_start = current_time - RATE_LIMIT_INTERVAL
-    if client_ip not in client_requests:
-        client_requests[client_ip] = []
-    client_requests[client_ip] = [t for t in client_requests[client_ip] if t > window_start]
-    if len(client_requests[client_ip]) >= RATE_LIMIT:
-        return False
-    client_requests[client_ip].append(current_time)
-    return True
+# Requests per minute, per client. The role, which picks the quota, comes from the
+# bearer token: x-user-role is client-controlled and would let anyone claim "teacher"
+RATE_LIMIT = RateLimit(20, 60)
+ROLE_RATE_LIMITS = {
+    "teacher": RateLimit(60, 60),
+    "student": RateLimit(20, 60),
+}
+# Routes with their own budget (a full crew run costs up to 13 agent calls)
+ROUTE_RATE_LIMITS = {
+    "/api/run": {"teacher": RateLimit(10, 60), "*": RateLimit(5, 60)},
+    "/api/jobs": {"teacher": RateLimit(10, 60), "*": RateLimit(5, 60)},
+}
+# In-process by default; set RATE_LIMIT_REDIS_URL to share limits across instances/workers
+rate_limiter = RateLimiter.from_env(
+    default=RATE_LIMIT,
+    role_quotas=ROLE_RATE_LIMITS,
+    route_quotas=ROUTE_RATE_LIMITS,
+)
 
 async def verify_api_key(request: Request):
     api_key = request.headers.get("x-api-key")
@@ -262,28 +355,29 @@ async def verify_api_key(request: Request):
     return True
 
 # Memory handler and Crew initialization
-global_memory = LocalMemoryHandler(
+global_memory = LogMemoryHandler(
     session_id="vidyavahini_main_session",
     file_path="memory/vidyavahini_main_memory.json"
 )
 
-vidyavahini_crew = Crew(
-    agents=[
-        lesson_planner_agent,
-        story_teller_agent,
-        quiz_agent,
-        sync_agent,
-        course_planner_agent,
-        ask_me_agent,
-        teacher_dashboard_agent,
-        voice_tutor_agent,
-        student_level_analytics_agent,
-        content_creator_agent,
-        # gamification_agent, # Comment out GamificationAgent here
-        multimodal_research_agent,
-        predictive_analytics_agent,
-        visual_agent,
-    ],
+# Agents taking part in /api/run, in declaration order (gamification is not part of the crew)
+CREW_AGENT_NAMES = [
+    "lesson_planner_agent",
+    "story_teller_agent",
+    "quiz_agent",
+    "sync_agent",
+    "course_planner_agent",
+    "ask_me_agent",
+    "teacher_dashboard_agent",
+    "voice_tutor_agent",
+    "student_level_analytics_agent",
+    "content_creator_agent",
+    "multimodal_research_agent",
+    "predictive_analytics_agent",
+    "visual_agent",
+]
+
+vidyavahini_crew_config = dict(
     verbose=True,
     memory=True,
     memory_handler=global_memory,
@@ -299,10 +393,13 @@ vidyavahini_crew = Crew(
     """,
 )
 
+def build_vidyavahini_crew(agent_names=CREW_AGENT_NAMES) -> Crew:
+    """Full crew for CLI runs; builds every listed agent through the registry."""
+    return Crew(agents=[agent_registry.get(name) for name in agent_names], **vidyavahini_crew_config)
+
 # Request and response models
-class CrewRequest(BaseModel):
+class PromptRequest(BaseModel):
     prompt: str = Field(..., max_length=MAX_PROMPT_LENGTH, description="User prompt for AI Crew")
-    context: Optional[Dict] = Field(default_factory=dict)
 
     # Use field_validator for Pydantic V2
     @field_validator("prompt")
@@ -312,18 +409,29 @@ class CrewRequest(BaseModel):
             raise ValueError("Prompt cannot be empty or whitespace")
         return v
 
+class CrewRequest(PromptRequest):
+    context: Optional[Dict] = Field(default_factory=dict)
+
+# No `context`: a crew run builds its inputs from the prompt alone (crew_inputs)
+class JobRequest(PromptRequest):
+    webhook_url: Optional[AnyHttpUrl] = Field(
+        default=None, description="Public https URL that receives the finished job as a JSON POST")
+
 class CrewResponse(BaseModel):
     result: Dict
     message: Optional[str] = "Success"
+    timings: Optional[Dict] = None  # Per-agent timings and critical path for /api/run
 
 # Rate limit decorator
 def rate_limit_endpoint(func):
     @wraps(func)
     async def wrapper(request: Request, *args, **kwargs):
         client_ip = get_client_ip(request)
-        if not rate_limiter(client_ip):
-            logger.warning("Rate limit exceeded", client_ip=client_ip)
-            raise HTTPException(status_code=429, detail="Too Many Requests")
+        limit = await rate_limiter.acheck(client_ip, route=request.url.path, role=role_from_authorization(request.headers.get("authorization")))
+        if not limit.allowed:
+            logger.warning("Rate limit exceeded", client_ip=client_ip, route=request.url.path,
+                           retry_after=limit.retry_after)
+            raise HTTPException(status_code=429, detail="Too Many Requests", headers=limit.headers())
         return await func(request, *args, **kwargs)
     return wrapper
 
@@ -398,49 +506,15 @@ async def manage_content(request: Request):
     }
 
 
-# Helper to map agent instance names to their string keys used above
-agent_instance_to_name = {
-    lesson_planner_agent: "lesson_planner_agent",
-    story_teller_agent: "story_teller_agent",
-    quiz_agent: "quiz_agent",
-    sync_agent: "sync_agent",
-    course_planner_agent: "course_planner_agent",
-    ask_me_agent: "ask_me_agent",
-    teacher_dashboard_agent: "teacher_dashboard_agent",
-    voice_tutor_agent: "voice_tutor_agent",
-    student_level_analytics_agent: "student_level_analytics_agent",
-    content_creator_agent: "content_creator_agent",
-    multimodal_research_agent: "multimodal_research_agent",
-    predictive_analytics_agent: "predictive_analytics_agent",
-    visual_agent: "visual_agent",
-    # gamification_agent is commented out
-}
-
-# Dictionary mapping endpoint suffixes to agents (same as before)
-agent_endpoints = {
-    "lesson_planner": lesson_planner_agent,
-    "story_teller": story_teller_agent,
-    "quiz": quiz_agent,
-    "sync": sync_agent,
-    "course_planner": course_planner_agent,
-    "ask_me": ask_me_agent,
-    "teacher_dashboard": teacher_dashboard_agent,
-    "voice_tutor": voice_tutor_agent,
-    "student_level_analytics": student_level_analytics_agent,
-    "content_creator": content_creator_agent,
-    # "gamification": gamification_agent, # Commented out GamificationAgent
-    "multimodal_research": multimodal_research_agent,
-    "predictive_analytics": predictive_analytics_agent,
-    "visual": visual_agent,
-}
-
 # Helper function to run a single agent
 async def run_single_agent(agent, prompt: str, context: Optional[Dict]):
+    key = single_flight_key(agent.name, prompt, context)
     try:
-        result = await asyncio.wait_for(
+        # The timeout bounds the shared call, so joined requests give up together
+        result = await single_flight.run(agent.name, key, lambda: asyncio.wait_for(
             agent.run(prompt=prompt, context=context or {}),
             timeout=60.0
-        )
+        ))
         if result is None or not isinstance(result, dict):
             logger.error(f"Agent {agent.name} returned invalid result: {result}")
             raise HTTPException(status_code=500, detail=f"Agent {agent.name} returned no valid result")
@@ -455,17 +529,20 @@ async def run_single_agent(agent, prompt: str, context: Optional[Dict]):
 api_router = APIRouter()
 
 # Dynamically add one endpoint per agent with role-based access control
-def create_agent_endpoint(agent, endpoint_name):
+def create_agent_endpoint(endpoint_name):
     @rate_limit_endpoint
     async def endpoint_func(request: Request, crew_request: CrewRequest):
         client_ip = get_client_ip(request)
         logger.info(f"Received /api/{endpoint_name} request", client_ip=client_ip, prompt=crew_request.prompt[:50])
 
         # existing user role checks ...
-        
+
+        agent = await agent_registry.aget(endpoint_name)
         result = await run_single_agent(agent, crew_request.prompt, crew_request.context)
 
-        logger.info(f"Agent returned result: {result}")
+        span = metrics.current_span()
+        logger.info(f"Agent {agent.name} returned", keys=list(result or {}),
+                    elapsed=round(time.time() - span.start, 3) if span else None)
 
         if result is None:
             logger.error(f"Agent {agent.name} returned None instead of dict")
@@ -475,14 +552,57 @@ def create_agent_endpoint(agent, endpoint_name):
     return endpoint_func
 
 
-for endpoint_name, agent in agent_endpoints.items():
+for endpoint_name in agent_registry.endpoints():
+    if endpoint_name == "gamification":
+        continue  # GamificationAgent is not exposed yet
     api_router.post(
         f"/api/{endpoint_name}",
         response_model=CrewResponse,
         dependencies=[Depends(verify_api_key)],
         tags=["Agents"],
         summary=f"Run {endpoint_name} agent"
-    )(create_agent_endpoint(agent, endpoint_name))
+    )(create_agent_endpoint(endpoint_name))
+
+# Agents whose JSON output is streamed section by section as server-sent events
+STREAMING_AGENTS = ("lesson_planner", "story_teller")
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def create_stream_endpoint(endpoint_name):
+    @rate_limit_endpoint
+    async def endpoint_func(request: Request, crew_request: CrewRequest):
+        client_ip = get_client_ip(request)
+        logger.info(f"Received /api/{endpoint_name}/stream request", client_ip=client_ip,
+                    prompt=crew_request.prompt[:50])
+
+        agent = await agent_registry.aget(endpoint_name)
+        # The prompt is the topic unless the context names one
+        inputs = {"topic": crew_request.prompt, **(crew_request.context or {}), "prompt": crew_request.prompt}
+
+        async def events():
+            async for event in agent.stream(inputs):
+                yield sse_event(event["event"], event["data"])
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return endpoint_func
+
+
+for endpoint_name in STREAMING_AGENTS:
+    api_router.post(
+        f"/api/{endpoint_name}/stream",
+        dependencies=[Depends(verify_api_key)],
+        tags=["Agents"],
+        summary=f"Stream {endpoint_name} output section by section (SSE)",
+        description=(
+            "Server-sent events: one `section` event ({key, value}) per top-level key of the "
+            "generated JSON as soon as it is complete, then `done` with the whole object, or `error`."
+        ),
+    )(create_stream_endpoint(endpoint_name))
 
 app.include_router(api_router)
 
@@ -494,37 +614,87 @@ async def health_check():
     """
     return {"status": "ok"}
 
-@app.post("/api/run", response_model=CrewResponse, dependencies=[Depends(verify_api_key)])
-@rate_limit_endpoint
-async def run_crew(request: Request, crew_request: CrewRequest):
+def collect_component_metrics():
+    """Scrape-time values from the response cache, client pool and circuit breakers."""
+    Sample = metrics.Sample
+    cache = llm_cache.stats()
+    for result in ("memory_hits", "disk_hits", "misses"):
+        yield Sample("vidyavahini_llm_cache_lookups", "counter", "LLM response cache lookups by result.",
+                     cache[result], {"result": result})
+    for model, gate in llm_pool.stats()["models"].items():
+        yield Sample("vidyavahini_llm_in_flight", "gauge", "LLM requests in flight per model.",
+                     gate["in_flight"], {"model": model})
+        yield Sample("vidyavahini_llm_waiting", "gauge", "LLM requests queued for a slot per model.",
+                     gate["waiting"], {"model": model})
+    for upstream, breaker in breaker_stats().items():
+        yield Sample("vidyavahini_circuit_open", "gauge", "1 while an upstream's circuit breaker is not closed.",
+                     int(breaker["state"] != "closed"), {"upstream": upstream})
+
+
+metrics.registry.add_collector(collect_component_metrics)
+metrics.registry.add_collector(single_flight.collect_metrics)
+
+
+@app.get("/metrics", dependencies=[Depends(verify_api_key)])
+async def prometheus_metrics():
     """
-    Run the entire VidyaVāhinī agent crew on the given prompt and context.
-    User role/level filtering applied: only runs allowed agents
+    Prometheus text exposition: span latency histograms, LLM tokens, cache hits and retries.
     """
-    client_ip = get_client_ip(request)
-    logger.info("Received /api/run request", client_ip=client_ip, prompt=crew_request.prompt[:50])
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
-    # Get user role and level from headers
-    user_role = request.headers.get("x-user-role", "").lower()
-    user_level_str = request.headers.get("x-user-level")
-    user_level = None
-    if user_level_str:
-        try:
-            user_level = int(user_level_str)
-        except ValueError:
-            logger.warning(f"Invalid x-user-level header value: {user_level_str}")
+@app.get("/api/cache/stats", dependencies=[Depends(verify_api_key)])
+async def cache_stats():
+    """
+    Hit/miss counters of the shared LLM response cache.
+    """
+    return llm_cache.stats()
 
-    allowed_agents_names = get_allowed_agents(user_role, user_level)
+@app.get("/api/llm/stats", dependencies=[Depends(verify_api_key)])
+async def llm_stats():
+    """
+    Per-model in-flight requests, queueing and latency of the shared LLM client pool.
+    """
+    return llm_pool.stats()
+
+@app.get("/api/upstreams/stats", dependencies=[Depends(verify_api_key)])
+async def upstream_stats():
+    """
+    Circuit breaker state per upstream (gemini, google_tts, sarvam).
+    """
+    return breaker_stats()
 
-    # Filter the crew's agents for allowed ones only
-    filtered_agents = [agent for agent in vidyavahini_crew.agents if agent_instance_to_name.get(agent) in allowed_agents_names]
+@app.get("/api/agents/stats", dependencies=[Depends(verify_api_key)])
+async def agent_stats():
+    """
+    Which agents have been built so far and how long each build took.
+    """
+    return agent_registry.stats()
 
-    if not filtered_agents:
-        logger.warning(f"No agents allowed for user_role={user_role}, user_level={user_level}", client_ip=client_ip)
-        raise HTTPException(status_code=403, detail="No agents available for your user role/level")
+@app.get("/api/agents/in_flight", dependencies=[Depends(verify_api_key)])
+async def agents_in_flight():
+    """
+    Agent calls in flight and how many requests are waiting on each (single-flight).
+    """
+    return single_flight.stats()
+
+@app.post("/api/voice_tutor/stream", dependencies=[Depends(verify_api_key)])
+@rate_limit_endpoint
+async def stream_voice_tutor(request: Request, crew_request: CrewRequest):
+    """
+    Stream the voice tutor narration as chunked MP3, one sentence at a time, so
+    playback can start before the whole lesson has been synthesized.
+    """
+    dialect = (crew_request.context or {}).get("dialect", "default")
+    voice_tutor_agent = await agent_registry.aget("voice_tutor")
+    return StreamingResponse(
+        voice_tutor_agent.stream(crew_request.prompt, dialect),
+        media_type="audio/mpeg",
+    )
 
+def crew_inputs(prompt: str) -> dict:
+    """Inputs handed to the agents of a crew run (/api/run and /api/jobs)."""
     # Extract topic from prompt (simple extraction)
-    prompt_lower = crew_request.prompt.lower()
+    prompt_lower = prompt.lower()
     topic = "plants"  # Default fallback
     grade = "5"       # Default fallback
     
@@ -630,15 +800,140 @@ async def run_crew(request: Request, crew_request: CrewRequest):
         }
     }
 }
+    return comprehensive_inputs
+
+
+def user_role_and_level(request: Request):
+    # Get user role and level from headers
+    user_role = request.headers.get("x-user-role", "").lower()
+    user_level_str = request.headers.get("x-user-level")
+    user_level = None
+    if user_level_str:
+        try:
+            user_level = int(user_level_str)
+        except ValueError:
+            logger.warning(f"Invalid x-user-level header value: {user_level_str}")
+    return user_role, user_level
+
+
+def crew_agent_names(user_role: str, user_level: Optional[int], client_ip: str) -> List[str]:
+    """The crew agents this role/level may run, in declaration order; 403 if none."""
+    allowed_agents_names = get_allowed_agents(user_role, user_level)
+
+    # Filter the crew's agents for allowed ones only; only those get built
+    filtered_names = [name for name in CREW_AGENT_NAMES if name in allowed_agents_names]
+
+    if not filtered_names:
+        logger.warning(f"No agents allowed for user_role={user_role}, user_level={user_level}", client_ip=client_ip)
+        raise HTTPException(status_code=403, detail="No agents available for your user role/level")
+    return filtered_names
+
+
+async def run_crew_agents(agent_names: List[str], prompt: str, on_result=None):
+    """Build the named agents and run them as a crew; (results, RunReport). Times out after 120 s."""
+    filtered_agents = [await agent_registry.aget(name) for name in agent_names]
+    filtered_crew = Crew(agents=filtered_agents, verbose=vidyavahini_crew_config["verbose"])
+    return await asyncio.wait_for(
+        filtered_crew.run_with_report(inputs=crew_inputs(prompt), on_result=on_result),
+        timeout=120.0  # Increased timeout for hackathon
+    )
+
+
+def ndjson_event(event: str, data: dict) -> str:
+    return json.dumps({"event": event, **data}, ensure_ascii=False, default=str) + "\n"
 
+# /api/run response modes besides the single JSON document: ?stream=ndjson|sse or the Accept header
+CREW_STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def crew_stream_mode(request: Request) -> Optional[str]:
+    mode = request.query_params.get("stream")
+    if mode:
+        if mode not in CREW_STREAM_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"stream must be one of {sorted(CREW_STREAM_MEDIA_TYPES)}")
+        return mode
+    accept = request.headers.get("accept", "")
+    return next((mode for mode, media_type in CREW_STREAM_MEDIA_TYPES.items() if media_type in accept), None)
+
+def stream_crew_run(agent_names: List[str], prompt: str, mode: str, client_ip: str) -> StreamingResponse:
+    """
+    One `result` event per agent as it finishes ({agent, status, duration, elapsed, result};
+    seconds), then `done` with the run's timings, or `error`.
+    """
+    format_event = sse_event if mode == "sse" else ndjson_event
+
+    async def events():
+        results: asyncio.Queue = asyncio.Queue()
+        started = time.perf_counter()
+
+        async def on_result(name, result, timing):
+            results.put_nowait({
+                "agent": name,
+                "status": timing.status,
+                "duration": round(timing.duration, 4),
+                "elapsed": round(time.perf_counter() - started, 4),
+                "result": result,
+            })
+
+        run = asyncio.create_task(run_crew_agents(agent_names, prompt, on_result=on_result))
+        run.add_done_callback(lambda _: results.put_nowait(None))
+        try:
+            while (item := await results.get()) is not None:
+                yield format_event("result", item)
+            try:
+                _, report = run.result()
+            except asyncio.TimeoutError:
+                logger.error("Crew run timed out", client_ip=client_ip)
+                yield format_event("error", {"detail": "Crew processing timed out"})
+                return
+            except Exception as e:
+                logger.error("Crew execution error", client_ip=client_ip, error=str(e), trace=traceback.format_exc())
+                yield format_event("error", {"detail": f"Internal server error: {str(e)}"})
+                return
+            timings = report.to_dict()
+            logger.info("Crew run streamed", client_ip=client_ip, wall_time=timings["wall_time"],
+                        critical_path=timings["critical_path"])
+            yield format_event("done", {"timings": timings})
+        finally:
+            # The client went away: stop the remaining agents
+            if not run.done():
+                run.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type=CREW_STREAM_MEDIA_TYPES[mode],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/run", response_model=CrewResponse, dependencies=[Depends(verify_api_key)])
+@rate_limit_endpoint
+async def run_crew(request: Request, crew_request: CrewRequest):
+    """
+    Run the entire VidyaVāhinī agent crew on the given prompt and context.
+    User role/level filtering applied: only runs allowed agents
+
+    With `?stream=ndjson` or `?stream=sse` (or a matching Accept header), each agent's
+    result is sent as soon as that agent finishes instead of in one response at the end.
+    """
+    client_ip = get_client_ip(request)
+    logger.info("Received /api/run request", client_ip=client_ip, prompt=crew_request.prompt[:50])
+
+    user_role, user_level = user_role_and_level(request)
+    filtered_names = crew_agent_names(user_role, user_level, client_ip)
+
+    stream_mode = crew_stream_mode(request)
+    if stream_mode:
+        return stream_crew_run(filtered_names, crew_request.prompt, stream_mode, client_ip)
 
     try:
-        result = await asyncio.wait_for(
-            filtered_crew.run(inputs=comprehensive_inputs),
-            timeout=120.0  # Increased timeout for hackathon
+        result, report = await run_crew_agents(filtered_names, crew_request.prompt)
+        timings = report.to_dict()
+        logger.info(
+            "Crew run completed successfully",
+            client_ip=client_ip,
+            wall_time=timings["wall_time"],
+            critical_path=timings["critical_path"],
         )
-        logger.info("Crew run completed successfully", client_ip=client_ip)
-        return CrewResponse(result=result)
+        return CrewResponse(result=result, timings=timings)
     except asyncio.TimeoutError:
         logger.error("Crew run timed out", client_ip=client_ip)
         raise HTTPException(status_code=504, detail="Crew processing timed out")
@@ -647,6 +942,62 @@ async def run_crew(request: Request, crew_request: CrewRequest):
         logger.error("Crew execution error", client_ip=client_ip, error=str(e), trace=error_trace)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+# Background crew runs: at most JOB_WORKERS crews at once, JOB_QUEUE_MAX more waiting.
+# Jobs live in Firestore (crewflows.jobs.FirestoreJobStore), so every instance can answer a poll
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))
+
+async def run_job(job_request: dict, on_result):
+    _, report = await run_crew_agents(job_request["agents"], job_request["prompt"], on_result=on_result)
+    return report.to_dict()
+
+job_queue = JobQueue(None, run_job, workers=JOB_WORKERS, max_queued=JOB_QUEUE_MAX)
+
+def collect_job_metrics():
+    stats = job_queue.stats()
+    for state in ("queued", "running"):
+        yield metrics.Sample(f"vidyavahini_jobs_{state}", "gauge", f"Background crew runs {state}.", stats[state])
+
+metrics.registry.add_collector(collect_job_metrics)
+
+@app.post("/api/jobs", status_code=202, dependencies=[Depends(verify_api_key)])
+@rate_limit_endpoint
+async def submit_job(request: Request, job_request: JobRequest):
+    """
+    Queue a crew run (same agents and role/level rules as /api/run) and return its job id
+    at once. Poll GET /api/jobs/{job_id}, or pass `webhook_url` to be called when it ends.
+    """
+    client_ip = get_client_ip(request)
+    user_role, user_level = user_role_and_level(request)
+    agent_names = crew_agent_names(user_role, user_level, client_ip)
+    if job_request.webhook_url:
+        # The server makes this call: no internal or metadata addresses
+        try:
+            await asyncio.to_thread(check_webhook_url, str(job_request.webhook_url))
+        except UnsafeWebhookURL as e:
+            raise HTTPException(status_code=422, detail=f"Invalid webhook_url: {e}")
+    try:
+        job = await job_queue.submit(
+            {"prompt": job_request.prompt, "agents": agent_names},
+            webhook_url=str(job_request.webhook_url) if job_request.webhook_url else None,
+        )
+    except JobQueueFull:
+        logger.warning("Job queue full", client_ip=client_ip)
+        raise HTTPException(status_code=503, detail="Too many queued jobs", headers={"Retry-After": "30"})
+    logger.info("Queued crew job", client_ip=client_ip, job_id=job["job_id"], agents=len(agent_names))
+    return job
+
+@app.get("/api/jobs/{job_id}", dependencies=[Depends(verify_api_key)])
+async def get_job(job_id: str, after: int = 0):
+    """
+    Job status and the agent results recorded so far. Each response carries a `cursor`;
+    pass it back as `after` to get only the results that arrived since.
+    """
+    job = await job_queue.get(job_id, after)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 # Exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -664,6 +1015,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=getattr(exc, "headers", None),  # e.g. Retry-After on 429
     )
 
 @app.exception_handler(Exception)
@@ -808,6 +1160,7 @@ async def main():
         }
 
         # Run the crew with prepared inputs
+        vidyavahini_crew = await asyncio.to_thread(build_vidyavahini_crew)
         result = await vidyavahini_crew.run(inputs=inputs)
 
         logger.info("CLI run result:")
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """`limit` requests per `period` seconds, allowing bursts of up to `limit`."""
+    limit: int
+    period: float = 60.0
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period / self.limit
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request would be allowed (0 when allowed)
+    reset_after: float  # seconds until the bucket is full again
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def gcra(tat: Optional[float], now: float, rate: RateLimit):
+    """
+    Generic cell rate algorithm. `tat` is the key's theoretical arrival time.
+    Returns (result, new_tat); new_tat is None when the request is rejected.
+    """
+    interval = rate.emission_interval
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    allow_at = new_tat - rate.period
+    if now < allow_at:
+        return RateLimitResult(False, rate.limit, 0, allow_at - now, tat - now), None
+    remaining = int((now - allow_at) / interval + 1e-9)
+    return RateLimitResult(True, rate.limit, remaining, 0.0, new_tat - now), new_tat
+
+
+class MemoryBackend:
+    """
+    Per-process GCRA state: one float per key, O(1) per check. Keys whose bucket
+    has refilled carry no information and are dropped; `max_keys` bounds memory.
+    """
+
+    blocking = False  # hit() never waits on I/O, so async callers call it inline
+
+    def __init__(self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        with self._lock:
+            now = self.clock()
+            result, new_tat = gcra(self._tats.get(key), now, rate)
+            if new_tat is not None:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+            self._prune(now)
+            return result
+
+    def _prune(self, now: float):
+        # Least recently hit keys first; stop at the first one still throttled
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) <= self.max_keys:
+                break
+            del self._tats[key]
+
+    def __len__(self):
+        return len(self._tats)
+
+
+# Atomic GCRA in Redis. Uses the server clock so every instance agrees on "now".
+_GCRA_LUA = """
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+  return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((now - allow_at) / interval), 0, new_tat - now}
+"""
+
+
+class RedisBackend:
+    """
+    Shared GCRA state in Redis (or any server speaking its protocol and EVAL), so
+    all App Engine instances and uvicorn workers enforce one limit. Keys expire
+    once their bucket has refilled.
+    """
+
+    blocking = True  # hit() is a network round trip; async callers run it in a thread
+
+    def __init__(self, client, prefix: str = "vidyavahini:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_GCRA_LUA)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBackend":
+        import redis  # Only needed when RATE_LIMIT_REDIS_URL is configured
+
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5), **kwargs)
+
+    def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        interval_ms = rate.emission_interval * 1000
+        period_ms = rate.period * 1000
+        allowed, remaining, retry_ms, reset_ms = self._script(keys=[self.prefix + key], args=[interval_ms, period_ms])
+        return RateLimitResult(bool(allowed), rate.limit, int(remaining), float(retry_ms) / 1000, float(reset_ms) / 1000)
+
+
+Quota = Union[RateLimit, Dict[str, RateLimit]]
+
+
+class RateLimiter:
+    """
+    Picks the quota for a request and checks it against the backend.
+
+    Quota lookup: route quota for the caller's role, then the route's "*" entry,
+    then the role quota, then the default. Route quotas are counted separately
+    from the shared per-client budget. The role only picks the quota: buckets
+    are keyed by client, so switching roles does not reset a client's budget.
+    Backend errors fail open (logged), so a Redis outage does not take the API
+    down with it.
+    """
+
+    def __init__(self, backend, default: RateLimit = RateLimit(20, 60),
+                 role_quotas: Optional[Dict[str, RateLimit]] = None,
+                 route_quotas: Optional[Dict[str, Quota]] = None):
+        self.backend = backend
+        self.default = default
+        self.role_quotas = role_quotas or {}
+        self.route_quotas = route_quotas or {}
+
+    def quota_for(self, route: Optional[str], role: Optional[str]):
+        """Return (scope, RateLimit); the scope becomes part of the backend key."""
+        route_quota = self.route_quotas.get(route) if route else None
+        if isinstance(route_quota, RateLimit):
+            return route, route_quota
+        if route_quota:
+            if role in route_quota:
+                return route, route_quota[role]
+            if "*" in route_quota:
+                return route, route_quota["*"]
+        return "*", self.role_quotas.get(role, self.default)
+
+    def check(self, client_id: str, route: Optional[str] = None, role: Optional[str] = None) -> RateLimitResult:
+        scope, rate = self.quota_for(route, role)
+        try:
+            return self.backend.hit(f"{scope}:{client_id}", rate)
+        except Exception as e:
+            return self._fail_open(rate, e)
+
+    async def acheck(self, client_id: str, route: Optional[str] = None, role: Optional[str] = None) -> RateLimitResult:
+        """check() for the event loop: a blocking backend (Redis) runs in a worker thread."""
+        scope, rate = self.quota_for(route, role)
+        try:
+            if getattr(self.backend, "blocking", True):
+                return await asyncio.to_thread(self.backend.hit, f"{scope}:{client_id}", rate)
+            return self.backend.hit(f"{scope}:{client_id}", rate)
+        except Exception as e:
+            return self._fail_open(rate, e)
+
+    @staticmethod
+    def _fail_open(rate: RateLimit, error: Exception) -> RateLimitResult:
+        logger.error("Rate limiter backend failed, allowing request: %s", error)
+        return RateLimitResult(True, rate.limit, rate.limit, 0.0, 0.0)
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "RateLimiter":
+        """Redis backend when RATE_LIMIT_REDIS_URL is set, in-process otherwise."""
+        redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+        backend = RedisBackend.from_url(redis_url) if redis_url else MemoryBackend()
+        return cls(backend, **kwargs)
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from firestore import firestore_utils as fs
+from typing import AsyncIterator, Optional
+from firestore import async_repository as fs
 
 router = APIRouter()
 
@@ -81,98 +84,130 @@ class StudentAnalytics(BaseModel):
     activity_type: str
     engagement_score: float
 
+# ----------- Paginated listing -------------
+
+async def _stream_json_array(items: AsyncIterator[dict]) -> AsyncIterator[str]:
+    yield "["
+    index = 0
+    async for item in items:
+        yield ("," if index else "") + json.dumps(jsonable_encoder(item), ensure_ascii=False)
+        index += 1
+    yield "]"
+
+async def list_user_documents(collection: str, user_id: str, limit: Optional[int],
+                              start_after: Optional[str], fields: Optional[str]):
+    """
+    With `limit`: one page as {"items": [...], "next_cursor": ...}.
+    Without: every document, streamed as a JSON array one Firestore page at a time.
+    `fields` is a comma-separated select() projection.
+    """
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if limit is None:
+        if start_after:
+            raise HTTPException(status_code=400, detail="start_after requires limit")
+        items = fs.iter_user_documents(collection, user_id, fields=selected)
+        return StreamingResponse(_stream_json_array(items), media_type="application/json")
+    try:
+        page = await fs.get_user_documents_page(collection, user_id, limit, start_after, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return jsonable_encoder(page.to_dict())
+
 # ----------- Routes -------------
 
 @router.post("/create_user")
-def create_user(user: UserData):
-    fs.create_user_profile(user.user_id, user.dict())
+async def create_user(user: UserData):
+    await fs.create_user_profile(user.user_id, user.dict())
     return {"status": "User created"}
 
 @router.get("/get_user/{user_id}")
-def get_user(user_id: str):
-    profile = fs.get_user_profile(user_id)
+async def get_user(user_id: str):
+    profile = await fs.get_user_profile(user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="User not found")
     return profile
 
 @router.post("/save_lesson")
-def save_lesson(data: LessonPlan):
-    fs.create_lesson_plan(data.user_id, data.dict())
+async def save_lesson(data: LessonPlan):
+    await fs.create_lesson_plan(data.user_id, data.dict())
     return {"status": "Lesson saved"}
 
 @router.get("/get_lessons/{user_id}")
-def get_lessons(user_id: str):
-    return fs.get_lesson_plans(user_id)
+async def get_lessons(user_id: str, limit: Optional[int] = Query(None, ge=1, le=500),
+                      start_after: Optional[str] = None, fields: Optional[str] = None):
+    return await list_user_documents("lesson_plans", user_id, limit, start_after, fields)
 
 @router.post("/save_story")
-def save_story(data: StoryData):
-    fs.save_story(data.user_id, data.dict())
+async def save_story(data: StoryData):
+    await fs.save_story(data.user_id, data.dict())
     return {"status": "Story saved"}
 
 @router.get("/get_stories/{user_id}")
-def get_stories(user_id: str):
-    return fs.get_stories(user_id)
+async def get_stories(user_id: str, limit: Optional[int] = Query(None, ge=1, le=500),
+                      start_after: Optional[str] = None, fields: Optional[str] = None):
+    return await list_user_documents("stories", user_id, limit, start_after, fields)
 
 @router.post("/save_course")
-def save_course(data: CoursePlan):
-    fs.save_course_plan(data.user_id, data.dict())
+async def save_course(data: CoursePlan):
+    await fs.save_course_plan(data.user_id, data.dict())
     return {"status": "Course plan saved"}
 
 @router.post("/save_quiz")
-def save_quiz(data: QuizResult):
-    fs.save_quiz_result(data.user_id, data.dict())
+async def save_quiz(data: QuizResult):
+    await fs.save_quiz_result(data.user_id, data.dict())
     return {"status": "Quiz result saved"}
 
 @router.get("/get_quizzes/{user_id}")
-def get_quizzes(user_id: str):
-    return fs.get_quiz_results(user_id)
+async def get_quizzes(user_id: str, limit: Optional[int] = Query(None, ge=1, le=500),
+                      start_after: Optional[str] = None, fields: Optional[str] = None):
+    return await list_user_documents("quiz_results", user_id, limit, start_after, fields)
 
 @router.post("/log_voice_session")
-def log_voice(data: VoiceSession):
-    fs.log_voice_session(data.user_id, data.dict())
+async def log_voice(data: VoiceSession):
+    await fs.log_voice_session(data.user_id, data.dict())
     return {"status": "Voice session logged"}
 
 @router.post("/save_visual")
-def save_visual(data: VisualAsset):
-    fs.save_visual_asset(data.user_id, data.dict())
+async def save_visual(data: VisualAsset):
+    await fs.save_visual_asset(data.user_id, data.dict())
     return {"status": "Visual asset saved"}
 
 @router.post("/ask_me")
-def log_qa(data: QAData):
-    fs.log_qa(data.user_id, data.question, data.answer)
+async def log_qa(data: QAData):
+    await fs.log_qa(data.user_id, data.question, data.answer)
     return {"status": "Q&A logged"}
 
 @router.post("/log_sync")
-def log_sync(data: SyncEvent):
-    fs.log_sync_event(data.user_id, data.dict())
+async def log_sync(data: SyncEvent):
+    await fs.log_sync_event(data.user_id, data.dict())
     return {"status": "Sync event logged"}
 
 @router.post("/dashboard_data")
-def save_dashboard(data: DashboardData):
-    fs.record_teacher_metrics(data.user_id, data.dict())
+async def save_dashboard(data: DashboardData):
+    await fs.record_teacher_metrics(data.user_id, data.dict())
     return {"status": "Dashboard data saved"}
 
 @router.post("/save_content")
-def save_generated(data: GeneratedContent):
-    fs.save_generated_content(data.user_id, data.dict())
+async def save_generated(data: GeneratedContent):
+    await fs.save_generated_content(data.user_id, data.dict())
     return {"status": "Generated content saved"}
 
 @router.post("/save_game_result")
-def save_game(data: GameResult):
-    fs.save_game_result(data.user_id, data.dict())
+async def save_game(data: GameResult):
+    await fs.save_game_result(data.user_id, data.dict())
     return {"status": "Game result saved"}
 
 @router.post("/save_prediction")
-def save_prediction(data: Prediction):
-    fs.save_prediction(data.user_id, data.dict())
+async def save_prediction(data: Prediction):
+    await fs.save_prediction(data.user_id, data.dict())
     return {"status": "Prediction saved"}
 
 @router.post("/log_research")
-def save_research(data: MultimodalResearch):
-    fs.log_multimodal_result(data.user_id, data.dict())
+async def save_research(data: MultimodalResearch):
+    await fs.log_multimodal_result(data.user_id, data.dict())
     return {"status": "Multimodal research saved"}
 
 @router.post("/student_analytics")
-def save_student_analytics(data: StudentAnalytics):
-    fs.log_student_analytics(data.user_id, data.dict())
+async def save_student_analytics(data: StudentAnalytics):
+    await fs.log_student_analytics(data.user_id, data.dict())
     return {"status": "Student analytics logged"}
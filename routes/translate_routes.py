@@ -1,12 +1,30 @@
 from fastapi import APIRouter, Query
+from pydantic import BaseModel, Field
+from typing import List
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from sarvam_client import sarvam_translate
+from sarvam_client import get_translator
 
 router = APIRouter()
 
+# Texts per batch request; each distinct text is one Sarvam call
+MAX_BATCH_TEXTS = 100
+
+
+class TranslateBatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_TEXTS)
+    source: str = "en"
+    target: str = "te-IN"
+
+
 @router.get("/translate")
-def translate(text: str = Query(...), source: str = Query("en"), target: str = Query("te-IN")):
-    result = sarvam_translate(text, source, target)
-    return result
+async def translate(text: str = Query(...), source: str = Query("en"), target: str = Query("te-IN")):
+    return await get_translator().translate(text, source, target)
+
+
+@router.post("/batch")
+async def translate_batch(request: TranslateBatchRequest):
+    """Translate all texts concurrently (at most SARVAM_MAX_CONCURRENCY in flight); results keep input order."""
+    translations = await get_translator().translate_batch(request.texts, request.source, request.target)
+    return {"translations": translations}
@@ -1,26 +1,237 @@
-import requests
+"""
+Sarvam translation.
+
+SarvamTranslator is what the API uses: one httpx.AsyncClient per event loop
+keeps connections to Sarvam alive between requests instead of paying a TLS
+handshake per translation, identical (text, source, target) requests that are
+in flight together share one upstream call, and every successful translation
+is kept in a SQLite translation memory, so re-translating the same lesson costs
+nothing. sarvam_translate() is the original blocking helper for scripts.
+"""
+import asyncio
+import hashlib
+import json
 import os
+import sqlite3
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+import requests
+
+from tools.utils.retry_handler import CircuitOpenError, RetryPolicy, acall_with_retry, retry_with_backoff
 
 SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
+SARVAM_BASE_URL = os.getenv("SARVAM_BASE_URL", "https://api.sarvam.ai")
+SARVAM_TRANSLATE_URL = f"{SARVAM_BASE_URL}/translate"
+# (connect, read) seconds; without a timeout a stalled request held the worker forever
+SARVAM_TIMEOUT = (3.05, 15)
+SARVAM_UPSTREAM = "sarvam"
+SARVAM_RETRY = RetryPolicy(retries=3, delay=0.5, max_delay=10.0)
+SARVAM_MAX_CONCURRENCY = int(os.getenv("SARVAM_MAX_CONCURRENCY", "8"))
+TRANSLATION_MEMORY_PATH = os.getenv("TRANSLATION_MEMORY_PATH", "memory/translation_memory.sqlite3")
+
+
+@retry_with_backoff(retries=3, delay=0.5, max_delay=10.0, upstream=SARVAM_UPSTREAM)
+def _post_translate(headers: dict, payload: dict) -> dict:
+    response = requests.post(SARVAM_TRANSLATE_URL, headers=headers, json=payload, timeout=SARVAM_TIMEOUT)
+    response.raise_for_status()  # 429/503 are retried (honouring Retry-After); other errors are not
+    return response.json()
+
 
 def sarvam_translate(text: str, source_lang: str, target_lang: str):
     if not SARVAM_API_KEY:
         return {"error": "SARVAM_API_KEY not configured"}
-    
-    url = "https://api.sarvam.ai/translate"  
+
     headers = {
         "api-subscription-key": SARVAM_API_KEY,
         "Content-Type": "application/json"
     }
     payload = {
         "input": text,
-        "source_language_code": source_lang, 
-        "target_language_code": target_lang    
+        "source_language_code": source_lang,
+        "target_language_code": target_lang
     }
-    
+
     try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        return response.json()
+        return _post_translate(headers, payload)
+    except CircuitOpenError as e:
+        return {"error": f"Translation service unavailable: {str(e)}"}
     except requests.exceptions.RequestException as e:
         return {"error": f"Translation request failed: {str(e)}"}
+
+
+# ---------------- translation memory ----------------
+
+class TranslationMemory:
+    """Sarvam responses keyed by (source, target, text), in SQLite (a file path or ":memory:")."""
+
+    def __init__(self, path: str = TRANSLATION_MEMORY_PATH):
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY, source TEXT NOT NULL, target TEXT NOT NULL,"
+            " response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def make_key(text: str, source: str, target: str) -> str:
+        return hashlib.sha256(json.dumps([source, target, text]).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM translations WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, source: str, target: str, response: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, source, target, response, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, source, target, json.dumps(response, ensure_ascii=False), time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ---------------- async client ----------------
+
+@dataclass
+class _LoopState:
+    client: httpx.AsyncClient
+    semaphore: asyncio.Semaphore
+    in_flight: Dict[str, "asyncio.Task"] = field(default_factory=dict)
+
+
+class SarvamTranslator:
+    """
+    Async Sarvam client. At most `max_concurrency` requests are sent at once per
+    event loop (over at most `max_connections` pooled connections); the rest
+    queue. Errors come back as {"error": ...} like sarvam_translate(), and are
+    not remembered.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 memory: Optional[TranslationMemory] = None, max_concurrency: int = SARVAM_MAX_CONCURRENCY,
+                 max_connections: int = 20, timeout=SARVAM_TIMEOUT,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._api_key = api_key
+        self.base_url = base_url
+        self.memory = memory
+        self.max_concurrency = max_concurrency
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        connect, read = timeout
+        self.timeout = httpx.Timeout(read, connect=connect)
+        self._transport = transport
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self.stats = {"requests": 0, "memory_hits": 0, "coalesced": 0, "errors": 0}
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or SARVAM_API_KEY
+
+    def _state(self) -> _LoopState:
+        # Clients and semaphores bind to the loop they are first used on, so keep one per loop
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url or SARVAM_BASE_URL, limits=self.limits,
+                timeout=self.timeout, transport=self._transport,
+            )
+            state = self._loops[loop] = _LoopState(client, asyncio.Semaphore(self.max_concurrency))
+        return state
+
+    async def _post(self, state: _LoopState, payload: dict) -> dict:
+        async with state.semaphore:
+            self.stats["requests"] += 1
+            response = await state.client.post(
+                "/translate", json=payload, headers={"api-subscription-key": self.api_key},
+            )
+        response.raise_for_status()  # 429/503 are retried (honouring Retry-After); other errors are not
+        return response.json()
+
+    async def _fetch(self, state: _LoopState, key: str, text: str, source: str, target: str) -> dict:
+        payload = {"input": text, "source_language_code": source, "target_language_code": target}
+        try:
+            result = await acall_with_retry(self._post, state, payload, policy=SARVAM_RETRY, upstream=SARVAM_UPSTREAM)
+        except CircuitOpenError as e:
+            self.stats["errors"] += 1
+            return {"error": f"Translation service unavailable: {str(e)}"}
+        except (httpx.HTTPError, ValueError) as e:
+            self.stats["errors"] += 1
+            return {"error": f"Translation request failed: {str(e)}"}
+        if self.memory is not None:
+            await asyncio.to_thread(self.memory.set, key, source, target, result)
+        return result
+
+    async def translate(self, text: str, source: str = "en", target: str = "te-IN") -> dict:
+        if not self.api_key:
+            return {"error": "SARVAM_API_KEY not configured"}
+        key = TranslationMemory.make_key(text, source, target)
+        if self.memory is not None:
+            remembered = await asyncio.to_thread(self.memory.get, key)
+            if remembered is not None:
+                self.stats["memory_hits"] += 1
+                return remembered
+
+        state = self._state()
+        task = state.in_flight.get(key)
+        if task is None:
+            # A task rather than a bare await: a caller that disconnects does not cancel the others' result
+            task = state.in_flight[key] = asyncio.create_task(self._fetch(state, key, text, source, target))
+            task.add_done_callback(lambda _: state.in_flight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def translate_batch(self, texts: List[str], source: str = "en", target: str = "te-IN") -> List[dict]:
+        """Results in the order of `texts`; each distinct text is translated once."""
+        unique = list(dict.fromkeys(texts))
+        results = await asyncio.gather(*(self.translate(text, source, target) for text in unique))
+        by_text = dict(zip(unique, results))
+        return [by_text[text] for text in texts]
+
+    async def aclose(self):
+        """Close the connection pool of the running loop."""
+        state = self._loops.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.aclose()
+
+
+_translator: Optional[SarvamTranslator] = None
+
+
+def get_translator() -> SarvamTranslator:
+    """The shared translator, with the on-disk translation memory."""
+    global _translator
+    if _translator is None:
+        _translator = SarvamTranslator(memory=TranslationMemory())
+    return _translator
+
+
+async def aclose_translator():
+    """Close the shared translator's connections (app shutdown)."""
+    if _translator is not None:
+        await _translator.aclose()
+
+
+def set_translator(translator: Optional[SarvamTranslator]) -> Optional[SarvamTranslator]:
+    """Swap the shared translator (e.g. for one on a mock transport); returns the previous one."""
+    global _translator
+    previous, _translator = _translator, translator
+    return previous
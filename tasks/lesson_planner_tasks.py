@@ -7,7 +7,7 @@ class LessonOutputSchema(BaseModel):
     introduction: str = Field(..., description="Introductory explanation of the topic")
     core_concepts: List[str] = Field(..., description="Key concepts listed in bullet points")
     explanation: str = Field(..., description="Deep explanation with cultural relevance")
-    examples: List[str] = Field(..., description="Examples for easier understanding")
+    examples: List[str] = Field(default=[], description="Examples for easier understanding (the prompt lets the model omit them)")
     summary: str = Field(..., description="Brief summary covering all key ideas")
     suggested_agents: List[str] = Field(
         default=["QuizAgent", "StoryTellerAgent", "VisualAgent"],
@@ -1,18 +1,6 @@
 from tasks.base import BaseTask  # Assuming this exists in your project
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
-from tools.quiz_generation_tool import QuizGenerationTool
-
-class QuizOutputSchema(BaseModel):
-    topic: str = Field(..., description="Topic of the quiz based on the lesson")
-    grade_level: str = Field(..., description="Target grade level for the quiz")
-    questions: List[Dict[str, Any]] = Field(
-        ...,
-        description="List of questions with text, options, correct answer, and explanation"
-    )
-    format_type: str = Field(..., description="Format of quiz questions, e.g., MCQ, Fill-in-the-blank")
-    total_marks: int = Field(..., description="Total marks for the quiz")
-    dialect_adapted: bool = Field(..., description="Whether the questions are adapted for regional dialect")
+# The schema lives with the tool, which validates Gemini's output against it
+from tools.quiz_generation_tool import QuizGenerationTool, QuizOutputSchema
 
 class QuizTask(BaseTask):
     name = "Generate Quiz from Lesson"
@@ -60,7 +48,7 @@ class QuizTask(BaseTask):
             dict: Quiz data conforming to QuizOutputSchema or fallback on failure.
         """
         try:
-            result = self.quiz_tool.run(inputs)
+            result = await self.quiz_tool.arun(inputs)
             return result
         except Exception as e:
             return {
@@ -62,9 +62,8 @@ Use dialect requested for BhāṣāGuru narration compatibility."""
             dict: Dictionary conforming to StoryOutputSchema, generated by the tool.
         """
         try:
-            # Call the run method of the StoryGenerationTool instance
-            # Note: The tool's run method is currently synchronous, so no await needed here
-            result = self.story_tool.run(inputs)
+            # Use the tool's async path so the event loop is not blocked by the LLM call
+            result = await self.story_tool.arun(inputs)
             return result
         except Exception as e:
             # Return fallback response on error
@@ -1,13 +1,17 @@
 from tasks import Task
 from pydantic import BaseModel, Field
-from typing import List
-import datetime
+from typing import Dict, List
+import asyncio
 
 class SyncStatusSchema(BaseModel):
     firestore_status: str = Field(..., description="Status of Firestore sync: Synced / Error / Offline")
     indexeddb_status: str = Field(..., description="IndexedDB local cache sync: Synced / Error / Stale")
     last_sync_timestamp: str = Field(..., description="Timestamp of last sync completion")
     offline_students: List[str] = Field(default=[], description="List of students still offline")
+    pending_changes: int = Field(default=0, description="Local documents with changes not yet uploaded")
+    pending_by_collection: Dict[str, int] = Field(default={}, description="Pending documents per collection")
+    downloaded: int = Field(default=0, description="Documents received from Firestore in this run")
+    uploaded: int = Field(default=0, description="Documents uploaded to Firestore in this run")
 
 
 # The Task configuration object
@@ -36,7 +40,11 @@ sync_task_config = Task(
             "firestore_status": "Error",
             "indexeddb_status": "Stale",
             "last_sync_timestamp": "unknown",
-            "offline_students": []
+            "offline_students": [],
+            "pending_changes": 0,
+            "pending_by_collection": {},
+            "downloaded": 0,
+            "uploaded": 0
         }
     },
     metadata={
@@ -49,19 +57,37 @@ sync_task_config = Task(
 
 # ✅ Wrap it inside a class that supports .run()
 class SyncTask:
+    def __init__(self, sync_tool=None):
+        self.sync_tool = sync_tool
+
     async def run(self, input_data: dict) -> dict:
+        """
+        Sync every student in `student_ids` (or `student_id`) through the SyncTool.
+        Students whose sync fails are reported offline; their changes stay queued.
+        """
+        fallback = sync_task_config.guardrails["fallback_response"]
+        if self.sync_tool is None:
+            return dict(fallback)
+        student_ids = input_data.get("student_ids") or [input_data.get("student_id")]
+        student_ids = [student_id for student_id in student_ids if student_id]
         try:
-            # Simulate actual sync processing — replace this with real logic
-            return {
-                "firestore_status": "Synced",
-                "indexeddb_status": "Synced",
-                "last_sync_timestamp": datetime.datetime.now().isoformat(),
-                "offline_students": input_data.get("offline_students", [])
-            }
-        except Exception as e:
-            return {
-                "firestore_status": "Error",
-                "indexeddb_status": "Stale",
-                "last_sync_timestamp": "unknown",
-                "offline_students": []
-            }
+            reports = []
+            for student_id in student_ids:
+                # SyncEngine is blocking (SQLite outbox, sync Firestore client)
+                reports.append(await asyncio.to_thread(self.sync_tool.sync, student_id))
+            status = self.sync_tool.status()
+        except Exception:
+            return dict(fallback)
+
+        offline = [report["owner"] for report in reports if report["error"]]
+        pending = status["pending_changes"]
+        return SyncStatusSchema(
+            firestore_status="Error" if offline else "Synced",
+            indexeddb_status="Stale" if pending else "Synced",
+            last_sync_timestamp=status["last_sync_timestamp"] or "unknown",
+            offline_students=sorted(set(offline) | set(input_data.get("offline_students", []))),
+            pending_changes=pending,
+            pending_by_collection=status["pending_by_collection"],
+            downloaded=sum(report["downloaded"] for report in reports),
+            uploaded=sum(report["uploaded"] for report in reports),
+        ).model_dump()
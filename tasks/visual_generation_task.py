@@ -63,9 +63,8 @@ Optionally, include narration cues or audiovisual ideas if needed."""
             dict: Dictionary conforming to VisualOutputSchema, generated by the tool.
         """
         try:
-            # Call the run method of the VisualGenerationTool instance
-            # Note: The tool's run method is currently synchronous, so no await needed here
-            result = self.visual_tool.run(inputs)
+            # Use the tool's async path so the event loop is not blocked by the LLM call
+            result = await self.visual_tool.arun(inputs)
             return result
         except Exception as e:
             # Return fallback response on error
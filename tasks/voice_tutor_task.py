@@ -1,5 +1,5 @@
-import asyncio
-from typing import Dict
+from typing import AsyncIterator, Dict
+from tools.base import arun_tool
 from tools.voice_tutor_tool import VoiceTutorTool
 
 class VoiceTutorTask:
@@ -7,10 +7,13 @@ class VoiceTutorTask:
         self.tool = VoiceTutorTool()
 
     async def run(self, input_text: str, dialect: str = "default") -> Dict[str, str]:
-        loop = asyncio.get_running_loop()
         try:
-            # Run synchronous tool method in thread executor to avoid blocking
-            result = await loop.run_in_executor(None, self.tool.generate_voice_tutor, input_text, dialect)
+            # The TTS tool is synchronous; arun_tool offloads it to a worker thread
+            result = await arun_tool(self.tool, {"text": input_text, "dialect": dialect})
             return result
         except Exception as e:
             raise RuntimeError(f"VoiceTutorTask failed: {str(e)}") from e
+
+    def stream(self, input_text: str, dialect: str = "default") -> AsyncIterator[bytes]:
+        """MP3 chunks in playback order, synthesized sentence by sentence."""
+        return self.tool.astream_voice_tutor(input_text, dialect)
@@ -0,0 +1,71 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+from crewflows import AgentRegistry
+
+
+class SlowFactory:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        time.sleep(self.delay)
+        with self._lock:
+            self.builds += 1
+        return object()
+
+
+def test_agents_are_built_on_first_use_only():
+    factory = SlowFactory()
+    registry = AgentRegistry()
+    registry.register("quiz", factory)
+
+    assert factory.builds == 0 and not registry.is_built("quiz")
+    agent = registry.get("quiz")
+    assert registry.get("quiz_agent") is agent  # instance name resolves to the same entry
+    assert factory.builds == 1
+    assert registry.stats()["quiz"]["build_seconds"] >= factory.delay
+
+
+def test_concurrent_first_requests_build_once():
+    factory = SlowFactory(delay=0.1)
+    registry = AgentRegistry()
+    registry.register("voice_tutor", factory)
+
+    async def scenario():
+        return await asyncio.gather(*(registry.aget("voice_tutor") for _ in range(8)))
+
+    agents = asyncio.run(scenario())
+    assert factory.builds == 1
+    assert all(agent is agents[0] for agent in agents)
+
+
+def test_module_factories_import_lazily(tmp_path, monkeypatch):
+    (tmp_path / "fake_story_agent.py").write_text("story_teller_agent = object()\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry = AgentRegistry()
+    registry.register("story_teller", "fake_story_agent:story_teller_agent")
+
+    assert "fake_story_agent" not in sys.modules
+    assert registry.instance_name("story_teller") == "story_teller_agent"
+    assert registry.get("story_teller") is sys.modules["fake_story_agent"].story_teller_agent
+
+
+def test_warm_up_reports_failures_without_stopping():
+    def broken():
+        raise RuntimeError("no credentials")
+
+    registry = AgentRegistry()
+    registry.register("sync", broken)
+    registry.register("quiz", SlowFactory(delay=0))
+
+    assert registry.warm_up() == {"sync": "no credentials", "quiz": None}
+    assert registry.is_built("quiz") and not registry.is_built("sync")
+    with pytest.raises(KeyError):
+        registry.get("unknown")
@@ -0,0 +1,151 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from firestore import async_repository as repo
+from firestore.testing import AsyncFakeFirestore
+from routes.firestore_routes import router
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = AsyncFakeFirestore()
+    monkeypatch.setattr(repo, "_client", fake)
+    return fake
+
+
+async def seed(client, count, user_id="student123"):
+    start = datetime(2025, 1, 1)
+    quizzes = client.collection("quiz_results")
+    for index in range(count):
+        await quizzes.document(f"q{index:04d}").set({
+            "user_id": user_id,
+            "score": index,
+            "submitted_at": start + timedelta(minutes=index // 2),
+        })
+    await quizzes.document("other").set({"user_id": "someone_else", "score": 0, "submitted_at": start})
+
+
+def test_async_pages_match_full_listing(client):
+    async def scenario():
+        await seed(client, 25)
+        seen, cursor = [], None
+        while True:
+            page = await repo.get_quiz_results_page("student123", limit=10, start_after=cursor, fields=["score"])
+            seen.extend(item["id"] for item in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                return seen, await repo.get_quiz_results("student123")
+
+    seen, everything = asyncio.run(scenario())
+    assert seen == [f"q{index:04d}" for index in reversed(range(25))]
+    assert [item["id"] for item in everything] == seen
+
+
+def test_class_membership_and_quiz_fan_out(client):
+    async def scenario():
+        await client.collection("users").document("t1").set({"role": "teacher"})
+        await repo.create_class("c1", {"name": "Class 7"}, "t1", "science")
+        for student_id in ("s1", "s2"):
+            await client.collection("students").document(student_id).set({"linked_classes": []})
+            await repo.add_student_to_class("c1", student_id)
+        with pytest.raises(ValueError):
+            await repo.add_student_to_class("c1", "missing")
+        return await repo.post_quiz_result("t1", "c1", "science", {"title": "Plants"})
+
+    result = asyncio.run(scenario())
+    assert result["posted"] == 2 and result["failed"] == 0
+    assert client._docs["users/t1"]["teacherOf"] == ["c1"]
+    for student_id in ("s1", "s2"):
+        doc_id = f"{result['quiz_id']}_{student_id}"
+        assert client._docs[f"quiz_results/{doc_id}"]["title"] == "Plants"
+        assert client._docs[f"classes/c1/quiz_results/{doc_id}"]["student_id"] == student_id
+
+
+def test_create_class_is_one_read_free_batch(client):
+    async def scenario():
+        await client.collection("users").document("t1").set({"role": "teacher", "teacherOf": ["old"]})
+        rpcs = client.rpcs
+        # Concurrent creations for one teacher must not overwrite each other's teacherOf
+        await asyncio.gather(*(repo.create_class(f"c{index}", {}, "t1", "maths") for index in range(3)))
+        assert client.rpcs - rpcs == 3
+        with pytest.raises(ValueError, match="already exists"):
+            await repo.create_class("c0", {}, "t1", "maths")
+        with pytest.raises(ValueError, match="Teacher not found"):
+            await repo.create_class("c9", {}, "nobody", "maths")
+
+    asyncio.run(scenario())
+    assert sorted(client._docs["users/t1"]["teacherOf"]) == ["c0", "c1", "c2", "old"]
+    assert "classes/c9" not in client._docs
+
+
+def test_bulk_enrollment_batches_and_skips_unknown_students(client):
+    async def scenario():
+        await client.collection("classes").document("c1").set({"students": ["s0000"]})
+        for index in range(1200):
+            await client.collection("students").document(f"s{index:04d}").set({"linked_classes": []})
+        rpcs = client.rpcs
+        roster = [f"s{index:04d}" for index in range(1200)] + ["ghost", "s0001"]
+        result = await repo.enroll_students("c1", roster)
+        # Three batches, plus one lookup and one retry for the batch holding "ghost"
+        assert client.rpcs - rpcs == 5
+        with pytest.raises(ValueError, match="Class not found"):
+            await repo.enroll_students("nope", ["s0001"])
+        return result
+
+    result = asyncio.run(scenario())
+    assert result["missing"] == ["ghost"]
+    assert len(result["enrolled"]) == 1200
+    assert len(client._docs["classes/c1"]["students"]) == 1200
+    assert client._docs["students/s0500"]["linked_classes"] == ["c1"]
+
+
+def test_guard_bounds_concurrent_operations(client, monkeypatch):
+    monkeypatch.setattr(repo, "MAX_CONCURRENCY", 5)
+    monkeypatch.setattr(repo, "_guards", repo.weakref.WeakKeyDictionary())
+    client.rpc_latency = 0.01
+
+    async def burst():
+        await asyncio.gather(*(repo.log_qa(f"u{index}", "q", "a") for index in range(50)))
+
+    asyncio.run(burst())
+    assert client.rpcs == 50
+    assert client.max_in_flight == 5
+
+
+def test_register_user_runs_auth_off_the_event_loop(client, monkeypatch):
+    calls = []
+
+    def create_user(email, password):
+        calls.append(email)
+        return SimpleNamespace(uid="uid-1")
+
+    monkeypatch.setattr(repo.auth, "create_user", create_user)
+    uid = asyncio.run(repo.register_user("a@b.c", "pw", "student", {"student_id": "s9", "name": "Asha"}))
+
+    assert uid == "uid-1" and calls == ["a@b.c"]
+    assert client._docs["students/s9"]["uid"] == "uid-1"
+
+
+def test_routes_are_async_and_stream_listings(client):
+    asyncio.run(seed(client, 3))
+    app = FastAPI()
+    app.include_router(router, prefix="/firestore")
+
+    with TestClient(app) as http:
+        listing = http.get("/firestore/get_quizzes/student123", params={"fields": "score"}).json()
+        page = http.get("/firestore/get_quizzes/student123", params={"limit": 2}).json()
+        assert http.post("/firestore/create_user", json={
+            "user_id": "u1", "name": "Ravi", "email": "r@x.in", "role": "teacher"}).status_code == 200
+        profile = http.get("/firestore/get_user/u1").json()
+        missing = http.get("/firestore/get_user/nobody")
+
+    assert [item["id"] for item in listing] == ["q0002", "q0001", "q0000"]
+    assert set(listing[0]) == {"id", "score", "submitted_at"}
+    assert page["next_cursor"] == "q0001"
+    assert profile["name"] == "Ravi"
+    assert missing.status_code == 404
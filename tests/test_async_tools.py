@@ -0,0 +1,90 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from tools.base import BaseTool, arun_tool
+from tools.quiz_generation_tool import QuizGenerationTool
+
+
+class FakeAsyncLLM:
+    """Answers after a delay on ainvoke; fails the test if the blocking API is used."""
+
+    def __init__(self, payload, delay=0.05):
+        self.payload = payload
+        self.delay = delay
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(content=json.dumps(self.payload))
+
+    def invoke(self, prompt):
+        raise AssertionError("blocking invoke() called from the async path")
+
+    predict = invoke
+
+
+class LegacySyncTool:
+    def run(self, inputs):
+        time.sleep(0.05)
+        return {"thread": threading.get_ident(), **inputs}
+
+
+def make_quiz_tool(llm):
+    tool = QuizGenerationTool.__new__(QuizGenerationTool)
+    tool.llm = llm
+    tool.use_cache = False
+    return tool
+
+
+def test_arun_tool_offloads_legacy_sync_tools():
+    async def scenario():
+        loop_thread = threading.get_ident()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(arun_tool(LegacySyncTool(), {"n": i}) for i in range(4)))
+        return loop_thread, results, time.perf_counter() - started
+
+    loop_thread, results, elapsed = asyncio.run(scenario())
+    assert [r["n"] for r in results] == [0, 1, 2, 3]
+    assert all(r["thread"] != loop_thread for r in results)
+    assert elapsed < 0.15
+
+
+def test_base_tool_default_arun_uses_run():
+    class EchoTool(BaseTool):
+        def run(self, inputs):
+            return {"echo": inputs["value"]}
+
+    assert asyncio.run(EchoTool("echo").arun({"value": 3})) == {"echo": 3}
+
+
+def test_quiz_tool_arun_uses_native_async_client_concurrently():
+    payload = {"quiz_json": {"questions": []}, "adaptive_quiz_set": {}, "retry_feedback_report": {}}
+    llm = FakeAsyncLLM(payload)
+    tool = make_quiz_tool(llm)
+
+    async def scenario():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(tool.arun({"topic": "Plants"}) for _ in range(10)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(scenario())
+    assert results == [payload] * 10
+    assert llm.prompts[0] == tool._build_prompt({"topic": "Plants"})
+    # Ten 50ms calls overlap on one event loop instead of taking 500ms
+    assert elapsed < 0.3
+
+
+def test_quiz_tool_arun_falls_back_on_invalid_json():
+    llm = FakeAsyncLLM(payload=None)
+    llm.ainvoke = lambda prompt: _return(SimpleNamespace(content="not json"))
+    tool = make_quiz_tool(llm)
+    result = asyncio.run(tool.arun({"topic": "Plants", "dialect": "Telangana"}))
+    assert result == tool.get_fallback()
+
+
+async def _return(value):
+    return value
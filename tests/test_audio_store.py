@@ -0,0 +1,104 @@
+import os
+from types import SimpleNamespace
+
+from google.cloud import texttospeech
+
+from tools.utils.audio_store import AudioStore
+from tools.voice_tutor_tool import VoiceTutorTool
+
+
+class FakeTTSClient:
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize_speech(self, input, voice, audio_config):
+        self.calls += 1
+        return SimpleNamespace(audio_content=f"mp3:{input.ssml}:{voice.language_code}".encode())
+
+
+def make_tool(tmp_path, max_cache_bytes=1024 * 1024):
+    tool = VoiceTutorTool.__new__(VoiceTutorTool)
+    tool.client = FakeTTSClient()
+    tool.audio_output_dir = str(tmp_path)
+    tool.audio_store = AudioStore(str(tmp_path), max_bytes=max_cache_bytes)
+    return tool
+
+
+def test_identical_requests_reuse_one_file(tmp_path):
+    tool = make_tool(tmp_path)
+
+    first = tool.generate_voice_tutor("Plants make food.", "telangana")
+    second = tool.generate_voice_tutor("Plants make food.", "telangana")
+
+    assert tool.client.calls == 1
+    assert first["audio_file"] == second["audio_file"]
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert len([f for f in os.listdir(tmp_path) if f.endswith(".mp3")]) == 1
+
+
+def test_voice_params_are_part_of_the_key(tmp_path):
+    tool = make_tool(tmp_path)
+
+    telangana = tool.generate_voice_tutor("Plants make food.", "telangana")
+    andhra = tool.generate_voice_tutor("Plants make food.", "andhra")
+
+    assert tool.client.calls == 2
+    assert telangana["audio_file"] != andhra["audio_file"]
+
+
+def test_key_is_stable_for_equal_proto_messages():
+    config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
+    voice = texttospeech.VoiceSelectionParams(language_code="te-IN")
+    same_voice = texttospeech.VoiceSelectionParams(language_code="te-IN")
+    assert AudioStore.key_for("<speak>x</speak>", voice, config) == AudioStore.key_for("<speak>x</speak>", same_voice, config)
+
+
+def test_least_recently_used_audio_is_evicted_over_the_cap(tmp_path):
+    store = AudioStore(str(tmp_path), max_bytes=250)
+    store.put("a", b"x" * 100)
+    store.put("b", b"x" * 100)
+    store.get("a")  # "b" is now the least recently used
+    store.put("c", b"x" * 100)
+
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert not os.path.exists(tmp_path / "b.mp3")
+    assert store.total_bytes == 200
+
+
+def test_index_survives_restart_and_ignores_foreign_files(tmp_path):
+    (tmp_path / "legacy-uuid.mp3").write_bytes(b"old")
+    AudioStore(str(tmp_path)).put("k", b"audio")
+
+    reopened = AudioStore(str(tmp_path), max_bytes=1)
+    assert reopened.get("k") == os.path.join(str(tmp_path), "k.mp3")
+    reopened.put("j", b"more audio")
+    assert (tmp_path / "legacy-uuid.mp3").exists()
+
+
+def test_key_locks_are_dropped_once_released(tmp_path):
+    tool = make_tool(tmp_path)
+    for topic in ("Plants", "Animals", "Rivers"):
+        tool.generate_voice_tutor(f"{topic} make food.", "telangana")
+
+    assert len(tool.audio_store._key_locks) == 0
+    with tool.audio_store.lock_for("k") as held:
+        assert tool.audio_store.lock_for("k") is held
+
+
+def test_audio_evicted_between_lookup_and_read_is_synthesized_again(tmp_path):
+    tool = make_tool(tmp_path)
+    ssml = tool._build_ssml("Plants make food.", "telangana")
+    first = tool.synthesize_ssml(ssml, "telangana")
+
+    store_get = tool.audio_store.get
+
+    def get_then_evict(key):
+        path = store_get(key)
+        if path is not None:
+            os.remove(path)  # another request's put() evicted it before we opened it
+        return path
+
+    tool.audio_store.get = get_then_evict
+    assert tool.synthesize_ssml(ssml, "telangana") == first
+    assert tool.client.calls == 2
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from firestore.batch_writer import chunk_groups, commit_grouped_writes
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, data))
+
+    def commit(self):
+        with self.client.lock:
+            self.client.commits += 1
+            if self.client.fail_next > 0:
+                self.client.fail_next -= 1
+                raise ConnectionError("deadline exceeded")
+            if any(data.get("student_id") in self.client.poisoned for _, data in self.writes):
+                raise PermissionError("missing permissions")
+            self.client.docs.update({ref: data for ref, data in self.writes})
+
+
+class FakeClient:
+    def __init__(self, fail_next=0, poisoned=()):
+        self.lock = threading.Lock()
+        self.commits = 0
+        self.fail_next = fail_next
+        self.poisoned = set(poisoned)
+        self.docs = {}
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def quiz_writes(students):
+    return {
+        s: [(f"quiz_results/q1_{s}", {"student_id": s}), (f"classes/c1/quiz_results/q1_{s}", {"student_id": s})]
+        for s in students
+    }
+
+
+def test_groups_are_packed_without_splitting():
+    groups = quiz_writes([f"s{i}" for i in range(7)])
+    chunks = chunk_groups(groups, max_ops=5)
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2, 1]
+    with pytest.raises(ValueError):
+        chunk_groups({"big": [("ref", {})] * 6}, max_ops=5)
+
+
+def test_class_fan_out_takes_a_handful_of_commits():
+    client = FakeClient()
+    students = [f"s{i}" for i in range(600)]
+    status = commit_grouped_writes(client, quiz_writes(students), retry_delay=0)
+
+    assert set(status.values()) == {"ok"}
+    assert client.commits == 3  # 1200 writes / 500 per batch
+    assert len(client.docs) == 1200
+
+
+def test_transient_failures_are_retried_idempotently():
+    client = FakeClient(fail_next=2)
+    status = commit_grouped_writes(client, quiz_writes(["s1", "s2"]), retry_delay=0)
+    assert status == {"s1": "ok", "s2": "ok"}
+    assert len(client.docs) == 4
+
+
+def test_failing_batch_reports_its_students_only():
+    client = FakeClient(poisoned={"s0"})
+    status = commit_grouped_writes(client, quiz_writes(["s0", "s1", "s2", "s3"]), max_ops=4, retry_delay=0)
+    assert status["s0"].startswith("failed") and status["s1"].startswith("failed")
+    assert status["s2"] == status["s3"] == "ok"
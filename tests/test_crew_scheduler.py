@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+from crewflows import Agent, Crew
+
+
+class SleepyAgent(Agent):
+    def __init__(self, name, delay=0.05, fail=False, **kwargs):
+        super().__init__(name, role="test", goal="test", **kwargs)
+        self.delay = delay
+        self.fail = fail
+        self.seen_inputs = None
+        self.started_at = None
+
+    async def process(self, inputs):
+        self.seen_inputs = inputs
+        self.started_at = time.perf_counter()
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} exploded")
+        return {output: f"{self.name}:{output}" for output in self.outputs} or {"ok": self.name}
+
+
+def build_lesson_crew():
+    lesson = SleepyAgent("lesson_planner_agent")
+    lesson.add_input("topic")
+    lesson.add_output("lesson_plan_json")
+
+    quiz = SleepyAgent("quiz_agent", metadata={"downstream": ["CoursePlannerAgent"]})
+    quiz.add_input(["lesson_plan_json", "LessonPlannerAgent"])
+    quiz.add_output("quiz_json")
+
+    course = SleepyAgent("course_planner_agent")
+    voice = SleepyAgent("voice_tutor_agent")
+    research = SleepyAgent("multimodal_research_agent")
+    return [lesson, quiz, course, voice, research]
+
+
+def test_independent_agents_run_concurrently():
+    agents = build_lesson_crew()
+    crew = Crew(agents=agents)
+
+    started = time.perf_counter()
+    results = asyncio.run(crew.run({"topic": "Photosynthesis"}))
+    elapsed = time.perf_counter() - started
+
+    assert set(results) == {agent.name for agent in agents}
+    # Longest chain is lesson -> quiz -> course (3 x 50ms), not the 5 x 50ms sequential sum
+    assert elapsed < 0.22
+
+
+def test_dependants_receive_upstream_results_after_it_finishes():
+    lesson, quiz, course, _, _ = agents = build_lesson_crew()
+    crew = Crew(agents=agents)
+
+    asyncio.run(crew.run({"topic": "Photosynthesis"}))
+
+    assert crew.graph.dependencies["quiz_agent"] == {"lesson_planner_agent"}
+    assert crew.graph.dependencies["course_planner_agent"] == {"quiz_agent"}
+    assert quiz.started_at >= lesson.started_at + lesson.delay
+    assert quiz.seen_inputs["lesson_plan_json"] == "lesson_planner_agent:lesson_plan_json"
+    assert quiz.seen_inputs["LessonPlannerAgent"] == {"lesson_plan_json": "lesson_planner_agent:lesson_plan_json"}
+    assert course.seen_inputs["topic"] == "Photosynthesis"
+
+
+def test_caller_inputs_are_not_overridden():
+    _, quiz, _, _, _ = agents = build_lesson_crew()
+    asyncio.run(Crew(agents=agents).run({"topic": "Plants", "lesson_plan_json": {"given": True}}))
+    assert quiz.seen_inputs["lesson_plan_json"] == {"given": True}
+
+
+def test_report_has_timings_and_critical_path():
+    crew = Crew(agents=build_lesson_crew())
+    _, report = asyncio.run(crew.run_with_report({"topic": "Photosynthesis"}))
+
+    timings = report.to_dict()
+    assert timings["critical_path"] == ["lesson_planner_agent", "quiz_agent", "course_planner_agent"]
+    assert timings["agents"]["voice_tutor_agent"]["depends_on"] == []
+    assert all(node["status"] == "completed" for node in timings["agents"].values())
+    assert crew.last_report is report
+
+
+def test_failed_agent_does_not_stop_dependants():
+    lesson = SleepyAgent("lesson_planner_agent", fail=True)
+    lesson.add_output("lesson_plan_json")
+    quiz = SleepyAgent("quiz_agent")
+    quiz.add_input("LessonPlannerAgent")
+
+    results, report = asyncio.run(Crew(agents=[lesson, quiz]).run_with_report({}))
+
+    assert results["lesson_planner_agent"] == {"error": "lesson_planner_agent exploded"}
+    assert results["quiz_agent"] == {"ok": "quiz_agent"}
+    assert "LessonPlannerAgent" not in quiz.seen_inputs
+    assert report.nodes["lesson_planner_agent"].status == "failed"
+
+
+def test_cycles_fall_back_to_declaration_order():
+    first = SleepyAgent("first_agent", delay=0)
+    second = SleepyAgent("second_agent", delay=0)
+    first.add_input("SecondAgent")
+    second.add_input("FirstAgent")
+
+    crew = Crew(agents=[first, second])
+    results = asyncio.run(crew.run({}))
+
+    assert list(results) == ["first_agent", "second_agent"]
+    assert crew.graph.dependencies == {"first_agent": set(), "second_agent": {"first_agent"}}
+
+
+def test_pass_through_outputs_do_not_create_dependencies():
+    voice = SleepyAgent("voice_tutor")
+    voice.add_input("dialect")
+    voice.add_output("dialect")
+    lesson = SleepyAgent("lesson_planner_agent")
+    lesson.add_input("dialect")
+
+    crew = Crew(agents=[voice, lesson])
+    assert crew.graph.dependencies["lesson_planner_agent"] == set()
+
+
+def test_results_are_reported_as_each_agent_finishes():
+    agents = build_lesson_crew()
+    agents[3].delay = 0.0  # voice tutor finishes first
+    agents[3].fail = True
+    crew = Crew(agents=agents)
+    finished = []
+
+    async def on_result(name, result, timing):
+        finished.append((name, timing.status, "error" in result))
+
+    asyncio.run(crew.run_with_report({"topic": "Photosynthesis"}, on_result=on_result))
+
+    assert finished[0] == ("voice_tutor_agent", "failed", True)
+    names = [name for name, _, _ in finished]
+    assert names.index("lesson_planner_agent") < names.index("quiz_agent") < names.index("course_planner_agent")
+    assert len(finished) == len(agents)
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+# main.py refuses to import without these; nothing here calls Google
+for _name, _value in (("GOOGLE_API_KEY", "test"), ("GOOGLE_APPLICATION_CREDENTIALS", "test.json"),
+                      ("VIDYAVAHINI_API_KEY", "test")):
+    os.environ.setdefault(_name, _value)
+
+import main  # noqa: E402
+from crewflows import Agent, Crew  # noqa: E402
+from rate_limit import RateLimit, RateLimiter  # noqa: E402
+from tools.utils import metrics  # noqa: E402
+
+
+class TimedAgent(Agent):
+    def __init__(self, name, delay, fail=False):
+        super().__init__(name, role="test", goal="test")
+        self.delay = delay
+        self.fail = fail
+
+    async def process(self, inputs):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} exploded")
+        return {"ok": self.name}
+
+
+@pytest.fixture
+def crew(monkeypatch):
+    agents = {"story_teller_agent": TimedAgent("story_teller_agent", 0.01),
+              "quiz_agent": TimedAgent("quiz_agent", 0.05, fail=True),
+              "voice_tutor_agent": TimedAgent("voice_tutor_agent", 0.1)}
+    runs = []
+
+    async def run_crew_agents(agent_names, prompt, on_result=None):
+        runs.append(agent_names)
+        return await Crew(agents=[agents[name] for name in agent_names]).run_with_report(
+            {"prompt": prompt}, on_result=on_result)
+
+    monkeypatch.setattr(main, "run_crew_agents", run_crew_agents)
+    monkeypatch.setattr(main, "rate_limiter", RateLimiter.from_env(default=RateLimit(1000, 60)))
+    return runs
+
+
+async def post_run(query="", accept=None):
+    headers = {"x-api-key": main.API_KEY, "x-user-role": "student"}
+    if accept:
+        headers["accept"] = accept
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(f"/api/run{query}", json={"prompt": "Photosynthesis for grade 5"}, headers=headers)
+
+
+def test_ndjson_emits_each_agent_as_it_finishes(crew):
+    response = asyncio.run(post_run("?stream=ndjson"))
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [(event["event"], event.get("agent")) for event in events] == [
+        ("result", "story_teller_agent"), ("result", "quiz_agent"), ("result", "voice_tutor_agent"), ("done", None),
+    ]
+    story, quiz, voice, done = events
+    assert story["result"] == {"ok": "story_teller_agent"} and story["elapsed"] < voice["elapsed"]
+    assert quiz["status"] == "failed" and quiz["result"] == {"error": "quiz_agent exploded"}
+    assert voice["duration"] >= 0.1
+    assert set(done["timings"]["agents"]) == {"story_teller_agent", "quiz_agent", "voice_tutor_agent"}
+
+
+def test_sse_is_chosen_by_accept_header_and_plain_json_stays_the_default(crew):
+    streamed = asyncio.run(post_run(accept="text/event-stream"))
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+    assert streamed.text.count("event: result\n") == 3 and streamed.text.rstrip().split("\n")[-2] == "event: done"
+
+    plain = asyncio.run(post_run())
+    assert set(plain.json()["result"]) == {"story_teller_agent", "quiz_agent", "voice_tutor_agent"}
+    assert asyncio.run(post_run("?stream=xml")).status_code == 400
+
+
+def test_request_span_lasts_until_the_stream_ends(crew):
+    spans = metrics.InMemorySpanCollector()
+    metrics.add_span_exporter(spans)
+    try:
+        asyncio.run(post_run("?stream=ndjson"))
+    finally:
+        metrics.remove_span_exporter(spans)
+
+    request, = spans.by_kind("request")
+    agents = spans.by_kind("agent")
+    assert request.name == "POST /api/run" and request.attributes["status_code"] == 200
+    # The slowest agent finishes after the headers went out; the request span still covers it
+    assert request.duration >= 0.1 and spans.spans[-1] is request
+    assert {span.trace_id for span in agents} == {request.trace_id}
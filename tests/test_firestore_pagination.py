@@ -0,0 +1,81 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from firestore.pagination import ORDER_FIELDS, fetch_page, iter_documents
+from firestore.testing import FakeFirestore
+from tools.utils.sync_engine import SYNC_COLLECTIONS, owner_fields
+
+
+def seed(client, count, user_id="student123"):
+    start = datetime(2025, 1, 1)
+    quizzes = client.collection("quiz_results")
+    for index in range(count):
+        quizzes.document(f"q{index:04d}").set({
+            "user_id": user_id,
+            "score": index,
+            "questions": [{"q": "?"}] * 5,
+            # Pairs of results share a timestamp to exercise the document-id tie-break
+            "submitted_at": start + timedelta(minutes=index // 2),
+        })
+    quizzes.document("other").set({"user_id": "someone_else", "score": 0, "submitted_at": start})
+    return quizzes
+
+
+def test_cursor_pages_cover_every_document_once_newest_first():
+    client = FakeFirestore()
+    quizzes = seed(client, 25)
+    query = quizzes.where("user_id", "==", "student123")
+
+    seen, cursor = [], None
+    while True:
+        page = fetch_page(quizzes, query, "submitted_at", limit=10, start_after=cursor)
+        seen.extend(item["id"] for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == [f"q{index:04d}" for index in reversed(range(25))]
+
+
+def test_projection_limits_fields():
+    client = FakeFirestore()
+    quizzes = seed(client, 3)
+    page = fetch_page(quizzes, quizzes.where("user_id", "==", "student123"), "submitted_at",
+                      limit=2, fields=["score"])
+    assert set(page.items[0]) == {"id", "score", "submitted_at"}
+
+
+def test_unknown_cursor_is_rejected():
+    client = FakeFirestore()
+    quizzes = seed(client, 3)
+    with pytest.raises(ValueError):
+        fetch_page(quizzes, quizzes, "submitted_at", start_after="missing")
+
+
+def test_iter_documents_reads_page_by_page():
+    client = FakeFirestore()
+    quizzes = seed(client, 45)
+    items = iter_documents(quizzes.where("user_id", "==", "student123"), "submitted_at", page_size=20)
+
+    first = next(items)
+    assert first["id"] == "q0044"
+    assert client.documents_read == 20  # only the first page has been fetched
+    assert len([first, *items]) == 45
+
+
+def test_every_composite_query_has_a_deployed_index():
+    path = os.path.join(os.path.dirname(__file__), os.pardir, "firestore.indexes.json")
+    with open(path, encoding="utf-8") as f:
+        indexes = {(index["collectionGroup"], tuple((field["fieldPath"], field["order"]) for field in index["fields"]))
+                   for index in json.load(f)["indexes"]}
+
+    for collection, order_field in ORDER_FIELDS.items():
+        assert (collection, (("user_id", "ASCENDING"), (order_field, "DESCENDING"),
+                             ("__name__", "DESCENDING"))) in indexes
+    for collection in SYNC_COLLECTIONS:
+        for owner_field in owner_fields(SYNC_COLLECTIONS, collection):
+            assert (collection, ((owner_field, "ASCENDING"), ("_sync.updated_at", "ASCENDING"),
+                                 ("__name__", "ASCENDING"))) in indexes
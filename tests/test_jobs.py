@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+# main.py refuses to import without these; nothing here calls Google
+for _name, _value in (("GOOGLE_API_KEY", "test"), ("GOOGLE_APPLICATION_CREDENTIALS", "test.json"),
+                      ("VIDYAVAHINI_API_KEY", "test")):
+    os.environ.setdefault(_name, _value)
+
+import main  # noqa: E402
+from crewflows import jobs  # noqa: E402
+from crewflows.jobs import (COMPLETED, FAILED, QUEUED, FirestoreJobStore, JobQueue,  # noqa: E402
+                            JobQueueFull, JobStore, UnsafeWebhookURL, check_webhook_url)
+from firestore.testing import AsyncFakeFirestore  # noqa: E402
+from rate_limit import RateLimit, RateLimiter  # noqa: E402
+from tools.utils import retry_handler  # noqa: E402
+from tools.utils.retry_handler import RetryPolicy  # noqa: E402
+
+
+def crew_runner(release=None, fail=False):
+    async def runner(request, on_result):
+        for name in request["agents"]:
+            await on_result(name, {"agent": name, "prompt": request["prompt"]},
+                            SimpleNamespace(status="completed", duration=0.01))
+            if release is not None:
+                await release.wait()
+        if fail:
+            raise RuntimeError("visual_agent crashed")
+        return {"wall_time": 0.02, "critical_path": request["agents"]}
+    return runner
+
+
+async def wait_for_status(queue, job_id, status):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job['status']}")
+
+
+@pytest.fixture
+def public_dns(monkeypatch):
+    # Webhook hosts in these tests resolve to a public address
+    monkeypatch.setattr(jobs, "_resolve", lambda host: ["93.184.216.34"])
+
+
+def test_job_results_are_readable_while_running_and_resume_from_a_cursor(public_dns):
+    webhooks = []
+
+    def receive(request):
+        webhooks.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    async def scenario():
+        release = asyncio.Event()
+        queue = JobQueue(JobStore(":memory:"), crew_runner(release), workers=1,
+                         transport=httpx.MockTransport(receive))
+        await queue.start()
+        job = await queue.submit({"prompt": "Photosynthesis", "agents": ["lesson_planner_agent", "quiz_agent"]},
+                                 webhook_url="https://school.example/hooks/vidyavahini")
+        assert job["status"] == QUEUED and job["results"] == {}
+
+        # The client reads the first agent's result, drops, and reconnects with its cursor
+        for _ in range(100):
+            partial = await queue.get(job["job_id"])
+            if partial["results"]:
+                break
+            await asyncio.sleep(0.01)
+        assert list(partial["results"]) == ["lesson_planner_agent"] and partial["status"] == "running"
+        release.set()
+        done = await wait_for_status(queue, job["job_id"], COMPLETED)
+        resumed = await queue.get(job["job_id"], after=partial["cursor"])
+        await queue.stop()
+        return done, resumed
+
+    done, resumed = asyncio.run(scenario())
+    assert list(done["results"]) == ["lesson_planner_agent", "quiz_agent"]
+    assert done["timings"]["critical_path"] == ["lesson_planner_agent", "quiz_agent"]
+    assert list(resumed["results"]) == ["quiz_agent"] and resumed["cursor"] == done["cursor"]
+    assert [hook["status"] for hook in webhooks] == [COMPLETED]
+    assert webhooks[0]["results"]["quiz_agent"]["prompt"] == "Photosynthesis"
+
+
+def test_failed_job_keeps_partial_results_and_failed_webhooks_are_counted(monkeypatch, public_dns):
+    monkeypatch.setattr(retry_handler, "_breakers", {})
+    monkeypatch.setattr(jobs, "WEBHOOK_RETRY", RetryPolicy(retries=2, delay=0.0, max_delay=0.0))
+
+    async def scenario():
+        queue = JobQueue(JobStore(":memory:"), crew_runner(fail=True), workers=1,
+                         transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+        await queue.start()
+        job = await queue.submit({"prompt": "Fractions", "agents": ["quiz_agent"]},
+                                 webhook_url="https://school.example/hook")
+        job = await wait_for_status(queue, job["job_id"], FAILED)
+        for _ in range(100):
+            if queue.counts["webhooks_failed"]:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return job, queue.counts
+
+    job, counts = asyncio.run(scenario())
+    assert job["error"] == "visual_agent crashed" and list(job["results"]) == ["quiz_agent"]
+    assert counts["failed"] == 1 and counts["webhooks_failed"] == 1
+
+
+def test_unfinished_jobs_rerun_after_a_restart_and_the_queue_is_bounded(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+
+    async def first_process():
+        queue = JobQueue(JobStore(path), crew_runner(asyncio.Event()), workers=1, max_queued=1)
+        await queue.start()
+        running = await queue.submit({"prompt": "Plants", "agents": ["lesson_planner_agent", "quiz_agent"]})
+        await asyncio.sleep(0.05)
+        queued = await queue.submit({"prompt": "Animals", "agents": ["quiz_agent"]})
+        with pytest.raises(JobQueueFull):
+            await queue.submit({"prompt": "History", "agents": ["quiz_agent"]})
+        await queue.stop()  # the process goes away mid-run
+        return running["job_id"], queued["job_id"]
+
+    async def second_process(job_ids):
+        queue = JobQueue(JobStore(path), crew_runner(), workers=2)
+        await queue.start()
+        finished = [await wait_for_status(queue, job_id, COMPLETED) for job_id in job_ids]
+        await queue.stop()
+        return finished
+
+    job_ids = asyncio.run(first_process())
+    running, queued = asyncio.run(second_process(job_ids))
+    # The interrupted run starts over instead of keeping its half-written results twice
+    assert [entry["agent"] for entry in running["agents"]] == ["lesson_planner_agent", "quiz_agent"]
+    assert list(queued["results"]) == ["quiz_agent"]
+
+
+def test_any_instance_serves_a_firestore_job_and_takes_over_an_abandoned_one():
+    client = AsyncFakeFirestore()
+
+    def instance(runner, lease_seconds=60.0):
+        return JobQueue(FirestoreJobStore(client, lease_seconds=lease_seconds), runner, workers=1,
+                        recover_interval=0.02)
+
+    async def scenario():
+        first = instance(crew_runner(asyncio.Event()), lease_seconds=0.1)
+        second = instance(crew_runner())
+        await first.start()
+        await second.start()
+        job = await first.submit({"prompt": "Plants", "agents": ["lesson_planner_agent", "quiz_agent"]})
+        for _ in range(100):
+            partial = await second.get(job["job_id"])  # a poll that lands on the other instance
+            if partial["results"]:
+                break
+            await asyncio.sleep(0.01)
+        assert partial["status"] == "running" and list(partial["results"]) == ["lesson_planner_agent"]
+
+        await first.stop()  # the instance goes away mid-run; its lease runs out
+        done = await wait_for_status(second, job["job_id"], COMPLETED)
+        await second.stop()
+        return done
+
+    done = asyncio.run(scenario())
+    # The rerun's results only, not the abandoned run's
+    assert [entry["agent"] for entry in done["agents"]] == ["lesson_planner_agent", "quiz_agent"]
+
+
+def test_only_one_instance_claims_a_firestore_job():
+    # With RPC latency the three claims all read the job as queued before any commits
+    client = AsyncFakeFirestore(rpc_latency=0.01)
+
+    async def scenario():
+        job_id = await FirestoreJobStore(client).create({"prompt": "Soil", "agents": ["quiz_agent"]})
+        return await asyncio.gather(*(FirestoreJobStore(client).start(job_id) for _ in range(3)))
+
+    assert sorted(asyncio.run(scenario())) == [False, False, True]
+
+
+def post_job(monkeypatch, body):
+    """POST /api/jobs against a fresh in-memory queue; (response, stored request or None)."""
+    store = JobStore(":memory:")
+    monkeypatch.setattr(main, "rate_limiter", RateLimiter.from_env(default=RateLimit(1000, 60)))
+
+    async def scenario():
+        queue = JobQueue(store, crew_runner(asyncio.Event()), workers=1)
+        monkeypatch.setattr(main, "job_queue", queue)
+        await queue.start()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/jobs", json=body,
+                                          headers={"x-api-key": main.API_KEY, "x-user-role": "student"})
+        await queue.stop()
+        return response
+
+    response = asyncio.run(scenario())
+    stored = store.request(response.json()["job_id"]) if response.status_code == 202 else None
+    return response, stored
+
+
+def test_jobs_store_only_what_the_crew_run_uses(monkeypatch):
+    response, stored = post_job(monkeypatch, {"prompt": "Photosynthesis", "context": {"grade": 5}})
+    assert response.status_code == 202
+    assert set(stored) == {"prompt", "agents"}
+
+
+def test_webhooks_only_go_to_public_https_hosts(monkeypatch):
+    addresses = {"school.example": ["93.184.216.34"], "intranet.example": ["10.0.0.7"],
+                 "metadata.google.internal": ["169.254.169.254"]}
+    monkeypatch.setattr(jobs, "_resolve", lambda host: addresses[host])
+
+    check_webhook_url("https://school.example/hook")
+    for url in ("http://school.example/hook", "https://127.0.0.1/hook", "https://[::1]/hook",
+                "https://intranet.example/hook", "https://metadata.google.internal/computeMetadata/v1/"):
+        with pytest.raises(UnsafeWebhookURL):
+            check_webhook_url(url)
+    with pytest.raises(UnsafeWebhookURL):
+        check_webhook_url("https://school.example/hook", allowed_hosts={"lms.example"})
+
+    response, stored = post_job(monkeypatch, {"prompt": "Fractions",
+                                              "webhook_url": "https://169.254.169.254/latest/meta-data"})
+    assert response.status_code == 422 and stored is None
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from tasks.lesson_planner_tasks import LessonOutputSchema
+from tools.ask_me_tool import AskMeResponseSchema
+from tools.quiz_generation_tool import QuizGenerationTool, QuizResponseSchema
+from tools.utils.json_extract import JSONExtractionError, extract_json, json_validator
+
+LESSON = {
+    "topic_title": "Photosynthesis",
+    "introduction": "Plants {make} food.",
+    "core_concepts": ["chlorophyll", "sunlight"],
+    "explanation": "In Telangana villages, paddy fields...",
+    "summary": "Light becomes sugar.",
+    "suggested_agents": ["QuizAgent"],
+}
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(LESSON),
+    "```json\n" + json.dumps(LESSON, indent=2) + "\n```",
+    "Here is the lesson [as requested]:\n" + json.dumps(LESSON) + "\nLet me know if you need changes!",
+])
+def test_extracts_and_validates_wrapped_responses(text):
+    assert extract_json(text, LessonOutputSchema) == {**LESSON, "examples": []}
+
+
+def test_truncated_response_is_closed_at_last_complete_member():
+    text = json.dumps(LESSON)
+    assert extract_json(text[:text.index('"summary"') + 17]) == {**{k: LESSON[k] for k in list(LESSON)[:4]},
+                                                                 "summary": "Light"}
+    cut_in_key = text[:text.index('"summary"') + 4]
+    assert extract_json(cut_in_key) == {k: LESSON[k] for k in list(LESSON)[:4]}
+    # Truncated responses are used but never cached
+    assert json_validator()(cut_in_key) is False
+    assert json_validator()("```json\n" + text + "\n```") is True
+
+
+def test_schema_errors_are_reported_not_repaired():
+    with pytest.raises(JSONExtractionError, match="AskMeResponseSchema") as error:
+        extract_json('{"confidence_score": 0.5}', AskMeResponseSchema)
+    assert error.value.errors[0]["loc"] == ("answer",)
+    with pytest.raises(JSONExtractionError, match="No JSON"):
+        extract_json("I cannot answer that.")
+
+
+def test_quiz_accepts_the_shape_its_prompt_asks_for():
+    flat = {
+        "questions": [{"question_text": "Why are leaves green?"}],
+        "format_type": "MCQ", "topic": "Plants", "grade_level": "5",
+        "total_marks": 1, "dialect_adapted": True,
+        "retry_feedback_report": {"note": "first attempt"},
+    }
+    tool = QuizGenerationTool.__new__(QuizGenerationTool)
+    tool.use_cache = False
+    tool.llm = SimpleNamespace(ainvoke=None)
+
+    async def ainvoke(prompt):
+        return SimpleNamespace(content="```json\n" + json.dumps(flat) + "\n```")
+
+    tool.llm.ainvoke = ainvoke
+    result = asyncio.run(tool.arun({}))
+    assert result["quiz_json"]["questions"] == flat["questions"]
+    assert result["retry_feedback_report"] == {"note": "first attempt"}
+    assert json_validator(QuizResponseSchema)(json.dumps(flat))
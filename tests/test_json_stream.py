@@ -0,0 +1,120 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from llms.response_cache import LLMResponseCache
+from tasks.lesson_planner_tasks import LessonOutputSchema
+from tools.lesson_generation_tool import LessonGenerationTool
+from tools.utils.json_stream import JSONObjectStream
+
+LESSON = {
+    "topic_title": "Photosynthesis",
+    "introduction": "Plants {make} food, \"really\", with light.",
+    "core_concepts": ["chlorophyll", "stomata, pores"],
+    "explanation": "Leaves [and stems] take in light.",
+    "activities": [{"term": "leaf, rubbing", "nested": [1, [2]]}],
+    "summary": "Sunlight + water + CO2 -> sugar",
+}
+# What "done" carries: the lesson as validated (and filled in) by LessonOutputSchema
+VALID_LESSON = LessonOutputSchema.model_validate(LESSON).model_dump()
+
+
+class StreamingLLM:
+    """Streams a response a few characters at a time and records how far it got."""
+
+    model = "fake-model"
+    temperature = 0.7
+
+    def __init__(self, text, size=7):
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        self.sent = 0
+        self.calls = 0
+
+    async def astream(self, prompt):
+        self.calls += 1
+        for chunk in self.chunks:
+            self.sent += 1
+            await asyncio.sleep(0)
+            yield SimpleNamespace(content=chunk)
+
+
+def make_lesson_tool(llm):
+    tool = LessonGenerationTool.__new__(LessonGenerationTool)
+    tool.llm = llm
+    tool.use_cache = True
+    return tool
+
+
+def collect(tool, inputs):
+    async def scenario():
+        return [(event, tool.llm.sent) async for event in tool.astream(inputs)]
+    return asyncio.run(scenario())
+
+
+def test_parser_emits_members_as_they_close():
+    text = "```json\n" + json.dumps(LESSON, indent=2) + "\n```"
+    parser = JSONObjectStream()
+    seen = []
+    for char in text:
+        seen.extend(key for key, _ in parser.feed(char))
+    assert seen == list(LESSON)
+    assert parser.close() == LESSON
+
+    empty = JSONObjectStream()
+    assert empty.feed("{ }") == [] and empty.close() == {}
+
+
+def test_incomplete_object_is_an_error():
+    parser = JSONObjectStream()
+    assert parser.feed('{"a": 1, "b": "unterminated') == [("a", 1)]
+    try:
+        parser.close()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("close() accepted an unterminated object")
+
+
+def test_lesson_sections_stream_before_generation_finishes(tmp_path, monkeypatch):
+    cache = LLMResponseCache(path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr("llms.response_cache.llm_cache", cache)
+    llm = StreamingLLM("```json\n" + json.dumps(LESSON) + "\n```")
+    tool = make_lesson_tool(llm)
+
+    events = collect(tool, {"topic": "Photosynthesis"})
+    sections = [(event["data"]["key"], sent) for event, sent in events if event["event"] == "section"]
+    assert [key for key, _ in sections] == list(LESSON)
+    # The introduction is forwarded while most of the response is still to come
+    assert sections[1][1] < len(llm.chunks) // 2
+    assert events[-1][0] == {"event": "done", "data": VALID_LESSON}
+
+    # The completed stream was cached and is replayed without calling Gemini
+    replayed = collect(tool, {"topic": "Photosynthesis"})
+    assert llm.calls == 1
+    assert [event for event, _ in replayed][-1] == {"event": "done", "data": VALID_LESSON}
+
+
+def test_malformed_stream_reports_error_and_is_not_cached(tmp_path, monkeypatch):
+    cache = LLMResponseCache(path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr("llms.response_cache.llm_cache", cache)
+    llm = StreamingLLM('{"introduction": "ok", "summary": oops}')
+    tool = make_lesson_tool(llm)
+
+    events = [event for event, _ in collect(tool, {"topic": "Soil"})]
+    assert events[0] == {"event": "section", "data": {"key": "introduction", "value": "ok"}}
+    assert events[-1]["event"] == "error"
+    assert "oops" in events[-1]["data"]["raw_response"]
+    assert cache.stats()["writes"] == 0
+
+
+def test_lesson_that_fails_the_schema_ends_in_error_not_done(tmp_path, monkeypatch):
+    cache = LLMResponseCache(path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr("llms.response_cache.llm_cache", cache)
+    incomplete = {key: value for key, value in LESSON.items() if key != "summary"}
+    tool = make_lesson_tool(StreamingLLM(json.dumps(incomplete)))
+
+    events = [event for event, _ in collect(tool, {"topic": "Photosynthesis"})]
+    assert [event["data"]["key"] for event in events[:-1]] == list(incomplete)
+    assert events[-1]["event"] == "error"
+    assert [error["loc"] for error in events[-1]["data"]["details"]] == [("summary",)]
+    assert cache.stats()["writes"] == 0
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+from llms.response_cache import LLMResponseCache, cached_ainvoke, cached_invoke, is_json_response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingLLM:
+    model = "models/gemini-2.5-pro"
+    temperature = 0.7
+
+    def __init__(self, content='{"lesson": "photosynthesis"}'):
+        self.content = content
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return SimpleNamespace(content=self.content)
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+def test_key_depends_on_model_temperature_and_prompt():
+    base = LLMResponseCache.make_key("gemini", 0.7, "Photosynthesis, grade 7")
+    assert base == LLMResponseCache.make_key("gemini", 0.7, "Photosynthesis, grade 7")
+    assert base != LLMResponseCache.make_key("gemini", 0.3, "Photosynthesis, grade 7")
+    assert base != LLMResponseCache.make_key("other", 0.7, "Photosynthesis, grade 7")
+    assert base != LLMResponseCache.make_key("gemini", 0.7, "Photosynthesis, grade 8")
+
+
+def test_memory_tier_is_lru(tmp_path):
+    cache = LLMResponseCache(path=None, max_memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")  # evicts "b", the least recently used
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_restart_and_expires(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "llm.sqlite3")
+    LLMResponseCache(path=path, ttl_seconds=60, clock=clock).set("k", "v")
+
+    reopened = LLMResponseCache(path=path, ttl_seconds=60, clock=clock)
+    assert reopened.get("k") == "v"
+    assert reopened.stats()["disk_hits"] == 1
+
+    clock.now += 61
+    fresh = LLMResponseCache(path=path, ttl_seconds=60, clock=clock)
+    assert fresh.get("k") is None
+    assert fresh.stats()["expired"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used_over_size_cap(tmp_path):
+    clock = FakeClock()
+    cache = LLMResponseCache(path=str(tmp_path / "llm.sqlite3"), max_memory_entries=1,
+                             max_disk_bytes=250, clock=clock)
+    for index in range(3):
+        clock.now += 1
+        cache.set(f"k{index}", "x" * 100)
+
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 250
+    assert cache.get("k0") is None
+    assert cache.get("k2") == "x" * 100
+
+
+def test_cached_invoke_hits_skip_the_llm(tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "llm.sqlite3"))
+    llm = CountingLLM()
+
+    first = cached_invoke(llm, "Photosynthesis, grade 7, Telangana", cache=cache)
+    second = cached_invoke(llm, "Photosynthesis, grade 7, Telangana", cache=cache)
+    third = asyncio.run(cached_ainvoke(llm, "Photosynthesis, grade 7, Telangana", cache=cache))
+
+    assert llm.calls == 1
+    assert json.loads(second.content) == json.loads(first.content) == json.loads(third.content)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_invalid_responses_and_opt_out_are_not_cached(tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "llm.sqlite3"))
+    llm = CountingLLM(content="Sorry, here is some prose")
+
+    cached_invoke(llm, "prompt", cache=cache)
+    cached_invoke(llm, "prompt", cache=cache)
+    assert llm.calls == 2
+
+    llm.content = "{}"
+    cached_invoke(llm, "other", enabled=False, cache=cache)
+    cached_invoke(llm, "other", enabled=False, cache=cache)
+    assert llm.calls == 4
+    assert cache.stats()["writes"] == 0
+
+
+def test_async_lookups_run_sqlite_off_the_event_loop(tmp_path, monkeypatch):
+    cache = LLMResponseCache(path=str(tmp_path / "llm.sqlite3"))
+    llm = CountingLLM()
+    threads = []
+    get, put = cache.get, cache.set
+    monkeypatch.setattr(cache, "get", lambda key: threads.append(threading.current_thread()) or get(key))
+    monkeypatch.setattr(cache, "set", lambda key, content: threads.append(threading.current_thread()) or put(key, content))
+
+    async def scenario():
+        await cached_ainvoke(llm, "Photosynthesis", cache=cache)
+        return await cached_ainvoke(llm, "Photosynthesis", cache=cache)
+
+    assert json.loads(asyncio.run(scenario()).content) == {"lesson": "photosynthesis"}
+    assert llm.calls == 1 and len(threads) == 3
+    assert threading.main_thread() not in threads
+
+
+def test_story_prompts_differ_by_topic_grade_and_dialect(tmp_path):
+    from tools.story_generation_tool import StoryGenerationTool
+
+    build = StoryGenerationTool.__new__(StoryGenerationTool)._build_prompt
+    prompts = {
+        build({"topic": "Photosynthesis", "grade": "5", "dialect": "Telangana"}),
+        build({"topic": "Fractions", "grade": "5", "dialect": "Telangana"}),
+        build({"topic": "Fractions", "grade": "3", "dialect": "Telangana"}),
+        build({"topic": "Fractions", "grade": "3", "dialect": "Andhra"}),
+    }
+    keys = {LLMResponseCache.make_key("gemini", 0.75, prompt) for prompt in prompts}
+    assert len(prompts) == len(keys) == 4
+
+
+def test_is_json_response_accepts_fenced_json():
+    assert is_json_response('```json\n{"a": 1}\n```')
+    assert not is_json_response("```json\n{broken\n```")
+
+
+def test_quiz_prompt_never_renders_none():
+    from tools.quiz_generation_tool import QuizGenerationTool
+
+    build = QuizGenerationTool.__new__(QuizGenerationTool)._build_prompt
+    prompt = build({"lesson_plan_json": {"topic_title": "Fractions"}, "story_body": None})
+    assert "None" not in prompt
+    assert prompt == build({"lesson_plan_json": {"topic_title": "Fractions"}})
+
+
+def test_visual_prompts_follow_the_lesson():
+    from agents.visual_agent import visual_inputs
+    from tools.visual_generation_tool import VisualGenerationTool
+
+    build = VisualGenerationTool.__new__(VisualGenerationTool)._build_prompt
+    fractions = visual_inputs({"lesson_plan_json": json.dumps({"topic_title": "Fractions"}), "grade": "4"})
+    water = visual_inputs({"lesson_plan_json": {"topic_title": "Water cycle"}, "grade": "4"})
+    assert fractions["concept"] == "Fractions" and water["concept"] == "Water cycle"
+    assert build(fractions) != build(water)
+    assert '"Fractions"' in build(fractions) and "Grade Level: 4" in build(fractions)
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from llms.client_pool import LLMClientPool
+
+
+class FakeChatModel:
+    def __init__(self, model, temperature, max_tokens, delay=0.05):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    def invoke(self, prompt):
+        self._enter()
+        time.sleep(self.delay)
+        self._exit()
+        return SimpleNamespace(content=prompt)
+
+    async def ainvoke(self, prompt):
+        self._enter()
+        await asyncio.sleep(self.delay)
+        self._exit()
+        if prompt == "boom":
+            raise RuntimeError("quota exceeded")
+        return SimpleNamespace(content=prompt)
+
+
+def make_pool(**kwargs):
+    built = []
+
+    def factory(model, temperature, max_tokens):
+        built.append((model, temperature, max_tokens))
+        return FakeChatModel(model, temperature, max_tokens)
+
+    return LLMClientPool(factory=factory, **kwargs), built
+
+
+def test_clients_are_shared_per_configuration():
+    pool, built = make_pool()
+    quiz = pool.get("gemini-2.5-pro", temperature=0.6)
+    assert pool.get("models/gemini-2.5-pro", temperature=0.6) is quiz
+    assert pool.get("gemini-2.5-pro", temperature=0.6, max_tokens=2048) is not quiz
+    assert pool.get("gemini-2.5-pro", temperature=0.3) is not quiz
+    assert len(built) == 3
+    # Attributes read by the response cache come from the wrapped client
+    assert (quiz.model, quiz.temperature) == ("models/gemini-2.5-pro", 0.6)
+
+
+def test_in_flight_cap_is_per_model_across_temperatures():
+    pool, _ = make_pool(max_in_flight=3)
+    cold = pool.get(temperature=0.3)
+    warm = pool.get(temperature=0.7)
+
+    async def scenario():
+        await asyncio.gather(*(llm.ainvoke(str(i)) for i in range(6) for llm in (cold, warm)))
+
+    asyncio.run(scenario())
+    stats = pool.stats()["models"]["models/gemini-2.5-pro"]
+    assert stats["peak_in_flight"] == 3
+    assert (stats["requests"], stats["in_flight"], stats["waiting"]) == (12, 0, 0)
+    assert stats["clients"] == 2
+    assert stats["p50_latency"] >= 0.05
+
+
+def test_sync_and_async_callers_share_the_cap():
+    pool, _ = make_pool(max_in_flight=2)
+    llm = pool.get()
+
+    async def scenario():
+        sync_calls = [asyncio.to_thread(llm.invoke, "sync") for _ in range(3)]
+        async_calls = [llm.ainvoke("async") for _ in range(3)]
+        await asyncio.gather(*sync_calls, *async_calls)
+
+    asyncio.run(scenario())
+    assert pool.stats()["models"]["models/gemini-2.5-pro"]["peak_in_flight"] == 2
+    assert llm.client.max_active <= 2
+
+
+def test_errors_are_counted_and_release_the_slot():
+    pool, _ = make_pool(max_in_flight=1)
+    llm = pool.get()
+
+    async def scenario():
+        return await asyncio.gather(llm.ainvoke("boom"), llm.ainvoke("ok"), return_exceptions=True)
+
+    failed, ok = asyncio.run(scenario())
+    assert isinstance(failed, RuntimeError) and ok.content == "ok"
+    stats = pool.stats()["models"]["models/gemini-2.5-pro"]
+    assert (stats["errors"], stats["in_flight"]) == (1, 0)
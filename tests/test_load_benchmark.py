@@ -0,0 +1,34 @@
+from benchmarks.fakes import FakeChatModel, UpstreamProfile, fake_generation
+from benchmarks.load_benchmark import run_benchmark
+from tasks.lesson_planner_tasks import LessonOutputSchema
+from tools.quiz_generation_tool import QuizResponseSchema
+from tools.utils.json_extract import extract_json
+
+
+def test_fake_generation_satisfies_every_validated_schema():
+    text = fake_generation(5000)
+    assert abs(len(text) - 5000) < 10
+    for schema in (LessonOutputSchema, QuizResponseSchema):
+        extract_json(text, schema)
+    chunks = FakeChatModel(UpstreamProfile(chunks=4, payload_bytes=1000))._chunks()
+    assert len(chunks) == 4 and "".join(chunks) == fake_generation(1000)
+
+
+def test_benchmark_drives_the_app_offline(tmp_path):
+    import main
+    from firestore import async_repository
+    from llms.client_pool import llm_pool
+
+    state_before = (main.rate_limiter, llm_pool.factory, async_repository._client)
+    endpoints = ["health", "lesson_planner", "lesson_planner_stream", "translate_batch", "firestore_lessons"]
+    results = run_benchmark(
+        endpoints=endpoints, levels=(1, 3), requests=6, warmup=1,
+        llm=UpstreamProfile(latency=0.01), tts=UpstreamProfile(), sarvam=UpstreamProfile(),
+        firestore_rpc_latency=0.0, workdir=str(tmp_path),
+    )
+    assert [(r["endpoint"], r["concurrency"]) for r in results] == [(e, c) for e in endpoints for c in (1, 3)]
+    for result in results:
+        assert result["requests"] == 6 and result["errors"] == 0, result
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert result["rps"] > 0 and result["loop_lag_max_ms"] is not None
+    assert (main.rate_limiter, llm_pool.factory, async_repository._client) == state_before
@@ -0,0 +1,72 @@
+import threading
+
+from firestore.testing import FakeFirestore
+from tools.sync_tool import SYNC_COLLECTIONS, SyncTool
+from tools.utils.local_store import LocalStore
+from tools.utils.sync_engine import FirestoreRemote, Outbox, SyncEngine
+
+
+def test_documents_round_trip_and_persist(tmp_path):
+    path = str(tmp_path / "store.sqlite3")
+    store = LocalStore(path)
+    store.save_document("lesson_plans/l1", {"user_id": "s1", "title": "Fractions", "tags": ["maths"]})
+    assert store.get_document("lesson_plans/l1")["tags"] == ["maths"]
+    assert store.get_document("lesson_plans/missing") is None
+    store.close()
+
+    reopened = LocalStore(path)
+    assert reopened.get_document("lesson_plans/l1")["title"] == "Fractions"
+    reopened.delete_document("lesson_plans/l1")
+    assert reopened.count() == 0
+
+
+def test_find_uses_secondary_indexes(tmp_path):
+    store = LocalStore(str(tmp_path / "store.sqlite3"))
+    store.save_documents(
+        [(f"quiz_results/q{index}", {"student_id": f"s{index % 3}", "class_id": "c1", "score": index})
+         for index in range(30)]
+        + [("lesson_plans/l1", {"user_id": "s1", "class_id": "c2"})]
+    )
+
+    assert [doc["score"] for doc in store.find("quiz_results", student_id="s1")] == [1, 10, 13, 16, 19, 22, 25, 28, 4, 7]
+    assert [doc["id"] for doc in store.find(student_id="s1", class_id="c2")] == ["l1"]
+    assert store.count("quiz_results") == 30
+
+    plan = store._reader().execute(
+        "EXPLAIN QUERY PLAN SELECT key FROM documents WHERE student_id = ? AND collection = ?", ("s1", "quiz_results")
+    ).fetchall()
+    assert "documents_student" in str(plan)
+
+
+def test_reads_from_many_threads(tmp_path):
+    store = LocalStore(str(tmp_path / "store.sqlite3"))
+    store.save_documents([(f"stories/st{index}", {"user_id": "s1", "n": index}) for index in range(50)])
+    errors = []
+
+    def read():
+        try:
+            for index in range(50):
+                assert store.get_document(f"stories/st{index}")["n"] == index
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_serves_synced_documents_offline(tmp_path):
+    client = FakeFirestore()
+    client.collection("quiz_results").document("q1").set({"user_id": "s1", "class_id": "c1", "score": 9})
+    store = LocalStore(str(tmp_path / "store.sqlite3"))
+    engine = SyncEngine(store, FirestoreRemote(client), Outbox(str(tmp_path / "outbox.sqlite3")), SYNC_COLLECTIONS)
+    tool = SyncTool(client, store, engine=engine)
+
+    tool.sync("s1")
+    client._docs.clear()  # Firestore unreachable from here on
+
+    assert [doc["score"] for doc in tool.find_local("quiz_results", student_id="s1")] == [9]
+    assert [doc["id"] for doc in tool.find_local("quiz_results", class_id="c1")] == ["q1"]
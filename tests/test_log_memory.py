@@ -0,0 +1,93 @@
+import json
+import multiprocessing
+import os
+
+from crewflows.memory.log_memory_handler import LogMemoryHandler, SegmentLog
+
+
+def make_handler(tmp_path, session_id="quiz_session", **log_options):
+    log_options.setdefault("background_compaction", False)
+    log = SegmentLog(str(tmp_path / "quiz_memory.log"), **log_options)
+    handler = LogMemoryHandler.__new__(LogMemoryHandler)
+    handler.session_id = session_id
+    handler.file_path = str(tmp_path / "quiz_memory.json")
+    handler.log_dir = log.directory
+    handler.log = log
+    return handler
+
+
+def segment_bytes(handler):
+    return sum(os.path.getsize(handler.log._segment_path(seq)) for seq in handler.log._segments())
+
+
+def test_save_appends_only_changed_keys(tmp_path):
+    memory = make_handler(tmp_path)
+    memory.save({"topic": "Photosynthesis", "history": ["q1"]})
+    size = segment_bytes(memory)
+
+    memory.save({"topic": "Photosynthesis", "history": ["q1"]})
+    assert segment_bytes(memory) == size  # nothing changed, nothing written
+
+    memory.save({"history": ["q1", "q2"], "score": 7})
+    assert memory.load() == {"history": ["q1", "q2"], "score": 7}
+
+
+def test_paginated_lazy_reads(tmp_path):
+    memory = make_handler(tmp_path)
+    memory.save({f"turn{i}": {"answer": i} for i in range(10)})
+
+    assert memory.load(offset=2, limit=3) == {"turn2": {"answer": 2}, "turn3": {"answer": 3}, "turn4": {"answer": 4}}
+    assert memory.count() == 10
+    items = memory.iter_items()
+    assert next(items) == ("turn0", {"answer": 0})
+
+
+def test_sessions_are_isolated_and_index_rebuilds_from_disk(tmp_path):
+    teacher = make_handler(tmp_path, "teacher")
+    student = make_handler(tmp_path, "student")
+    student.log = teacher.log
+    teacher.put("plan", "week 1")
+    student.put("plan", "revise")
+    teacher.clear()
+
+    reopened = SegmentLog(teacher.log.directory)
+    assert reopened.count("teacher") == 0
+    assert reopened.get("student", "plan") == "revise"
+
+
+def test_compaction_keeps_live_records_only(tmp_path):
+    memory = make_handler(tmp_path, compact_min_bytes=1, compact_dead_ratio=0.9, max_segment_bytes=200)
+    for version in range(20):
+        memory.put("draft", {"version": version})
+    memory.put("title", "Plants")
+    memory.log.compact()
+
+    assert len(memory.log._segments()) == 1
+    assert memory.load() == {"draft": {"version": 19}, "title": "Plants"}
+    assert memory.log.total_bytes == memory.log.live_bytes
+
+
+def test_legacy_json_file_is_migrated(tmp_path):
+    legacy = tmp_path / "lesson_memory.json"
+    legacy.write_text(json.dumps({"last_topic": "Fractions"}), encoding="utf-8")
+
+    memory = LogMemoryHandler("lesson_session", str(legacy), background_compaction=False)
+    assert memory.load() == {"last_topic": "Fractions"}
+    assert not legacy.exists() and (tmp_path / "lesson_memory.json.migrated").exists()
+
+
+def _write_keys(directory, worker, count):
+    log = SegmentLog(directory, background_compaction=False)
+    for index in range(count):
+        log.write("shared", [("put", f"w{worker}-{index}", index)])
+
+
+def test_concurrent_writers_in_separate_processes(tmp_path):
+    directory = str(tmp_path / "shared.log")
+    workers = [multiprocessing.Process(target=_write_keys, args=(directory, w, 25)) for w in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+    assert SegmentLog(directory).count("shared") == 100
@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from crewflows.agent import Agent
+from llms.client_pool import LLMClientPool
+from llms.response_cache import LLMResponseCache, cached_ainvoke
+from tools.utils import metrics, retry_handler
+from tools.utils.json_extract import extract_json
+from tools.utils.metrics import InMemorySpanCollector, MetricsRegistry, Sample, traced_tool
+from tools.utils.retry_handler import call_with_retry
+
+
+class EchoModel:
+    model = "models/fake"
+
+    def __init__(self, *args):
+        pass
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(0)
+        return SimpleNamespace(content='{"answer": "' + "x" * 40 + '"}', usage_metadata={"input_tokens": 7})
+
+
+pool = LLMClientPool(factory=EchoModel)
+cache = LLMResponseCache(path=None)
+
+
+@traced_tool
+class AnswerTool:
+    async def arun(self, inputs):
+        llm = pool.get("fake")
+        response = await cached_ainvoke(llm, inputs["question"], cache=cache)
+        return extract_json(response.content)
+
+
+class AnswerAgent(Agent):
+    async def process(self, inputs):
+        return await AnswerTool().arun(inputs)
+
+
+@pytest.fixture
+def spans():
+    collector = InMemorySpanCollector()
+    metrics.add_span_exporter(collector)
+    yield collector
+    metrics.remove_span_exporter(collector)
+
+
+def test_spans_nest_from_agent_to_llm_and_record_tokens_and_cache_hits(spans):
+    agent = AnswerAgent("answer", "role", "goal")
+    tokens_before = metrics.LLM_TOKENS.value(model="models/fake", direction="in")
+
+    for _ in range(2):
+        assert asyncio.run(agent.run(prompt=None, question="Why is the sky blue?")) == {"answer": "x" * 40}
+
+    kinds = [span.kind for span in spans.spans]
+    # The second run is answered by the response cache: no llm span
+    assert kinds == ["llm", "parse", "tool", "agent", "parse", "tool", "agent"]
+    llm, parse, tool, agent_span = spans.spans[:4]
+    assert (agent_span.name, tool.name, llm.name) == ("AnswerAgent", "AnswerTool.arun", "models/fake")
+    assert llm.parent_id == tool.span_id and tool.parent_id == agent_span.span_id and agent_span.parent_id is None
+    assert len({span.trace_id for span in spans.spans[:4]}) == 1
+    assert tool.attributes["cache_hit"] is False and spans.spans[5].attributes["cache_hit"] is True
+    # Reported usage wins; output tokens are estimated from the text
+    assert llm.attributes == {"tokens_in": 7, "tokens_out": 14}
+    assert metrics.LLM_TOKENS.value(model="models/fake", direction="in") == tokens_before + 7
+    assert metrics.SPAN_SECONDS.count(kind="agent", name="AnswerAgent", status="ok") >= 2
+
+
+def test_failures_and_retries_are_recorded(spans, monkeypatch):
+    monkeypatch.setattr(retry_handler.time, "sleep", lambda _: None)
+    monkeypatch.setattr(retry_handler, "_breakers", {})
+    retries_before = metrics.UPSTREAM_RETRIES.value(upstream="metrics-test")
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TimeoutError()
+        return "ok"
+
+    with metrics.span("tool", "Flaky.run"):
+        assert call_with_retry(flaky, upstream="metrics-test") == "ok"
+    with pytest.raises(ValueError):
+        with metrics.span("tool", "Broken.run"):
+            raise ValueError("bad input")
+
+    assert metrics.UPSTREAM_RETRIES.value(upstream="metrics-test") == retries_before + 2
+    flaky_span, broken = spans.spans
+    assert flaky_span.attributes == {"retries": 2} and flaky_span.status == "ok"
+    assert broken.status == "error" and broken.attributes == {"error": "ValueError"}
+
+
+def test_prometheus_exposition():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("op_seconds", "Op latency.", ("name",), buckets=(0.1, 1.0))
+    counter = registry.counter("ops", "Ops.", ("name",))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, name='say "hi"')
+    counter.inc(name="a\nb")
+    registry.add_collector(lambda: [Sample("queue_depth", "gauge", "Queued.", 3, {"queue": "llm"})])
+    registry.add_collector(lambda: 1 / 0)
+
+    text = registry.render()
+    assert '# TYPE op_seconds histogram' in text
+    assert 'op_seconds_bucket{name="say \\"hi\\"",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{name="say \\"hi\\"",le="1"} 2' in text
+    assert 'op_seconds_bucket{name="say \\"hi\\"",le="+Inf"} 3' in text
+    assert 'op_seconds_count{name="say \\"hi\\""} 3' in text
+    assert 'op_seconds_sum{name="say \\"hi\\""} 5.55' in text
+    assert 'ops_total{name="a\\nb"} 1' in text
+    assert 'queue_depth{queue="llm"} 3' in text
+    with pytest.raises(ValueError):
+        counter.inc(model="unexpected")
+
+
+def test_opentelemetry_export_to_in_memory_exporter():
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    metrics.enable_opentelemetry(provider)
+    try:
+        with metrics.span("agent", "AnswerAgent"):
+            with metrics.span("llm", "models/fake") as llm:
+                llm.set_attribute("tokens_in", 7)
+    finally:
+        metrics.disable_opentelemetry()
+
+    finished = {span.name: span for span in exporter.get_finished_spans()}
+    assert finished["llm models/fake"].parent.span_id == finished["agent AnswerAgent"].context.span_id
+    assert finished["llm models/fake"].attributes["tokens_in"] == 7
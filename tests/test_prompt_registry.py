@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from tools.utils.prompt_registry import (
+    PROMPT_INPUTS, PromptRegistry, PromptVariableError, compile_prompt, prompt_registry,
+)
+
+
+def test_placeholders_escapes_and_literal_json():
+    prompt = compile_prompt("t", 'Topic {topic} ({topic}) {{escaped}} {"json": {...}} {} {level}')
+    assert prompt.input_variables == ("level", "topic")
+    assert prompt.render(topic="Soil", level=2, extra="ignored") == 'Topic Soil (Soil) {escaped} {"json": {...}} {} 2'
+    with pytest.raises(PromptVariableError) as error:
+        prompt.render(topic="Soil")
+    assert error.value.missing == ["level"]
+    assert "level" in str(error.value)
+
+    static = compile_prompt("s", "No variables {}")
+    assert static.render() == static.render(topic="x") == "No variables {}"
+
+
+def test_every_prompt_file_compiles_and_callers_fill_every_placeholder():
+    prompts = PromptRegistry().load_all()
+    assert set(PROMPT_INPUTS) <= set(prompts)
+    # JSON examples are literal text, not variables
+    assert prompts["gamification"].input_variables == ("student_data",)
+    assert prompts["quiz_agent"].input_variables == ("dialect", "lesson_plan_json", "story_body")
+
+    # Nothing missing (render would raise) and nothing ignored (every input changes the prompt)
+    assert prompt_registry.validate(PROMPT_INPUTS) == {}
+
+
+def test_hot_reload_on_mtime_change(tmp_path):
+    path = tmp_path / "greeting.txt"
+    path.write_text("Hello {name}")
+    now = [0.0]
+    registry = PromptRegistry(str(tmp_path), check_interval=1.0, clock=lambda: now[0])
+    assert registry.render("greeting", name="Asha") == "Hello Asha"
+
+    path.write_text("Namaste {name}")
+    os.utime(path, (1, 1))
+    assert registry.render("greeting", name="Asha") == "Hello Asha"  # within check_interval
+    now[0] = 5.0
+    assert registry.render("greeting", name="Asha") == "Namaste Asha"
+    assert registry.reloads == 1
+
+    registry.register("inline", "Bye {name}")
+    assert registry.render("inline", name="Ravi") == "Bye Ravi"
+    with pytest.raises(FileNotFoundError):
+        registry.get("missing")
+
+
+def test_validate_reports_missing_and_unused_inputs(tmp_path):
+    (tmp_path / "lesson.txt").write_text("Teach {topic} to grade {grade}")
+    registry = PromptRegistry(str(tmp_path))
+    assert registry.validate({"lesson": ("topic", "dialect")}) == {
+        "lesson": {"missing": ["grade"], "unused": ["dialect"]}
+    }
+    assert registry.validate({"lesson": ("topic", "grade")}) == {}
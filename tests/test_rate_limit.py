@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rate_limit import MemoryBackend, RateLimit, RateLimiter, RateLimitResult, RedisBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_burst_then_refills_at_the_emission_rate():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+    rate = RateLimit(3, 60)
+
+    results = [backend.hit("ip", rate) for _ in range(4)]
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results[:3]] == [2, 1, 0]
+    assert results[3].retry_after == pytest.approx(20)
+    assert results[3].headers()["Retry-After"] == "20"
+
+    clock.now += 20
+    assert backend.hit("ip", rate).allowed
+    assert not backend.hit("ip", rate).allowed
+
+
+def test_memory_backend_drops_refilled_keys():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+    for index in range(100):
+        backend.hit(f"ip{index}", RateLimit(10, 60))
+    clock.now += 7  # every bucket has refilled
+    backend.hit("fresh", RateLimit(10, 60))
+    assert len(backend) == 1
+
+
+def test_route_and_role_quotas():
+    limiter = RateLimiter(
+        MemoryBackend(clock=FakeClock()),
+        default=RateLimit(2, 60),
+        role_quotas={"teacher": RateLimit(5, 60)},
+        route_quotas={"/api/run": {"teacher": RateLimit(1, 60), "*": RateLimit(1, 60)}},
+    )
+    assert [limiter.check("ip", "/api/quiz", "student").allowed for _ in range(3)] == [True, True, False]
+    assert all(limiter.check("teacher-ip", "/api/quiz", "teacher").allowed for _ in range(5))
+    # /api/run has its own budget, separate from the per-client one
+    assert limiter.check("teacher-ip", "/api/run", "teacher").allowed
+    assert not limiter.check("teacher-ip", "/api/run", "teacher").allowed
+    assert limiter.check("ip", "/api/run", None).allowed
+
+
+def test_switching_roles_does_not_reset_the_budget():
+    limiter = RateLimiter(MemoryBackend(clock=FakeClock()), default=RateLimit(2, 60),
+                          role_quotas={"teacher": RateLimit(6, 60)})
+    assert [limiter.check("ip", role=role).allowed for role in ("student", "student")] == [True, True]
+    assert not limiter.check("ip", role="made-up-role").allowed
+    # Claiming a bigger quota does not open a fresh bucket
+    assert not limiter.check("ip", role="teacher").allowed
+
+
+def test_role_comes_from_a_valid_bearer_token_only():
+    from auth import create_access_token, role_from_authorization
+
+    token = create_access_token({"sub": "asha@example.com", "role": "Teacher"})
+    assert role_from_authorization(f"Bearer {token}") == "teacher"
+    assert role_from_authorization("Bearer forged.token.value") is None
+    assert role_from_authorization(token) is None
+    assert role_from_authorization(None) is None
+
+
+def test_backend_errors_fail_open():
+    class BrokenBackend:
+        def hit(self, key, rate):
+            raise ConnectionError("redis down")
+
+    assert RateLimiter(BrokenBackend()).check("ip").allowed
+
+
+def test_acheck_keeps_blocking_backends_off_the_event_loop():
+    class SlowBackend:
+        blocking = True
+
+        def __init__(self):
+            self.threads = []
+
+        def hit(self, key, rate):
+            self.threads.append(threading.current_thread())
+            time.sleep(0.05)  # a slow Redis round trip
+            return RateLimitResult(True, rate.limit, rate.limit - 1, 0.0, 0.0)
+
+    backend = SlowBackend()
+    limiter = RateLimiter(backend)
+
+    async def scenario():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        results = await asyncio.gather(*(limiter.acheck(f"ip{i}") for i in range(4)))
+        beat.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    assert all(result.allowed for result in results)
+    assert threading.main_thread() not in backend.threads
+    assert ticks >= 5  # the loop kept running while the backend was waited on
+    assert asyncio.run(RateLimiter(MemoryBackend()).acheck("ip")).allowed
+
+
+def test_redis_backend_shares_state_between_limiters():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    # Two app instances talking to the same Redis
+    first = RateLimiter(RedisBackend(fakeredis.FakeRedis(server=server)), default=RateLimit(3, 60))
+    second = RateLimiter(RedisBackend(fakeredis.FakeRedis(server=server)), default=RateLimit(3, 60))
+
+    assert [first.check("ip").allowed, second.check("ip").allowed, first.check("ip").allowed] == [True, True, True]
+    denied = second.check("ip")
+    assert not denied.allowed
+    assert 0 < denied.retry_after <= 20
+    assert RedisBackend(fakeredis.FakeRedis(server=server)).client.pttl("vidyavahini:ratelimit:*:ip") > 0
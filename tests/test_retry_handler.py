@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import sarvam_client
+from tools.utils import retry_handler
+from tools.utils.retry_handler import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, acall_with_retry, call_with_retry, retry_budget,
+    retry_with_backoff,
+)
+
+
+class UpstreamError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        headers = {"Retry-After": retry_after} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status, headers=headers)
+
+
+class Flaky:
+    """Raises the given errors in turn, then returns "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.__name__ = "flaky"
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(retry_handler.time, "sleep", recorded.append)
+    monkeypatch.setattr(retry_handler, "_breakers", {})
+    return recorded
+
+
+def test_only_transient_errors_are_retried(sleeps):
+    flaky = Flaky(UpstreamError(429), TimeoutError())
+    assert call_with_retry(flaky) == "ok" and flaky.calls == 3
+
+    for error in (ValueError("Invalid JSON"), UpstreamError(400)):
+        flaky = Flaky(error)
+        with pytest.raises(type(error)):
+            call_with_retry(flaky)
+        assert flaky.calls == 1
+
+
+def test_backoff_is_full_jitter_unless_retry_after_is_sent(sleeps, monkeypatch):
+    monkeypatch.setattr(retry_handler.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(retries=4, delay=1.0, max_delay=3.0)
+    call_with_retry(Flaky(UpstreamError(503), UpstreamError(503), UpstreamError(503)), policy=policy)
+    assert sleeps == [1.0, 2.0, 3.0]
+
+    sleeps.clear()
+    call_with_retry(Flaky(UpstreamError(429, retry_after="2")), policy=policy)
+    assert sleeps == [2.0]
+    # A wait longer than max_delay is not worth holding the request for
+    flaky = Flaky(UpstreamError(429, retry_after="120"))
+    with pytest.raises(UpstreamError):
+        call_with_retry(flaky, policy=policy)
+    assert flaky.calls == 1
+
+
+def test_retries_share_the_request_budget_and_are_not_repeated_by_outer_layers(sleeps):
+    with retry_budget(1):
+        first, second = Flaky(UpstreamError(503)), Flaky(UpstreamError(503))
+        assert call_with_retry(first) == "ok"
+        with pytest.raises(UpstreamError):
+            call_with_retry(second)
+        assert (first.calls, second.calls) == (2, 1)
+
+    inner = Flaky(*[UpstreamError(503)] * 5)
+
+    @retry_with_backoff(retries=3)
+    def tool():
+        return call_with_retry(inner)
+
+    with pytest.raises(UpstreamError):
+        tool()
+    assert inner.calls == 3  # not 9
+
+
+def test_circuit_breaker_opens_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker("gemini", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            with breaker.guard():
+                raise UpstreamError(503)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 11
+    breaker.before_call()  # the trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # others keep failing fast meanwhile
+    breaker.record_success()
+    assert breaker.stats() == {"state": "closed", "failures": 0, "rejected": 2}
+
+    # A 400 means the upstream is up: it never opens the circuit
+    for _ in range(5):
+        breaker.record_failure(UpstreamError(400))
+    assert breaker.state == "closed"
+
+
+def test_async_retries_do_not_block_the_event_loop(monkeypatch):
+    monkeypatch.setattr(retry_handler.time, "sleep", lambda _: pytest.fail("time.sleep on the event loop"))
+    monkeypatch.setattr(retry_handler, "_breakers", {})
+    calls = []
+
+    async def call():
+        calls.append(1)
+        if len(calls) < 3:
+            raise asyncio.TimeoutError()
+        return "ok"
+
+    policy = RetryPolicy(retries=3, delay=0.001)
+    assert asyncio.run(acall_with_retry(call, policy=policy, upstream="tts-test")) == "ok"
+    assert len(calls) == 3
+
+
+def test_sarvam_retries_503_but_not_400(sleeps, monkeypatch):
+    monkeypatch.setattr(sarvam_client, "SARVAM_API_KEY", "key")
+    statuses = [503, 200]
+
+    def post(url, headers, json, timeout):
+        response = requests.Response()
+        response.status_code = statuses.pop(0)
+        response._content = b'{"translated_text": "\xe0\xb0\xa8\xe0\xb0\xae\xe0\xb0\xb8\xe0\xb1\x8d\xe0\xb0\x95\xe0\xb0\xbe\xe0\xb0\xb0\xe0\xb0\x82"}'
+        assert timeout is not None
+        return response
+
+    monkeypatch.setattr(sarvam_client.requests, "post", post)
+    assert sarvam_client.sarvam_translate("Hello", "en", "te-IN")["translated_text"] == "నమస్కారం"
+
+    statuses[:] = [400, 200]
+    assert "error" in sarvam_client.sarvam_translate("Hello", "en", "bad")
+    assert statuses == [200]
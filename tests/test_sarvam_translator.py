@@ -0,0 +1,136 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import sarvam_client
+from sarvam_client import SarvamTranslator, TranslationMemory
+from tools.utils import retry_handler
+
+
+class MockSarvam(ThreadingHTTPServer):
+    """Answers POST /translate with the input upper-cased, after `latency` seconds."""
+    daemon_threads = True
+
+    def __init__(self, latency=0.05):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.statuses = []
+        self.inputs = []
+        self.connections = set()
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.connections.add(self.client_address[1])
+            server.inputs.append(payload["input"])
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.latency)
+        with server.lock:
+            server.active -= 1
+        body = json.dumps({"translated_text": payload["input"].upper()}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(retry_handler, "_breakers", {})
+    mock = MockSarvam()
+    thread = threading.Thread(target=mock.serve_forever, daemon=True)
+    thread.start()
+    yield mock
+    mock.shutdown()
+    mock.server_close()
+
+
+def translator_for(server, **kwargs):
+    return SarvamTranslator(api_key="key", base_url=server.url, **kwargs)
+
+
+def test_connections_are_reused_and_identical_requests_coalesced(server):
+    translator = translator_for(server)
+
+    async def scenario():
+        for text in ("one", "two", "three"):
+            assert (await translator.translate(text))["translated_text"] == text.upper()
+        results = await asyncio.gather(*(translator.translate("same") for _ in range(10)))
+        await translator.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(result == {"translated_text": "SAME"} for result in results)
+    assert server.inputs == ["one", "two", "three", "same"]
+    assert len(server.connections) == 1  # one keep-alive connection for sequential calls
+    assert translator.stats["coalesced"] == 9
+
+
+def test_translation_memory_survives_restarts_and_errors_are_not_remembered(server, tmp_path):
+    path = str(tmp_path / "tm.sqlite3")
+    server.statuses = [400]
+
+    async def translate(text):
+        translator = translator_for(server, memory=TranslationMemory(path))
+        try:
+            return await translator.translate(text, "en", "hi-IN")
+        finally:
+            await translator.aclose()
+
+    assert "error" in asyncio.run(translate("hello"))
+    assert asyncio.run(translate("hello")) == {"translated_text": "HELLO"}
+    assert asyncio.run(translate("hello")) == {"translated_text": "HELLO"}
+    assert server.inputs == ["hello", "hello"]
+    assert len(TranslationMemory(path)) == 1
+
+
+def test_batch_keeps_order_and_bounds_concurrency(server):
+    translator = translator_for(server, max_concurrency=3)
+    texts = [f"line {i}" for i in range(12)] + ["line 0"]
+
+    async def scenario():
+        try:
+            return await translator.translate_batch(texts, "en", "ta-IN")
+        finally:
+            await translator.aclose()
+
+    results = asyncio.run(scenario())
+    assert [result["translated_text"] for result in results] == [text.upper() for text in texts]
+    assert len(server.inputs) == 12
+    assert 1 < server.peak <= 3
+
+
+def test_batch_endpoint(server, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routes import translate_routes
+
+    monkeypatch.setattr(sarvam_client, "_translator", translator_for(server))
+    app = FastAPI()
+    app.include_router(translate_routes.router, prefix="/api/translate")
+    client = TestClient(app)
+
+    response = client.post("/api/translate/batch", json={"texts": ["a", "b"], "target": "te-IN"})
+    assert response.json() == {"translations": [{"translated_text": "A"}, {"translated_text": "B"}]}
+    assert client.post("/api/translate/batch", json={"texts": []}).status_code == 422
@@ -0,0 +1,81 @@
+import asyncio
+
+from crewflows.single_flight import COALESCED, SingleFlight, make_key
+
+
+def test_key_ignores_case_whitespace_and_context_order():
+    assert make_key("quiz", "  Photosynthesis\n quiz ", {"grade": 5, "dialect": "andhra"}) == \
+        make_key("quiz", "photosynthesis quiz", {"dialect": "andhra", "grade": 5})
+    assert make_key("quiz", "photosynthesis", {"grade": 5}) != make_key("quiz", "photosynthesis", {"grade": 6})
+    assert make_key("quiz", "photosynthesis") != make_key("story_teller", "photosynthesis")
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+    release = None
+
+    async def generate(topic):
+        calls.append(topic)
+        await release.wait()
+        return {"topic": topic}
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        coalesced_before = COALESCED.value(endpoint="quiz")
+        same = make_key("quiz", "Fractions")
+        requests = [asyncio.create_task(flights.run("quiz", same, lambda: generate("fractions")))
+                    for _ in range(30)]
+        other = asyncio.create_task(flights.run("quiz", make_key("quiz", "Decimals"), lambda: generate("decimals")))
+        await asyncio.sleep(0)
+
+        waiters = {sample.labels["key"]: sample.value for sample in flights.collect_metrics()}
+        assert waiters[same] == 30 and len(waiters) == 2
+        # A request that goes away does not take the shared call with it
+        requests.pop().cancel()
+        release.set()
+        results = await asyncio.gather(*requests, other)
+        assert COALESCED.value(endpoint="quiz") == coalesced_before + 29
+        return results
+
+    results = asyncio.run(scenario())
+    assert sorted(calls) == ["decimals", "fractions"]
+    assert results[:-1] == [{"topic": "fractions"}] * 29 and results[-1] == {"topic": "decimals"}
+    assert flights.stats()["in_flight"] == {} and flights.executions == 2
+
+
+def test_failures_reach_every_waiter_and_are_not_remembered():
+    flights = SingleFlight()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise TimeoutError("upstream timed out")
+        return {"ok": True}
+
+    async def scenario():
+        key = make_key("ask_me", "Why is the sky blue?")
+        first = await asyncio.gather(*(flights.run("ask_me", key, flaky) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, TimeoutError) for result in first)
+        return await flights.run("ask_me", key, flaky)
+
+    assert asyncio.run(scenario()) == {"ok": True}
+    assert len(attempts) == 2
+
+
+def test_disabled_runs_every_call():
+    flights = SingleFlight(enabled=False)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return 1
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("quiz", "k", generate) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == [1, 1, 1] and len(calls) == 3
@@ -0,0 +1,197 @@
+import asyncio
+import importlib
+import sys
+from types import SimpleNamespace
+
+from firestore.batch_writer import commit_grouped_writes, quiz_result_writes
+from firestore.testing import FakeFirestore
+from tasks.sync_tasks import SyncTask
+from tools.sync_tool import SYNC_COLLECTIONS, SyncTool
+from tools.utils.sync_engine import DELETED, FirestoreRemote, Outbox, SyncEngine, diff_fields, merge_documents
+
+
+class DictStore:
+    def __init__(self):
+        self.documents = {}
+
+    def get_document(self, key):
+        return self.documents.get(key)
+
+    def save_document(self, key, document):
+        self.documents[key] = document
+
+
+class RecordingRemote(FirestoreRemote):
+    def __init__(self, client):
+        super().__init__(client)
+        self.uploads = []
+        self.fail = False
+
+    def apply(self, changes):
+        if self.fail:
+            raise ConnectionError("offline")
+        self.uploads.append(changes)
+        super().apply(changes)
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def make_engine(client, tmp_path, name="device", clock=None):
+    remote = RecordingRemote(client)
+    engine = SyncEngine(DictStore(), remote, Outbox(str(tmp_path / f"{name}.sqlite3")), SYNC_COLLECTIONS,
+                        clock=clock or Clock())
+    return engine, remote
+
+
+def test_diff_and_merge_are_field_level():
+    assert diff_fields({"a": 1, "b": 2}, {"a": 1, "b": 3, "c": 4}) == {"b": 3, "c": 4}
+    assert diff_fields({"a": 1}, {}) == {"a": DELETED}
+
+    local = {"title": "mine", "score": 1, "_sync": {"fields": {"title": 20, "score": 5}}}
+    remote = {"title": "theirs", "score": 9, "_sync": {"fields": {"title": 10, "score": 15}}}
+    merged = merge_documents(local, remote)
+    assert merged["title"] == "mine" and merged["score"] == 9
+    assert merged["_sync"]["fields"] == {"title": 20, "score": 15}
+
+
+def test_only_changed_fields_are_uploaded(tmp_path):
+    client = FakeFirestore()
+    engine, remote = make_engine(client, tmp_path)
+
+    engine.save_local("quiz_results", "q1", {"user_id": "s1", "score": 4, "questions": ["..."] * 20})
+    assert engine.status()["pending_changes"] == 1
+    engine.sync("s1")
+    engine.update_local("quiz_results", "q1", {"score": 7})
+    engine.update_local("quiz_results", "q1", {"score": 8})
+    report = engine.sync("s1")
+
+    assert report["uploaded"] == 1 and report["pending_changes"] == 0
+    # The second upload carries the coalesced score only, not the questions
+    assert [(c[0], c[1], c[2]) for c in remote.uploads[1]] == [("quiz_results", "q1", {"score": 8})]
+    stored = client.collection("quiz_results").document("q1").get().to_dict()
+    assert stored["score"] == 8 and len(stored["questions"]) == 20
+
+
+def test_concurrent_edits_to_different_fields_both_survive(tmp_path):
+    client = FakeFirestore()
+    clock = Clock()
+    tablet, _ = make_engine(client, tmp_path, "tablet", clock)
+    laptop, _ = make_engine(client, tmp_path, "laptop", clock)
+
+    tablet.save_local("lesson_plans", "l1", {"user_id": "s1", "title": "Plants", "notes": ""})
+    tablet.sync("s1")
+    laptop.sync("s1")
+
+    tablet.update_local("lesson_plans", "l1", {"title": "Plants and Soil"})
+    laptop.update_local("lesson_plans", "l1", {"notes": "add diagram"})
+    laptop.update_local("lesson_plans", "l1", {"title": "Photosynthesis"})  # newer than the tablet's title
+    for engine in (tablet, laptop, tablet):
+        engine.sync("s1")
+
+    for engine in (tablet, laptop):
+        doc = engine.local.get_document("lesson_plans/l1")
+        assert (doc["title"], doc["notes"]) == ("Photosynthesis", "add diagram")
+
+
+def test_pull_is_incremental(tmp_path):
+    client = FakeFirestore()
+    writer, _ = make_engine(client, tmp_path, "writer")
+    reader, _ = make_engine(client, tmp_path, "reader")
+    for index in range(5):
+        writer.save_local("stories", f"st{index}", {"user_id": "s1", "text": str(index)})
+    writer.sync("s1")
+
+    assert reader.pull("s1") == 5
+    assert reader.pull("s1") == 0
+    writer.update_local("stories", "st3", {"text": "edited"})
+    writer.sync("s1")
+    assert reader.pull("s1") == 1
+    assert reader.local.get_document("stories/st3")["text"] == "edited"
+
+
+def test_server_writes_reach_devices_past_their_watermark(tmp_path, monkeypatch):
+    client = FakeFirestore()
+    # firestore_utils writes through the module-level client of firebase_config
+    monkeypatch.setitem(sys.modules, "firestore.firebase_config", SimpleNamespace(db=client))
+    monkeypatch.setitem(sys.modules, "firestore.firestore_utils", None)
+    del sys.modules["firestore.firestore_utils"]
+    firestore_utils = importlib.import_module("firestore.firestore_utils")
+    client.collection("stories").document("legacy").set({"user_id": "s1", "text": "never stamped"})
+    device, _ = make_engine(client, tmp_path)
+
+    assert device.sync("s1")["downloaded"] == 1
+    assert device.sync("s1")["downloaded"] == 0  # the unstamped document is not fetched every round
+
+    firestore_utils.create_lesson_plan("s1", {"title": "Plants"})
+    firestore_utils.save_story("s1", {"text": "A seed"})
+    firestore_utils.save_quiz_result("s1", {"score": 4})
+    class_ref = client.collection("classes").document("c1")
+    commit_grouped_writes(client, quiz_result_writes(client, class_ref, "c1", ["s1", "s2"], "t1", "science",
+                                                     "qz", {"score": 9}))
+
+    report = device.sync("s1")
+    assert report["downloaded"] == 4 and report["error"] is None
+    assert device.local.get_document("quiz_results/qz_s1")["score"] == 9
+    assert device.local.get_document("quiz_results/qz_s2") is None
+    assert device.sync("s1")["downloaded"] == 0
+
+
+def test_push_uploads_only_the_synced_students_changes(tmp_path):
+    client = FakeFirestore()
+    engine, _ = make_engine(client, tmp_path)
+    engine.save_local("quiz_results", "q1", {"user_id": "s1", "score": 3})
+    engine.save_local("stories", "st1", {"user_id": "s2", "text": "x"})
+
+    report = engine.sync("s1")
+    assert report["uploaded"] == 1 and report["pending_by_collection"] == {"stories": 1}
+    assert not client.collection("stories").document("st1").get().exists
+    assert engine.sync("s2")["uploaded"] == 1
+
+
+def test_outbox_survives_failed_uploads_and_restarts(tmp_path):
+    client = FakeFirestore()
+    engine, remote = make_engine(client, tmp_path, "edge")
+    remote.fail = True
+    engine.save_local("quiz_results", "q1", {"user_id": "s1", "score": 3})
+    report = engine.sync("s1")
+    assert report["error"] == "offline" and report["pending_changes"] == 1
+
+    restarted = SyncEngine(engine.local, RecordingRemote(client), Outbox(str(tmp_path / "edge.sqlite3")),
+                           SYNC_COLLECTIONS)
+    assert restarted.status()["pending_by_collection"] == {"quiz_results": 1}
+    assert restarted.sync("s1")["uploaded"] == 1
+    assert client.collection("quiz_results").document("q1").get().to_dict()["score"] == 3
+
+
+def test_uploads_are_batched(tmp_path):
+    client = FakeFirestore()
+    engine, remote = make_engine(client, tmp_path)
+    for index in range(1200):
+        engine.save_local("quiz_results", f"q{index}", {"user_id": "s1", "score": index})
+    engine.push()
+    assert [len(batch) for batch in remote.uploads] == [500, 500, 200]
+
+
+def test_sync_task_reports_real_counts(tmp_path):
+    client = FakeFirestore()
+    engine, remote = make_engine(client, tmp_path)
+    tool = SyncTool(client, engine.local, engine=engine)
+    engine.save_local("quiz_results", "q1", {"user_id": "s1", "score": 3})
+    engine.save_local("stories", "st1", {"user_id": "s2", "text": "x"})
+
+    remote.fail = True
+    offline = asyncio.run(SyncTask(tool).run({"student_ids": ["s1"]}))
+    assert offline["firestore_status"] == "Error" and offline["offline_students"] == ["s1"]
+    assert offline["pending_by_collection"] == {"quiz_results": 1, "stories": 1}
+
+    remote.fail = False
+    status = asyncio.run(SyncTask(tool).run({"student_ids": ["s1", "s2"]}))
+    assert status["firestore_status"] == "Synced" and status["indexeddb_status"] == "Synced"
+    assert status["pending_changes"] == 0 and status["uploaded"] == 2
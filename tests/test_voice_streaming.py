@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from tools.utils.audio_store import AudioStore
+from tools.voice_tutor_tool import VoiceTutorTool, split_ssml
+
+
+class SlowTTSClient:
+    """Later sentences finish first, to prove chunks are still yielded in order."""
+
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def synthesize_speech(self, input, voice, audio_config):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.2 if "One" in input.ssml else 0.05)
+        with self._lock:
+            self.active -= 1
+        return SimpleNamespace(audio_content=input.ssml.encode())
+
+
+def make_tool(tmp_path):
+    tool = VoiceTutorTool.__new__(VoiceTutorTool)
+    tool.client = SlowTTSClient()
+    tool.audio_output_dir = str(tmp_path)
+    tool.audio_store = AudioStore(str(tmp_path))
+    return tool
+
+
+def test_split_ssml_on_sentences_and_breaks():
+    chunks = split_ssml('<speak>Plants make food. They need light!<break time="1s"/>Water helps.</speak>')
+    assert chunks == [
+        "<speak>Plants make food.</speak>",
+        '<speak>They need light!<break time="1s"/></speak>',
+        "<speak>Water helps.</speak>",
+    ]
+
+
+def test_split_ssml_reopens_elements_across_chunks():
+    chunks = split_ssml('<speak><prosody rate="slow">One. Two.</prosody> Three.</speak>')
+    assert chunks == [
+        '<speak><prosody rate="slow">One.</prosody></speak>',
+        '<speak><prosody rate="slow">Two.</prosody></speak>',
+        "<speak>Three.</speak>",
+    ]
+
+
+def test_stream_yields_chunks_in_order_with_bounded_parallelism(tmp_path):
+    tool = make_tool(tmp_path)
+    text = "One. Two. Three. Four. Five."
+
+    async def collect():
+        return [chunk async for chunk in tool.astream_voice_tutor(text, max_concurrency=2)]
+
+    chunks = asyncio.run(collect())
+    assert [c.decode() for c in chunks] == [f"<speak>{w}.</speak>" for w in ["One", "Two", "Three", "Four", "Five"]]
+    assert tool.client.max_active == 2
+
+    # A second narration of the same text is served from the audio store
+    asyncio.run(collect())
+    assert tool.client.calls == 5
@@ -1,13 +1,12 @@
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
-import json
-import logging
 
 from tools.utils.retry_handler import retry_with_backoff
 from tools.utils.logger import get_logger
-from tools.utils.prompt_loader import load_prompt
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+from tools.utils.json_extract import JSONExtractionError, extract_json
+from tools.utils.prompt_registry import prompt_registry
+from llms.client_pool import get_llm
+from tools.utils.metrics import traced_tool
 
 logger = get_logger("AskMeTool")
 
@@ -25,37 +24,34 @@ class AskMeResponseSchema(BaseModel):
         title = "AskMe Agent Output Schema"
         description = "Structured output format from AskMeAgent that resolves doubts using Gemini and prior class context."
 
+@traced_tool
 class AskMeTool:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
-        self.prompt_template = PromptTemplate.from_template(load_prompt("ask_me.txt"))
+        self.llm = get_llm(model="gemini-2.5-pro", temperature=0.7)
 
-    @retry_with_backoff()
-    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_prompt(self, inputs: Dict[str, Any]) -> str:
         question = inputs.get("question", "")
         context = inputs.get("context", "")
         dialect = inputs.get("dialect", "Telangana Telugu")
 
-        prompt = self.prompt_template.format(
+        return prompt_registry.render(
+            "ask_me",
             question=question,
             context=context,
             dialect=dialect
         )
 
-        result = self.llm.invoke(prompt)
-
+    def _parse_result(self, result) -> Dict[str, Any]:
         try:
-            response_text = str(result.content).strip()
+            # Parsed and validated against the schema in one pass
+            parsed = extract_json(str(result.content), AskMeResponseSchema)
             logger.info("✅ AskMe response generated")
-            return response_text if isinstance(response_text, dict) else AskMeResponseSchema.parse_raw(response_text).dict()
-        except json.JSONDecodeError:
-            logger.error("❌ JSON decoding failed in AskMeTool. Raw response:\n%s", result.content)
+            return parsed
+        except JSONExtractionError as e:
+            logger.error("❌ JSON extraction failed in AskMeTool (%s). Raw response:\n%s", e, result.content)
             return {
                 "error": "Invalid JSON response from LLM.",
+                "details": str(e),
                 "raw_response": result.content
             }
         except Exception as e:
@@ -64,3 +60,14 @@ class AskMeTool:
                 "error": "Unexpected error during AskMe response generation.",
                 "details": str(e)
             }
+
+    @retry_with_backoff()
+    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.llm.invoke(self._build_prompt(inputs))
+        return self._parse_result(result)
+
+    @retry_with_backoff()
+    async def arun(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of run() using the LLM's native async API."""
+        result = await self.llm.ainvoke(self._build_prompt(inputs))
+        return self._parse_result(result)
@@ -1,9 +1,17 @@
 # tools/base.py
 
+import asyncio
+import inspect
+
+
 class BaseTool:
     """
     Base class for all tools in the VidyaVāhinī project.
     Provides a common interface and shared functionality.
+
+    Tools expose a blocking run() and a non-blocking arun(). Tools that talk to an LLM
+    should override arun() with the client's async API (llm.ainvoke); the default
+    arun() offloads run() to a worker thread so the event loop is never blocked.
     """
 
     def __init__(self, name: str = "UnnamedTool"):
@@ -21,6 +29,18 @@ class BaseTool:
         """
         raise NotImplementedError(f"{self.__class__.__name__}.run() not implemented.")
 
+    async def arun(self, inputs: dict) -> dict:
+        """
+        Async counterpart of run(). Defaults to running run() in a worker thread.
+
+        Args:
+            inputs (dict): Input data for the tool.
+
+        Returns:
+            dict: Output data after tool execution.
+        """
+        return await asyncio.to_thread(self.run, inputs)
+
     def validate_inputs(self, inputs: dict) -> bool:
         """
         Optionally validate inputs before running the tool.
@@ -35,3 +55,16 @@ class BaseTool:
 
     def __repr__(self):
         return f"<Tool name={self.name}>"
+
+
+async def arun_tool(tool, *args, **kwargs):
+    """
+    Run any tool without blocking the event loop.
+
+    Uses the tool's native arun() when it has one, otherwise adapts a legacy sync
+    run() by offloading it to a worker thread.
+    """
+    arun = getattr(tool, "arun", None)
+    if arun is not None and inspect.iscoroutinefunction(arun):
+        return await arun(*args, **kwargs)
+    return await asyncio.to_thread(tool.run, *args, **kwargs)
@@ -1,49 +1,65 @@
 # tools/content_creation_tool.py
 
 from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-import json
+from llms.client_pool import get_llm
 
-from tools.utils.prompt_loader import get_prompt_template
+from tools.utils.prompt_registry import prompt_registry
 from tools.utils.retry_handler import retry_with_backoff
 from tools.utils.logger import get_logger
+from tools.utils.json_extract import JSONExtractionError, extract_json
+from tools.utils.metrics import traced_tool
 
 logger = get_logger(__name__)
 
+@traced_tool
 class ContentCreationTool:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            temperature=0.65,
-            convert_system_message_to_human=True
-        )
-        self.prompt_template = PromptTemplate.from_template(
-            get_prompt_template("content_creation")
-        )
+        self.llm = get_llm(model="gemini-2.5-pro", temperature=0.65)
 
-    @retry_with_backoff(retries=3, delay=2)
-    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_prompt(self, inputs: Dict[str, Any]) -> str:
         notes = inputs.get("teacher_notes", "")
         topic = inputs.get("topic", "Photosynthesis")
         grade = inputs.get("grade", "6")
         dialect = inputs.get("dialect", "Andhra Telugu")
 
-        prompt = self.prompt_template.format(
-            teacher_notes=notes, topic=topic, grade=grade, dialect=dialect
+        return prompt_registry.render(
+            "content_creation", teacher_notes=notes, topic=topic, grade=grade, dialect=dialect
         )
 
+    def _parse_result(self, result, topic: str) -> Dict[str, Any]:
         try:
-            result = self.llm.invoke(prompt)
-            parsed = json.loads(result.content.strip())
-            logger.info(f"✅ Content generated for: {topic}")
-            return parsed
-        except json.JSONDecodeError:
+            parsed = extract_json(result.content)
+        except JSONExtractionError:
             logger.error("❌ Invalid JSON in content creation output")
             return {
                 "error": "Content creation failed",
                 "raw_response": result.content
             }
+        logger.info(f"✅ Content generated for: {topic}")
+        return parsed
+
+    @retry_with_backoff(retries=3, delay=2)
+    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = self._build_prompt(inputs)
+
+        try:
+            result = self.llm.invoke(prompt)
+            return self._parse_result(result, inputs.get("topic", "Photosynthesis"))
+        except Exception as e:
+            logger.exception("🚨 Unexpected error in content creation")
+            return {
+                "error": "Unexpected error",
+                "details": str(e)
+            }
+
+    @retry_with_backoff(retries=3, delay=2)
+    async def arun(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of run() using the LLM's native async API."""
+        prompt = self._build_prompt(inputs)
+
+        try:
+            result = await self.llm.ainvoke(prompt)
+            return self._parse_result(result, inputs.get("topic", "Photosynthesis"))
         except Exception as e:
             logger.exception("🚨 Unexpected error in content creation")
             return {
@@ -1,26 +1,20 @@
 from typing import Dict
-import json
 from tools.utils.retry_handler import retry_with_backoff
 from tools.utils.logger import get_logger
-from tools.utils.prompt_loader import load_prompt
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+from tools.utils.json_extract import JSONExtractionError, extract_json
+from tools.utils.prompt_registry import prompt_registry
+from llms.client_pool import get_llm
+from tools.utils.metrics import traced_tool
 
 logger = get_logger("CoursePlannerTool")
 
+@traced_tool
 class CoursePlannerTool:
     def __init__(self):
         # Initialize the Gemini 2.5 Pro LLM with moderate creativity
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            temperature=0.65,
-            convert_system_message_to_human=True
-        )
-        # Load the prompt template from file course_planner.txt
-        self.prompt_template = PromptTemplate.from_template(load_prompt("course_planner.txt"))
+        self.llm = get_llm(model="gemini-2.5-pro", temperature=0.65)
 
-    @retry_with_backoff()
-    def run(self, inputs: Dict) -> Dict:
+    def _build_prompt(self, inputs: Dict) -> str:
         # Extract inputs with defaults
         topic = inputs.get("current_topic", "Photosynthesis")
         level = inputs.get("level", "Medium")
@@ -29,18 +23,25 @@ class CoursePlannerTool:
         logger.info(f"Generating next topic for: {topic}, quiz_score: {quiz_score}")
 
         # Format the prompt with current context
-        prompt = self.prompt_template.format(current_topic=topic, level=level, quiz_score=quiz_score)
-        
-        # Call LLM to generate result
-        result = self.llm.invoke(prompt)
+        return prompt_registry.render("course_planner", current_topic=topic, level=level, quiz_score=quiz_score)
 
+    def _parse_result(self, result) -> Dict:
+        response_text = str(result.content).strip()
         try:
-            # Parse or clean output text
-            response_text = str(result.content).strip()
-            # Try to parse JSON if expected (optional, depends on prompt design)
-            response_json = json.loads(response_text)
-            return response_json
-        except json.JSONDecodeError:
+            return extract_json(response_text)
+        except JSONExtractionError:
             logger.error("Invalid JSON received for course planning")
             # Return error info along with raw text
             return {"error": "Course planning failed. Output was not valid JSON.", "raw_response": response_text}
+
+    @retry_with_backoff()
+    def run(self, inputs: Dict) -> Dict:
+        # Call LLM to generate result
+        result = self.llm.invoke(self._build_prompt(inputs))
+        return self._parse_result(result)
+
+    @retry_with_backoff()
+    async def arun(self, inputs: Dict) -> Dict:
+        """Async version of run() using the LLM's native async API."""
+        result = await self.llm.ainvoke(self._build_prompt(inputs))
+        return self._parse_result(result)
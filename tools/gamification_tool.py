@@ -1,32 +1,39 @@
 from typing import Dict
-import json
 from tools.utils.retry_handler import retry_with_backoff
 from tools.utils.logger import get_logger
-from tools.utils.prompt_loader import load_prompt
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+from tools.utils.json_extract import JSONExtractionError, extract_json
+from tools.utils.prompt_registry import prompt_registry
+from llms.client_pool import get_llm
+from tools.utils.metrics import traced_tool
 
 logger = get_logger("GamificationTool")
 
+@traced_tool
 class GamificationTool:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            temperature=0.6,
-            convert_system_message_to_human=True
-        )
-        self.prompt_template = PromptTemplate.from_template(load_prompt("gamification.txt"))
+        self.llm = get_llm(model="gemini-2.5-pro", temperature=0.6)
 
-    @retry_with_backoff()
-    def run(self, inputs: Dict) -> Dict:
+    def _build_prompt(self, inputs: Dict) -> str:
         student_data = inputs.get("student_data", {})
         logger.info("Generating gamification metrics")
 
-        prompt = self.prompt_template.format(student_data=str(student_data))
-        result = self.llm.invoke(prompt)
+        return prompt_registry.render("gamification", student_data=str(student_data))
 
+    def _parse_result(self, result) -> Dict:
         try:
             response_text = str(result.content).strip()
-        except json.JSONDecodeError:
+            return extract_json(response_text)
+        except JSONExtractionError:
             logger.error("Invalid JSON from LLM for gamification")
-            return {"error": "Gamification generation failed.", "raw_response": result.content}
\ No newline at end of file
+            return {"error": "Gamification generation failed.", "raw_response": result.content}
+
+    @retry_with_backoff()
+    def run(self, inputs: Dict) -> Dict:
+        result = self.llm.invoke(self._build_prompt(inputs))
+        return self._parse_result(result)
+
+    @retry_with_backoff()
+    async def arun(self, inputs: Dict) -> Dict:
+        """Async version of run() using the LLM's native async API."""
+        result = await self.llm.ainvoke(self._build_prompt(inputs))
+        return self._parse_result(result)
@@ -1,92 +1,99 @@
 # tools/lesson_generation_tool.py
 
-from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+from typing import Dict, Any, AsyncIterator
+from llms.client_pool import get_llm
 from langchain.schema import HumanMessage
-import json
-import logging
-import os
-import re
 
-from .utils.prompt_loader import get_prompt_template
+from tools.utils.prompt_registry import prompt_registry
 from tools.utils.retry_handler import retry_with_backoff
 from tools.utils.logger import get_logger
+from llms.response_cache import cached_invoke, cached_ainvoke, cached_astream
+from tasks.lesson_planner_tasks import LessonOutputSchema
+from tools.utils.json_extract import JSONExtractionError, extract_json, json_validator
+from tools.utils.json_stream import stream_json_sections
+from tools.utils.metrics import traced_tool
 
 logger = get_logger(__name__)
 
+@traced_tool
 class LessonGenerationTool:
+    # Opt in to the shared LLM response cache (llms/response_cache.py)
+    use_cache = True
+    # Only lessons that validate are cached
+    is_valid_response = staticmethod(json_validator(LessonOutputSchema))
+
     def __init__(self):
-        google_api_key = os.getenv("GOOGLE_API_KEY")
-        self.llm = ChatGoogleGenerativeAI(
-            model="models/gemini-2.5-pro",
-            temperature=0.7,
-            google_api_key=google_api_key,
-            convert_system_message_to_human=True
-        )
-        self.prompt_template = PromptTemplate.from_template(
-            get_prompt_template("lesson_generation")
-        )
-
-    def clean_llm_json_output(self, raw_text: str) -> str:
-        # Remove markdown code fences (```json or ```)
-        cleaned = re.sub(r'^```jsons*', '', raw_text.strip())
-        cleaned = re.sub(r'^```s*', '', cleaned)
-        cleaned = re.sub(r'```$', '', cleaned.strip())
-
-        # Remove any invisible unicode chars - optional (here using ascii-only)
-        # Removed the ASCII encoding/decoding line
-        # cleaned = cleaned.encode('ascii', 'ignore').decode('ascii')
-
-        return cleaned
+        self.llm = get_llm(model="models/gemini-2.5-pro", temperature=0.7)
 
-    @retry_with_backoff(retries=3, delay=2)
-    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_prompt(self, inputs: Dict[str, Any]) -> str:
         topic = inputs.get("topic", "Photosynthesis")
         level = inputs.get("level", "Medium")
         dialect = inputs.get("dialect", "Telangana Telugu")
         grade = inputs.get("grade", "")  # Default empty string if missing
 
-        prompt = self.prompt_template.format(topic=topic, level=level, dialect=dialect, grade=grade)
+        prompt = prompt_registry.render("lesson_generation", topic=topic, level=level, dialect=dialect, grade=grade)
         # Corrected the f-string to use triple quotes
         logger.info("""📌 Prompt sent to Gemini:
 %s""", prompt)
+        return prompt
 
-        if not prompt.strip():
-            logger.error("❌ Generated prompt is empty. Cannot send to LLM.")
-            return {
-                "error": "Generated prompt is empty. Please provide sufficient inputs (topic, level, dialect).",
-                "raw_inputs": inputs
-            }
-
-        try:
-            messages = [HumanMessage(content=prompt)]
-            result = self.llm.invoke(messages)
+    def _empty_prompt_error(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        logger.error("❌ Generated prompt is empty. Cannot send to LLM.")
+        return {
+            "error": "Generated prompt is empty. Please provide sufficient inputs (topic, level, dialect).",
+            "raw_inputs": inputs
+        }
 
-            logger.debug(f"LLM raw result object: {result}")
+    def _parse_result(self, result, topic: str) -> Dict[str, Any]:
+        logger.debug(f"LLM raw result object: {result}")
 
-            response_text = result.content.strip() if hasattr(result, "content") else str(result).strip()
-            # Corrected the f-string to use triple quotes
-            logger.debug(f"""LLM response_text: {response_text}""")
+        response_text = result.content.strip() if hasattr(result, "content") else str(result).strip()
+        # Corrected the f-string to use triple quotes
+        logger.debug(f"""LLM response_text: {response_text}""")
 
-            cleaned_text = self.clean_llm_json_output(response_text)
+        try:
+            parsed = extract_json(response_text, LessonOutputSchema)
+        except JSONExtractionError as e:
             # Corrected the f-string to use triple quotes
-            logger.debug(f"""Cleaned LLM output before JSON parse:
-{cleaned_text}""")
+            logger.error("""❌ JSON extraction failed (%s). Raw output:
+%s""", e, response_text)
+            return {
+                "error": "Invalid JSON response from LLM.",
+                "details": str(e),
+                "raw_response": response_text
+            }
 
-            parsed = json.loads(cleaned_text)
+        logger.info(f"✅ Lesson generated successfully for topic: {topic}")
+        return parsed
 
-            logger.info(f"✅ Lesson generated successfully for topic: {topic}")
-            return parsed
+    @retry_with_backoff(retries=3, delay=2)
+    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = self._build_prompt(inputs)
+        if not prompt.strip():
+            return self._empty_prompt_error(inputs)
 
-        except json.JSONDecodeError:
-            # Corrected the f-string to use triple quotes
-            logger.error("""❌ JSON decoding failed. Raw output:
-%s""", result.content if hasattr(result, "content") else str(result))
+        try:
+            messages = [HumanMessage(content=prompt)]
+            result = cached_invoke(self.llm, messages, enabled=self.use_cache, is_valid=self.is_valid_response)
+            return self._parse_result(result, inputs.get("topic", "Photosynthesis"))
+        except Exception as e:
+            logger.exception("🚨 Unexpected error during lesson generation")
             return {
-                "error": "Invalid JSON response from LLM.",
-                "raw_response": result.content if hasattr(result, "content") else str(result)
+                "error": "Unexpected failure during lesson generation",
+                "details": str(e)
             }
+
+    @retry_with_backoff(retries=3, delay=2)
+    async def arun(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of run() using the LLM's native async API."""
+        prompt = self._build_prompt(inputs)
+        if not prompt.strip():
+            return self._empty_prompt_error(inputs)
+
+        try:
+            messages = [HumanMessage(content=prompt)]
+            result = await cached_ainvoke(self.llm, messages, enabled=self.use_cache, is_valid=self.is_valid_response)
+            return self._parse_result(result, inputs.get("topic", "Photosynthesis"))
         except Exception as e:
             logger.exception("🚨 Unexpected error during lesson generation")
             return {
@@ -94,5 +101,29 @@ class LessonGenerationTool:
                 "details": str(e)
             }
 
+    async def astream(self, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate the lesson as a stream of events: one "section" per top-level key
+        (introduction, core_concepts, ..., summary) as soon as Gemini closes it,
+        then "done" with the lesson validated against LessonOutputSchema, or
+        "error". Not retried: sections may already have reached the client.
+        """
+        prompt = self._build_prompt(inputs)
+        if not prompt.strip():
+            yield {"event": "error", "data": self._empty_prompt_error(inputs)}
+            return
+
+        try:
+            messages = [HumanMessage(content=prompt)]
+            chunks = cached_astream(self.llm, messages, enabled=self.use_cache, is_valid=self.is_valid_response)
+            async for event in stream_json_sections(chunks, LessonOutputSchema):
+                yield event
+        except Exception as e:
+            logger.exception("🚨 Unexpected error during lesson streaming")
+            yield {"event": "error", "data": {
+                "error": "Unexpected failure during lesson generation",
+                "details": str(e)
+            }}
+
 # Instantiate only after class fully defined
 lesson_tool = LessonGenerationTool()
@@ -1,5 +1,7 @@
 from typing import Dict, List
+from tools.utils.metrics import traced_tool
 
+@traced_tool
 class MultimodalResearchTool:
     def run(self, topic: str, grade: str) -> Dict:
         # Placeholder logic: Replace with actual API/database queries
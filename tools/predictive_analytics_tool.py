@@ -1,5 +1,7 @@
 from typing import Dict, List
+from tools.utils.metrics import traced_tool
 
+@traced_tool
 class PredictiveAnalyticsTool:
     def run(self, quiz_results: Dict) -> Dict:
         students = quiz_results.get("students", [])
@@ -1,46 +1,89 @@
 import json
-import logging
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from tools.utils.prompt_loader import get_prompt_template
+from typing import Any, Dict, List
+
+from pydantic import BaseModel, Field, model_validator
+
+from llms.client_pool import get_llm
+from tools.utils.prompt_registry import prompt_registry
 from tools.utils.logger import get_logger
+from tools.utils.json_extract import JSONExtractionError, extract_json, json_validator
+from llms.response_cache import cached_invoke, cached_ainvoke
+from tools.utils.metrics import traced_tool
 
 logger = get_logger(__name__)
 
+class QuizOutputSchema(BaseModel):
+    topic: str = Field(..., description="Topic of the quiz based on the lesson")
+    grade_level: str = Field(..., description="Target grade level for the quiz")
+    questions: List[Dict[str, Any]] = Field(
+        ...,
+        description="List of questions with text, options, correct answer, and explanation"
+    )
+    format_type: str = Field(..., description="Format of quiz questions, e.g., MCQ, Fill-in-the-blank")
+    total_marks: int = Field(..., description="Total marks for the quiz")
+    dialect_adapted: bool = Field(..., description="Whether the questions are adapted for regional dialect")
+
+class QuizResponseSchema(BaseModel):
+    """What QuizGenerationTool returns: the quiz plus its adaptive set and retry feedback."""
+    quiz_json: Dict[str, Any]
+    adaptive_quiz_set: Dict[str, Any]
+    retry_feedback_report: Dict[str, Any]
+
+    @model_validator(mode="before")
+    @classmethod
+    def wrap_quiz(cls, data):
+        # The quiz_agent prompt asks for the quiz's own fields at the top level
+        if isinstance(data, dict) and "quiz_json" not in data and "questions" in data:
+            return {
+                "quiz_json": QuizOutputSchema.model_validate(data).model_dump(),
+                "adaptive_quiz_set": data.get("adaptive_quiz_set") or {"easy": [], "medium": [], "hard": []},
+                "retry_feedback_report": data.get("retry_feedback_report") or {},
+            }
+        return data
+
+@traced_tool
 class QuizGenerationTool:
+    # Opt in to the shared LLM response cache (llms/response_cache.py)
+    use_cache = True
+    is_valid_response = staticmethod(json_validator(QuizResponseSchema))
+
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            temperature=0.6,
-            convert_system_message_to_human=True
-        )
-        # Make sure your "quiz_agent" template uses only named keys!
-        self.prompt_template = PromptTemplate.from_template(
-            get_prompt_template("quiz_agent")
-        )
+        self.llm = get_llm(model="gemini-2.5-pro", temperature=0.6)
+
+    def _build_prompt(self, inputs: dict) -> str:
+        logger.debug(f"Quiz input keys: {list(inputs.keys())}")
+        # Missing and None inputs render as empty text, never as "None" in the prompt (and cache key)
+        values = {"lesson_plan_json": "", "story_body": "", "dialect": "default"}
+        values.update({key: value for key, value in inputs.items() if value is not None})
+        if isinstance(values["lesson_plan_json"], (dict, list)):
+            values["lesson_plan_json"] = json.dumps(values["lesson_plan_json"], ensure_ascii=False)
+        return prompt_registry.render("quiz_agent", **values)
+
+    def _parse_response(self, response_text: str) -> dict:
+        logger.debug(f"LLM response text (truncated): {response_text[:200]}")
+        return extract_json(response_text, QuizResponseSchema)
 
     def run(self, inputs: dict) -> dict:
         try:
-            # Log keys for debugging
-            logger.debug(f"Quiz input keys: {list(inputs.keys())}")
-            # Ensure all required keys are present
-            required_keys = self.prompt_template.input_variables
-            for key in required_keys:
-                if key not in inputs:
-                    logger.warning(f"Missing key for quiz prompt: '{key}', adding empty string for formatting safety.")
-                    inputs.setdefault(key, "")
-            # Format prompt with named keys only!
-            prompt_text = self.prompt_template.format(**inputs)
-            response_text = self.llm.predict(prompt_text)
-            logger.debug(f"LLM response text (truncated): {response_text[:200]}")
-            quiz_data = json.loads(response_text)
-            for needed in ["quiz_json", "adaptive_quiz_set", "retry_feedback_report"]:
-                if needed not in quiz_data:
-                    logger.warning(f"Missing key '{needed}' in quiz result")
-                    return self.get_fallback()
-            return quiz_data
-        except json.JSONDecodeError as jde:
-            logger.error(f"JSON decode error: {jde}")
+            prompt_text = self._build_prompt(inputs)
+            result = cached_invoke(self.llm, prompt_text, enabled=self.use_cache, is_valid=self.is_valid_response)
+            return self._parse_response(str(result.content))
+        except JSONExtractionError as e:
+            logger.warning(f"Unusable quiz response, using fallback: {e}")
+        except Exception as e:
+            logger.error(f"QuizGenerationTool error: {e}", exc_info=True)
+        return self.get_fallback()
+
+    async def arun(self, inputs: dict) -> dict:
+        """Async version of run() using the LLM's native async API."""
+        try:
+            prompt_text = self._build_prompt(inputs)
+            result = await cached_ainvoke(
+                self.llm, prompt_text, enabled=self.use_cache, is_valid=self.is_valid_response
+            )
+            return self._parse_response(str(result.content))
+        except JSONExtractionError as e:
+            logger.warning(f"Unusable quiz response, using fallback: {e}")
         except Exception as e:
             logger.error(f"QuizGenerationTool error: {e}", exc_info=True)
         return self.get_fallback()
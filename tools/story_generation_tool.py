@@ -1,66 +1,59 @@
 # tools/story_generation_tool.py
 
-from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-import json
+from typing import Dict, Any, AsyncIterator
+from llms.client_pool import get_llm
 
-from tools.utils.prompt_loader import get_prompt_template
+from tools.utils.prompt_registry import prompt_registry
 from tools.utils.retry_handler import retry_with_backoff
 from tools.utils.logger import get_logger
+from llms.response_cache import cached_invoke, cached_ainvoke, cached_astream
+from tools.utils.json_extract import JSONExtractionError, extract_json, json_validator
+from tools.utils.json_stream import stream_json_sections
+from tools.utils.metrics import traced_tool
 
 logger = get_logger(__name__)
 
-import re
-
+@traced_tool
 class StoryGenerationTool:
+    # Opt in to the shared LLM response cache (llms/response_cache.py)
+    use_cache = True
+    is_valid_response = staticmethod(json_validator())
+
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            temperature=0.75,
-            convert_system_message_to_human=True
-        )
-        self.prompt_template = PromptTemplate.from_template(
-            get_prompt_template("story_teller")
-        )
-
-    def clean_llm_json_output(self, raw_text: str) -> str:
-        # Strip markdown code fences like ```json and ```
-        cleaned = re.sub(r'^```jsons*', '', raw_text.strip())
-        cleaned = re.sub(r'^```s*', '', cleaned)
-        cleaned = re.sub(r'```$', '', cleaned.strip())
-        # Optional: remove invisible unicode chars
-        # Removed the ASCII encoding/decoding line
-        # cleaned = cleaned.encode('ascii', 'ignore').decode('ascii')
-        return cleaned
+        self.llm = get_llm(model="gemini-2.5-pro", temperature=0.75)
 
-    @retry_with_backoff(retries=3, delay=2)
-    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_prompt(self, inputs: Dict[str, Any]) -> str:
         topic = inputs.get("topic", "Photosynthesis")
         grade = inputs.get("grade", "6")
         dialect = inputs.get("dialect", "Telangana Telugu")
 
-        prompt = self.prompt_template.format(topic=topic, grade=grade, dialect=dialect)
+        return prompt_registry.render("story_teller", topic=topic, grade=grade, dialect=dialect)
+
+    def _parse_result(self, result, topic: str) -> Dict[str, Any]:
+        raw_response = result.content.strip()
 
         try:
-            result = self.llm.invoke(prompt)
-            raw_response = result.content.strip()
-            cleaned_response = self.clean_llm_json_output(raw_response)
-
-            try:
-                parsed = json.loads(cleaned_response)
-                logger.info(f"✅ Story generated for topic: {topic}")
-                return parsed
-
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ JSONDecodeError in story output: {e}")
-                logger.error(f"Raw response: {raw_response}")
-                # Return a structured error response that includes the problematic raw_response
-                return {
-                    "error": "Story generation failed due to invalid JSON output from LLM.",
-                    "details": str(e),
-                    "raw_response": raw_response # Include raw response for debugging
-                }
+            parsed = extract_json(raw_response)
+            logger.info(f"✅ Story generated for topic: {topic}")
+            return parsed
+
+        except JSONExtractionError as e:
+            logger.error(f"❌ JSON extraction failed in story output: {e}")
+            logger.error(f"Raw response: {raw_response}")
+            # Return a structured error response that includes the problematic raw_response
+            return {
+                "error": "Story generation failed due to invalid JSON output from LLM.",
+                "details": str(e),
+                "raw_response": raw_response # Include raw response for debugging
+            }
+
+    @retry_with_backoff(retries=3, delay=2)
+    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = self._build_prompt(inputs)
+
+        try:
+            result = cached_invoke(self.llm, prompt, enabled=self.use_cache, is_valid=self.is_valid_response)
+            return self._parse_result(result, inputs.get("topic", "Photosynthesis"))
 
         except Exception as e:
             logger.exception("🚨 Story generation failed")
@@ -69,3 +62,37 @@ class StoryGenerationTool:
                 "error": "Unexpected failure during story generation.",
                 "details": str(e)
             }
+
+    @retry_with_backoff(retries=3, delay=2)
+    async def arun(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Async version of run() using the LLM's native async API."""
+        prompt = self._build_prompt(inputs)
+
+        try:
+            result = await cached_ainvoke(self.llm, prompt, enabled=self.use_cache, is_valid=self.is_valid_response)
+            return self._parse_result(result, inputs.get("topic", "Photosynthesis"))
+
+        except Exception as e:
+            logger.exception("🚨 Story generation failed")
+            return {
+                "error": "Unexpected failure during story generation.",
+                "details": str(e)
+            }
+
+    async def astream(self, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate the story as a stream of events: one "section" per key (story_title,
+        story_body, ...) as soon as it is complete, then "done" or "error".
+        """
+        prompt = self._build_prompt(inputs)
+
+        try:
+            chunks = cached_astream(self.llm, prompt, enabled=self.use_cache, is_valid=self.is_valid_response)
+            async for event in stream_json_sections(chunks):
+                yield event
+        except Exception as e:
+            logger.exception("🚨 Story streaming failed")
+            yield {"event": "error", "data": {
+                "error": "Unexpected failure during story generation.",
+                "details": str(e)
+            }}
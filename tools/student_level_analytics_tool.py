@@ -1,5 +1,7 @@
 from typing import Dict
+from tools.utils.metrics import traced_tool
 
+@traced_tool
 class StudentLevelAnalyticsTool:
     def run(self, student_performance: Dict) -> Dict:
         name = student_performance.get("name", "unknown")
@@ -1,26 +1,38 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from tools.utils.retry_handler import retry_with_backoff
 from tools.utils.logger import get_logger
+from tools.utils.sync_engine import SYNC_COLLECTIONS, FirestoreRemote, Outbox, SyncEngine
 
 logger = get_logger(__name__)
 
 class SyncTool:
     """
     Synchronizes lesson, quiz, and progress data between Firestore and IndexedDB.
-    Supports offline-first education architecture.
+    Supports offline-first education architecture: local writes are queued as
+    field-level diffs and only changed fields cross the wire (see SyncEngine).
     """
 
-    def __init__(self, firestore_client, indexeddb_client):
+    def __init__(self, firestore_client, indexeddb_client, engine: Optional[SyncEngine] = None,
+                 outbox_path: str = "memory/sync_outbox.sqlite3"):
         self.firestore = firestore_client
         self.indexeddb = indexeddb_client
+        self.engine = engine or SyncEngine(
+            local=indexeddb_client,
+            remote=FirestoreRemote(firestore_client),
+            outbox=Outbox(outbox_path),
+            collections=SYNC_COLLECTIONS,
+        )
+
+    def save_local(self, collection: str, doc_id: str, document: dict) -> Dict[str, Any]:
+        """Write to the local store and queue the changed fields for upload."""
+        return self.engine.save_local(collection, doc_id, document)
 
     @retry_with_backoff(retries=3, delay=2)
     def sync_from_firestore(self, student_id: str) -> Dict[str, Any]:
         try:
-            data = self.firestore.get_document(student_id)
-            self.indexeddb.save_document(student_id, data)
-            logger.info(f"✅ Synced Firestore ➝ IndexedDB for {student_id}")
-            return {"status": "success", "source": "firestore", "synced_data": data}
+            downloaded = self.engine.pull(student_id)
+            logger.info(f"✅ Synced Firestore ➝ IndexedDB for {student_id}: {downloaded} changed documents")
+            return {"status": "success", "source": "firestore", "downloaded": downloaded}
         except Exception as e:
             logger.exception("❌ Firestore sync failed")
             return {"status": "error", "error": str(e)}
@@ -28,10 +40,21 @@ class SyncTool:
     @retry_with_backoff(retries=3, delay=2)
     def sync_to_firestore(self, student_id: str) -> Dict[str, Any]:
         try:
-            data = self.indexeddb.get_document(student_id)
-            self.firestore.update_document(student_id, data)
-            logger.info(f"✅ Synced IndexedDB ➝ Firestore for {student_id}")
-            return {"status": "success", "source": "indexeddb", "synced_data": data}
+            uploaded = self.engine.push(student_id)
+            logger.info(f"✅ Synced IndexedDB ➝ Firestore for {student_id}: {uploaded} changed documents")
+            return {"status": "success", "source": "indexeddb", "uploaded": uploaded, **self.engine.status()}
         except Exception as e:
             logger.exception("❌ IndexedDB sync failed")
             return {"status": "error", "error": str(e)}
+
+    def sync(self, student_id: str) -> Dict[str, Any]:
+        """Pull then push for one student; see SyncEngine.sync."""
+        return self.engine.sync(student_id)
+
+    def status(self) -> Dict[str, Any]:
+        return self.engine.status()
+
+    def find_local(self, collection: str, student_id: Optional[str] = None,
+                   class_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Synced documents from the local store; needs no network."""
+        return self.indexeddb.find(collection=collection, student_id=student_id, class_id=class_id)
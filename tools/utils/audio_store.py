@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+from tools.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _to_plain(value: Any) -> Any:
+    """Turn proto-plus messages (VoiceSelectionParams, AudioConfig) into stable dicts."""
+    to_dict = getattr(type(value), "to_dict", None)
+    if callable(to_dict):
+        return to_dict(value)
+    return value
+
+
+class _KeyLock:
+    """A threading.Lock that can live in a WeakValueDictionary (plain locks cannot be weakly referenced)."""
+
+    __slots__ = ("_lock", "__weakref__")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+class AudioStore:
+    """
+    Content-addressed store for synthesized audio.
+
+    Files are named after sha256(SSML, voice params, audio config), so identical
+    narrations map to one file. An index file tracks size and last access; once the
+    indexed files exceed `max_bytes` the least recently used ones are deleted.
+    Files in the directory that are not in the index are left alone.
+    """
+
+    INDEX_FLUSH_INTERVAL = 5.0
+
+    def __init__(self, directory: str = "generated_audio", max_bytes: int = 512 * 1024 * 1024,
+                 index_name: str = "audio_index.json", extension: str = "mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.index_path = os.path.join(directory, index_name)
+        self._lock = threading.Lock()
+        # An entry lives only while some caller holds its lock, so the dict does not grow per key
+        self._key_locks: "weakref.WeakValueDictionary[str, _KeyLock]" = weakref.WeakValueDictionary()
+        self._last_flush = 0.0
+        self._dirty = False
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(ssml: str, voice_params: Any, audio_config: Any) -> str:
+        payload = json.dumps([ssml, _to_plain(voice_params), _to_plain(audio_config)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> Dict[str, dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            logger.warning("Audio index unreadable, starting with an empty index: %s", self.index_path)
+            return {}
+        # Drop entries whose files were removed behind our back
+        return {key: entry for key, entry in index.items() if os.path.exists(self._path(key))}
+
+    def _flush_index(self, force: bool = False):
+        now = time.monotonic()
+        if not self._dirty or (not force and now - self._last_flush < self.INDEX_FLUSH_INTERVAL):
+            return
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._last_flush = now
+        self._dirty = False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.{self.extension}")
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry["size"] for entry in self._index.values())
+
+    def lock_for(self, key: str) -> _KeyLock:
+        """Per-key lock so concurrent identical requests synthesize only once."""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = _KeyLock()
+            return lock
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._index.get(key)
+            path = self._path(key)
+            if entry is None or not os.path.exists(path):
+                if entry is not None:
+                    del self._index[key]
+                    self._dirty = True
+                self.misses += 1
+                return None
+            entry["last_access"] = time.time()
+            self._dirty = True
+            self._flush_index()
+            self.hits += 1
+            return path
+
+    def put(self, key: str, audio: bytes) -> str:
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(audio)
+        os.replace(tmp_path, path)
+        with self._lock:
+            now = time.time()
+            self._index[key] = {"size": len(audio), "created_at": now, "last_access": now}
+            self._dirty = True
+            self._evict(keep=key)
+            self._flush_index(force=True)
+        return path
+
+    def _evict(self, keep: str):
+        total = self.total_bytes
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._index.pop(key)["size"]
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            logger.info("Evicted cached audio %s", key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._index), "bytes": self.total_bytes}
@@ -0,0 +1,162 @@
+"""
+JSON extraction for LLM responses, shared by the generation tools.
+
+Gemini is asked for a bare JSON object but sometimes wraps it in ``` fences,
+adds a sentence before or after it, or stops mid-object at the output limit.
+extract_json() parses a clean response directly and otherwise takes the first
+balanced JSON value in the text; a value cut off at the end is closed after its
+last complete member. Given a Pydantic schema, parsing and validation are one
+model_validate_json() call, so a response that only needed trimming is used
+instead of being regenerated.
+"""
+import json
+import re
+from typing import Any, Callable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from tools.utils.logger import get_logger
+from tools.utils.metrics import span
+
+logger = get_logger(__name__)
+
+# Characters that change the scanner's state; everything else is skipped by the regex
+_STRUCTURE = re.compile(r'[\\"{}\[\],]')
+_START = re.compile(r"[{\[]")
+_CLOSERS = {"{": "}", "[": "]"}
+
+# How many cut points (from the end) a truncated value is retried at
+MAX_REPAIR_CUTS = 8
+
+
+class JSONExtractionError(ValueError):
+    def __init__(self, message: str, raw_response: str, errors: Optional[list] = None):
+        super().__init__(message)
+        self.raw_response = raw_response
+        self.errors = errors or []
+
+
+def _scan(text: str, start: int):
+    """
+    Walk the JSON value starting at text[start]. Returns (end, None) for a
+    balanced value, (None, state) when the text ends inside it, or (None, None)
+    when a bracket does not match. `state` is (closing brackets, in_string, cuts)
+    where a cut is (position, closers) at which the value can be truncated.
+    """
+    closers: List[str] = []
+    cuts: List[Tuple[int, str]] = []
+    in_string = False
+    skip_until = -1
+    for match in _STRUCTURE.finditer(text, start):
+        index = match.start()
+        if index < skip_until:
+            continue  # The character after a backslash
+        char = match.group(0)
+        if in_string:
+            if char == "\\":
+                skip_until = index + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            closers.append(_CLOSERS[char])
+            cuts.append((index + 1, "".join(reversed(closers))))
+        elif char in "}]":
+            if not closers or char != closers[-1]:
+                return None, None
+            closers.pop()
+            if not closers:
+                return index + 1, None
+        elif char == ",":
+            cuts.append((index, "".join(reversed(closers))))
+    return None, ("".join(reversed(closers)), in_string, cuts)
+
+
+def _repairs(text: str, start: int, state) -> List[str]:
+    closing, in_string, cuts = state
+    head = text[start:] + ('"' if in_string else "")
+    candidates = [head.rstrip().rstrip(",") + closing]
+    for position, cut_closing in reversed(cuts[-MAX_REPAIR_CUTS:]):
+        candidates.append(text[start:position] + cut_closing)
+    return candidates
+
+
+def _parse(candidate: str, schema: Optional[Type[BaseModel]]) -> Any:
+    """Parse (and validate); ValueError if `candidate` is not JSON, JSONExtractionError if it fails the schema."""
+    if schema is None:
+        return json.loads(candidate)
+    try:
+        return schema.model_validate_json(candidate).model_dump()
+    except ValidationError as e:
+        errors = e.errors()
+        if all(error["type"] == "json_invalid" for error in errors):
+            raise ValueError(str(e)) from None
+        raise JSONExtractionError(
+            f"Response does not match {schema.__name__}: {e.error_count()} error(s)", candidate, errors
+        ) from None
+
+
+def extract_json(text: str, schema: Optional[Type[BaseModel]] = None, repair: bool = True) -> Any:
+    """
+    The JSON value in an LLM response, as parsed by json.loads or, with a
+    schema, the validated model dumped to a dict. With `repair`, a truncated
+    value is closed at its last complete member. Raises JSONExtractionError.
+    """
+    with span("parse", schema.__name__ if schema is not None else "json"):
+        return _extract(text, schema, repair)
+
+
+def _extract(text: str, schema: Optional[Type[BaseModel]], repair: bool) -> Any:
+    stripped = text.strip()
+    try:
+        return _parse(stripped, schema)
+    except JSONExtractionError:
+        raise
+    except ValueError:
+        pass
+
+    schema_error, resume = None, 0
+    for start_match in _START.finditer(stripped):
+        start = start_match.start()
+        if start < resume:
+            continue  # Inside a value already tried
+        end, state = _scan(stripped, start)
+        if end is not None:
+            resume = end
+            try:
+                return _parse(stripped[start:end], schema)
+            except JSONExtractionError as e:
+                schema_error = schema_error or e
+                continue
+            except ValueError:
+                continue  # e.g. "[note]" in prose before the real object
+        if state is None:
+            continue
+        # The text ends inside this value: it is the response, cut off
+        if repair:
+            for candidate in _repairs(stripped, start, state):
+                try:
+                    result = _parse(candidate, schema)
+                except JSONExtractionError:
+                    raise
+                except ValueError:
+                    continue
+                logger.warning(f"Repaired truncated JSON response ({len(stripped) - start} chars)")
+                return result
+        break
+    raise schema_error or JSONExtractionError("No JSON value found in response", text)
+
+
+def json_validator(schema: Optional[Type[BaseModel]] = None) -> Callable[[str], bool]:
+    """
+    `is_valid` for cached_invoke(): accepts responses that extract_json() reads
+    without repair, so a truncated generation is never cached.
+    """
+    def is_valid(text: str) -> bool:
+        try:
+            _extract(text, schema, repair=False)
+        except ValueError:
+            return False
+        return True
+    return is_valid
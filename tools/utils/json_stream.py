@@ -0,0 +1,121 @@
+"""
+Incremental parsing of a JSON object streamed by an LLM.
+
+Generation tools ask Gemini for one JSON object whose top-level keys are the
+sections of a lesson or story. JSONObjectStream is fed the response text chunk
+by chunk and returns each top-level member as soon as its value closes, so an
+endpoint can forward "introduction" while "summary" is still being generated.
+Text before the opening brace and after the closing one (```json fences) is
+ignored, as extract_json() does for complete responses.
+"""
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from tools.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class JSONObjectStream:
+    def __init__(self):
+        self._text = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start: Optional[int] = None
+        self.closed = False
+        self.result: Dict[str, Any] = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add text; return the (key, value) members completed by it, in order."""
+        self._text += chunk
+        members = []
+        text, index = self._text, self._position
+        while index < len(text) and not self.closed:
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._member_start = index + 1
+                if self._depth > 0 or char == "{":
+                    self._depth += 1
+            elif char in "}]" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end_member(index, members)
+                    self.closed = True
+            elif char == "," and self._depth == 1:
+                self._end_member(index, members)
+                self._member_start = index + 1
+            index += 1
+        self._position = index
+        return members
+
+    def _end_member(self, end: int, members: List[Tuple[str, Any]]):
+        member = self._text[self._member_start:end]
+        if not member.strip():
+            return  # "{}" or a trailing comma
+        # Raises json.JSONDecodeError (a ValueError) for a malformed member
+        parsed = json.loads("{" + member + "}")
+        for key, value in parsed.items():
+            self.result[key] = value
+            members.append((key, value))
+
+    def close(self) -> Dict[str, Any]:
+        """The whole object; ValueError if the text ended before it was closed."""
+        if not self.closed:
+            raise ValueError("JSON object is incomplete")
+        return self.result
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+
+async def stream_json_sections(chunks: AsyncIterable[str],
+                               schema: Optional[Type[BaseModel]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Events for a streamed JSON object response:
+    {"event": "section", "data": {"key": ..., "value": ...}} per top-level member,
+    then {"event": "done", "data": <the whole object>}, or
+    {"event": "error", "data": {"error": ..., "raw_response": ...}} if it does not
+    parse or, given a schema, does not validate (sections already sent stand).
+    """
+    parser = JSONObjectStream()
+    try:
+        async for chunk in chunks:
+            for key, value in parser.feed(chunk):
+                yield {"event": "section", "data": {"key": key, "value": value}}
+        result = parser.close()
+    except ValueError as e:
+        logger.error(f"❌ Streamed JSON could not be parsed: {e}")
+        yield {"event": "error", "data": {
+            "error": "Invalid JSON response from LLM.",
+            "details": str(e),
+            "raw_response": parser.text,
+        }}
+        return
+    if schema is not None:
+        try:
+            result = schema.model_validate(result).model_dump()
+        except ValidationError as e:
+            logger.error(f"❌ Streamed JSON does not match {schema.__name__}: {e.error_count()} error(s)")
+            yield {"event": "error", "data": {
+                "error": f"Response does not match {schema.__name__}.",
+                "details": e.errors(include_url=False),
+                "raw_response": parser.text,
+            }}
+            return
+    yield {"event": "done", "data": result}
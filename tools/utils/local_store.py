@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from tools.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _owner(document: dict, fields: Tuple[str, ...]) -> Optional[str]:
+    for name in fields:
+        value = document.get(name)
+        if value is not None:
+            return str(value)
+    return None
+
+
+class LocalStore:
+    """
+    Embedded document store for offline-first edge servers, on SQLite.
+
+    Documents are JSON under keys "<collection>/<id>", the layout SyncTool and
+    SyncEngine use. Each row also stores the document's student (`student_id`,
+    falling back to `user_id`) and `class_id` in indexed columns, so a school box
+    can list a student's or a class's lessons and quizzes without scanning.
+
+    Writes go through one connection under a lock; reads use a connection per
+    thread. WAL keeps readers and the writer off each other, and mmap_size lets
+    reads come straight from the page cache instead of read() syscalls.
+    """
+
+    STUDENT_FIELDS = ("student_id", "user_id")
+
+    def __init__(self, path: str = "memory/local_store.sqlite3", mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                key TEXT PRIMARY KEY,
+                collection TEXT NOT NULL,
+                student_id TEXT,
+                class_id TEXT,
+                body TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS documents_student ON documents (student_id, collection);
+            CREATE INDEX IF NOT EXISTS documents_class ON documents (class_id, collection);
+            CREATE INDEX IF NOT EXISTS documents_collection ON documents (collection);
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        if self.path == ":memory:":
+            return self._writer  # A private in-memory database is only visible to its own connection
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _row(self, key: str, document: dict) -> tuple:
+        collection = key.split("/", 1)[0]
+        class_id = document.get("class_id")
+        return (key, collection, _owner(document, self.STUDENT_FIELDS),
+                None if class_id is None else str(class_id), json.dumps(document, default=str))
+
+    # -------- SyncTool interface --------
+
+    def get_document(self, key: str) -> Optional[dict]:
+        row = self._reader().execute("SELECT body FROM documents WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_document(self, key: str, document: dict):
+        self.save_documents([(key, document)])
+
+    def delete_document(self, key: str):
+        with self._write_lock, self._writer:
+            self._writer.execute("DELETE FROM documents WHERE key = ?", (key,))
+
+    # -------- bulk and indexed access --------
+
+    def save_documents(self, items: Iterable[Tuple[str, dict]]):
+        """Write many documents in one transaction."""
+        rows = [self._row(key, document) for key, document in items]
+        with self._write_lock, self._writer:
+            self._writer.executemany(
+                "INSERT OR REPLACE INTO documents (key, collection, student_id, class_id, body) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def find(self, collection: Optional[str] = None, student_id: Optional[str] = None,
+             class_id: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Documents matching every given filter, as {"id": <key>, **document}, ordered by key."""
+        clauses, params = [], []
+        for column, value in (("collection", collection), ("student_id", student_id), ("class_id", class_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT key, body FROM documents"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY key"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = self._reader().execute(sql, params).fetchall()
+        return [{"id": key.split("/", 1)[-1], **json.loads(body)} for key, body in rows]
+
+    def count(self, collection: Optional[str] = None) -> int:
+        if collection is None:
+            return self._reader().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return self._reader().execute("SELECT COUNT(*) FROM documents WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
@@ -0,0 +1,472 @@
+"""
+Latency and usage metrics, served at /metrics in the Prometheus text format.
+
+span(kind, name) times a block of sync or async code into the
+vidyavahini_span_seconds histogram, labelled by kind (request, agent, tool,
+prompt, llm, parse, firestore), name and status. Spans nest through a context
+variable, so a span knows its parent and trace; finished spans go to the
+exporters added with add_span_exporter(): InMemorySpanCollector in tests,
+enable_opentelemetry() to forward them to an OpenTelemetry SDK. Counters add
+LLM tokens and upstream retries; scrape-time collectors report state owned
+elsewhere (response cache, client pool, circuit breakers).
+
+The exposition format is written here, so prometheus_client is not needed.
+"""
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tools.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; LLM calls run from ~0.5s to the 60s agent timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# ---------------- metric types ----------------
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            return [(self.name + "_total", key, value) for key, value in self._values.items()]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._lock = threading.Lock()
+        # labels -> [count per bucket (not cumulative)..., sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    _key = Counter._key
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        samples = []
+        for key, counts in values.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", key + (("le", _format_value(bound)),), cumulative))
+            samples.append((self.name + "_sum", key, counts[-1]))
+            samples.append((self.name + "_count", key, cumulative))
+        return samples
+
+    clear = Counter.clear
+
+
+@dataclass
+class Sample:
+    """One value from a scrape-time collector."""
+    name: str
+    type: str  # "counter" or "gauge"
+    help: str
+    value: float
+    labels: Dict[str, Any] = field(default_factory=dict)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Call `collector` on every scrape for values kept elsewhere (gauges, stats dicts)."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        collected: Dict[str, List[Sample]] = {}
+        for collector in collectors:
+            try:
+                for sample in collector():
+                    collected.setdefault(sample.name, []).append(sample)
+            except Exception as e:  # a broken collector must not take /metrics down
+                logger.warning(f"Metrics collector {collector!r} failed: {e}")
+        for name, samples in collected.items():
+            suffix = "_total" if samples[0].type == "counter" else ""
+            lines.append(f"# HELP {name} {samples[0].help}")
+            lines.append(f"# TYPE {name} {samples[0].type}")
+            for sample in samples:
+                labels = tuple((key, str(value)) for key, value in sample.labels.items())
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+SPAN_SECONDS = registry.histogram(
+    "vidyavahini_span_seconds", "Duration of agent, tool, LLM, parsing and Firestore operations.",
+    ("kind", "name", "status"),
+)
+LLM_TOKENS = registry.counter(
+    "vidyavahini_llm_tokens", "LLM tokens by direction (estimated at 4 characters per token "
+    "when the response carries no usage metadata).", ("model", "direction"),
+)
+UPSTREAM_RETRIES = registry.counter(
+    "vidyavahini_upstream_retries", "Retries of transient upstream failures.", ("upstream",),
+)
+
+
+# ---------------- spans ----------------
+
+@dataclass
+class Span:
+    kind: str
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = 0.0  # epoch seconds
+    duration: float = 0.0
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("metrics_span", default=None)
+_exporters: List[Callable[[Span], None]] = []
+_otel_tracer = None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def annotate(**attributes):
+    """Set attributes on the current span, if any (e.g. cache_hit=True)."""
+    span_ = _current.get()
+    if span_ is not None:
+        span_.attributes.update(attributes)
+
+
+def _start(kind: str, name: str, attributes: Dict[str, Any]) -> Span:
+    parent = _current.get()
+    return Span(
+        kind=kind, name=name,
+        trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        start=time.time(),
+        attributes=dict(attributes),
+    )
+
+
+def _finish(span_: Span, started: float, exc: Optional[BaseException]):
+    span_.duration = time.perf_counter() - started
+    if exc is not None:
+        span_.status = "error" if isinstance(exc, Exception) else "cancelled"
+        span_.attributes.setdefault("error", type(exc).__name__)
+    SPAN_SECONDS.observe(span_.duration, kind=span_.kind, name=span_.name, status=span_.status)
+    for exporter in list(_exporters):
+        try:
+            exporter(span_)
+        except Exception as e:
+            logger.warning(f"Span exporter {exporter!r} failed: {e}")
+
+
+def _otel_span(span_: Span, activate: bool):
+    """The mirrored OpenTelemetry span (a context manager), when enabled."""
+    if _otel_tracer is None:
+        return None
+    name = f"{span_.kind} {span_.name}"
+    if activate:
+        return _otel_tracer.start_as_current_span(name, attributes=_otel_attributes(span_), end_on_exit=True)
+    return _otel_tracer.start_span(name, attributes=_otel_attributes(span_))
+
+
+def _otel_attributes(span_: Span) -> Dict[str, Any]:
+    attributes = {"vidyavahini.kind": span_.kind}
+    for key, value in span_.attributes.items():
+        attributes[key] = value if isinstance(value, (str, bool, int, float)) else str(value)
+    return attributes
+
+
+@contextmanager
+def span(kind: str, name: str, activate: bool = True, **attributes):
+    """
+    Time the block as a child of the current span. With `activate`, spans
+    started inside the block are its children; pass activate=False around the
+    yields of a generator, where the block hands control back to the consumer.
+    """
+    current = _start(kind, name, attributes)
+    token = _current.set(current) if activate else None
+    otel = _otel_span(current, activate)
+    otel_span = otel.__enter__() if activate and otel is not None else otel
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        if token is not None:
+            _current.reset(token)
+        _finish(current, started, error)
+        if otel_span is not None:
+            otel_span.set_attributes(_otel_attributes(current))
+            if activate:
+                otel.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+            else:
+                otel_span.end()
+
+
+def start_span(kind: str, name: str, **attributes) -> Tuple[Span, Callable[..., None]]:
+    """
+    Start a span that ends when the returned end(error=None) is called, for work
+    that outlives the block that started it (a streamed response body). Spans
+    started inside use_span(span) are its children. Calling end again is a no-op.
+    """
+    current = _start(kind, name, attributes)
+    otel_span = _otel_span(current, activate=False)
+    started = time.perf_counter()
+    ended = False
+
+    def end(error: Optional[BaseException] = None):
+        nonlocal ended
+        if ended:
+            return
+        ended = True
+        _finish(current, started, error)
+        if otel_span is not None:
+            otel_span.set_attributes(_otel_attributes(current))
+            otel_span.end()
+
+    return current, end
+
+
+@contextmanager
+def use_span(span_: Span):
+    """Make `span_` the parent of the spans started inside the block."""
+    token = _current.set(span_)
+    try:
+        yield span_
+    finally:
+        _current.reset(token)
+
+
+def traced(kind: str, name: Optional[str] = None):
+    """
+    Decorator running a function, coroutine function or async generator in a
+    span. A generator's span covers the whole iteration but is not activated.
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def agen_wrapper(*args, **kwargs):
+                with span(kind, label, activate=False):
+                    async for item in func(*args, **kwargs):
+                        yield item
+            wrapper = agen_wrapper
+        elif inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(kind, label):
+                    return await func(*args, **kwargs)
+            wrapper = async_wrapper
+        else:
+            @functools.wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                with span(kind, label):
+                    return func(*args, **kwargs)
+            wrapper = sync_wrapper
+        wrapper.__traced__ = True
+        return wrapper
+    return decorator
+
+
+def traced_tool(cls):
+    """Class decorator: run(), arun() and astream() of a tool each get a "tool" span."""
+    for method in ("run", "arun", "astream"):
+        func = cls.__dict__.get(method)
+        if func is not None and not getattr(func, "__traced__", False):
+            setattr(cls, method, traced("tool", f"{cls.__name__}.{method}")(func))
+    return cls
+
+
+# ---------------- LLM usage ----------------
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def record_llm_usage(model: str, prompt_text: str, response: Any = None, response_text: Optional[str] = None,
+                     target: Optional[Span] = None):
+    """
+    Count tokens in and out of one LLM call, from the response's usage_metadata
+    when the client reports it and estimated from the text otherwise. The
+    counts are also set on `target` (default: the current span).
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    tokens_in = usage.get("input_tokens") if isinstance(usage, dict) else None
+    tokens_out = usage.get("output_tokens") if isinstance(usage, dict) else None
+    if response_text is None:
+        response_text = str(getattr(response, "content", "") or "")
+    tokens_in = tokens_in if tokens_in is not None else estimate_tokens(prompt_text)
+    tokens_out = tokens_out if tokens_out is not None else estimate_tokens(response_text)
+    LLM_TOKENS.inc(tokens_in, model=model, direction="in")
+    LLM_TOKENS.inc(tokens_out, model=model, direction="out")
+    target = target or _current.get()
+    if target is not None:
+        target.attributes.update(tokens_in=tokens_in, tokens_out=tokens_out)
+
+
+# ---------------- exporters ----------------
+
+def add_span_exporter(exporter: Callable[[Span], None]):
+    _exporters.append(exporter)
+
+
+def remove_span_exporter(exporter: Callable[[Span], None]):
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+
+class InMemorySpanCollector:
+    """Span exporter that keeps finished spans in a list (tests, debugging)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans: List[Span] = []
+
+    def __call__(self, span_: Span):
+        with self._lock:
+            self.spans.append(span_)
+
+    def by_kind(self, kind: str) -> List[Span]:
+        with self._lock:
+            return [span_ for span_ in self.spans if span_.kind == kind]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+
+def enable_opentelemetry(tracer_provider=None):
+    """
+    Mirror every span into OpenTelemetry, on `tracer_provider` or the global
+    one. Needs opentelemetry-api; exporting also needs an SDK provider set up
+    with an exporter (OTLP, or InMemorySpanExporter in tests).
+    """
+    global _otel_tracer
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        raise RuntimeError("opentelemetry-api is not installed") from None
+    _otel_tracer = trace.get_tracer("vidyavahini", tracer_provider=tracer_provider)
+    logger.info("OpenTelemetry span export enabled")
+
+
+def disable_opentelemetry():
+    global _otel_tracer
+    _otel_tracer = None
+
+
+if os.getenv("VIDYAVAHINI_OTEL", "").lower() in ("1", "true", "yes"):
+    try:
+        enable_opentelemetry()
+    except RuntimeError as e:
+        logger.warning(f"VIDYAVAHINI_OTEL is set but {e}")
@@ -1,18 +1,15 @@
 import os
 
-PROMPT_DIR = os.path.join(os.path.dirname(__file__), '../prompts')
+from tools.utils.prompt_registry import prompt_registry
 
 def load_prompt(filename: str) -> str:
-    path = os.path.abspath(os.path.join(PROMPT_DIR, filename))
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Prompt file not found: {path}")
-    with open(path, 'r', encoding='utf-8') as f:
-        return f.read().strip()
+    """Raw text of a prompt file, served from the compiled prompt registry."""
+    name, _ = os.path.splitext(os.path.basename(filename))
+    return prompt_registry.text(name)
 
 def get_prompt_template(prompt_name: str) -> str:
     """
     Return the content of the prompt text file based on prompt_name.
     Example: prompt_name='lesson' loads 'lesson.txt' from prompts folder.
     """
-    filename = f"{prompt_name}.txt"
-    return load_prompt(filename)
+    return prompt_registry.text(prompt_name)
@@ -0,0 +1,203 @@
+"""
+Prompt templates from tools/prompts, loaded and compiled once per process.
+
+A placeholder is `{name}` with `name` a Python identifier; `{{` and the `}}`
+closing it are escaped braces. Any other brace is literal text, so the JSON
+examples in the prompt files need no escaping (langchain's PromptTemplate read
+them as input variables named e.g. '\\n  "BadgesAwarded"'). A compiled
+template renders with one join over precomputed literal segments, or returns
+its text unchanged when it has no placeholders. Prompt files are re-read when
+their mtime changes, checked at most every `check_interval` seconds.
+"""
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tools.utils.logger import get_logger
+from tools.utils.metrics import span
+
+logger = get_logger(__name__)
+
+PROMPT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "prompts"))
+
+_TOKEN = re.compile(r"\{\{|\}\}|\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+# What each tool passes to render(), checked against the templates at startup
+# and in tests: a template that ignores an input renders the same prompt (and
+# hits the same cache entry) whatever that input is.
+PROMPT_INPUTS: Dict[str, Tuple[str, ...]] = {
+    "ask_me": ("question", "context", "dialect"),
+    "content_creation": ("teacher_notes", "topic", "grade", "dialect"),
+    "course_planner": ("current_topic", "level", "quiz_score"),
+    "dashboard_metrics": ("subject", "grade", "topic", "quiz_scores", "engagement_level", "time_spent", "difficulty"),
+    "gamification": ("student_data",),
+    "lesson_generation": ("topic", "level", "dialect", "grade"),
+    "quiz_agent": ("lesson_plan_json", "story_body", "dialect"),
+    "story_teller": ("topic", "grade", "dialect"),
+    "visual_scenes": ("concept", "grade", "dialect"),
+}
+
+
+class PromptVariableError(KeyError):
+    def __init__(self, name: str, missing: List[str]):
+        super().__init__(name, missing)
+        self.name = name
+        self.missing = missing
+
+    def __str__(self):
+        return f"Prompt {self.name!r} is missing variables: {', '.join(self.missing)}"
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    name: str
+    source: str
+    # literals[i] comes before placeholders[i]; literals has one more entry
+    literals: Tuple[str, ...]
+    placeholders: Tuple[str, ...]
+
+    @property
+    def input_variables(self) -> Tuple[str, ...]:
+        return tuple(sorted(set(self.placeholders)))
+
+    def render(self, **values) -> str:
+        """Fill the placeholders; extra values are ignored, missing ones raise PromptVariableError."""
+        if not self.placeholders:
+            return self.literals[0]
+        try:
+            parts = [self.literals[0]]
+            for placeholder, literal in zip(self.placeholders, self.literals[1:]):
+                parts.append(str(values[placeholder]))
+                parts.append(literal)
+        except KeyError:
+            raise PromptVariableError(self.name, [v for v in self.input_variables if v not in values]) from None
+        return "".join(parts)
+
+
+def compile_prompt(name: str, source: str) -> CompiledPrompt:
+    literals, placeholders, buffer, position = [], [], [], 0
+    # "}}" only closes an escaped "{{"; otherwise it ends nested literal JSON
+    open_escapes = 0
+    for match in _TOKEN.finditer(source):
+        buffer.append(source[position:match.start()])
+        token = match.group(0)
+        if token == "{{":
+            buffer.append("{")
+            open_escapes += 1
+        elif token == "}}":
+            buffer.append("}" if open_escapes else "}}")
+            open_escapes = max(open_escapes - 1, 0)
+        else:
+            literals.append("".join(buffer))
+            placeholders.append(match.group(1))
+            buffer = []
+        position = match.end()
+    buffer.append(source[position:])
+    literals.append("".join(buffer))
+    return CompiledPrompt(name, source, tuple(literals), tuple(placeholders))
+
+
+class PromptRegistry:
+    """
+    Compiled templates by name: "<name>.txt" in `directory`, plus templates
+    registered from code. Thread-safe; file-backed entries hot-reload.
+    """
+
+    def __init__(self, directory: str = PROMPT_DIR, check_interval: float = 2.0, clock=time.monotonic):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        # name -> (prompt, path or None, mtime, last checked)
+        self._entries: Dict[str, Tuple[CompiledPrompt, Optional[str], float, float]] = {}
+        self.reloads = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.txt")
+
+    def _load(self, name: str, path: str) -> CompiledPrompt:
+        mtime = os.path.getmtime(path)
+        with open(path, "r", encoding="utf-8") as f:
+            prompt = compile_prompt(name, f.read().strip())
+        self._entries[name] = (prompt, path, mtime, self._clock())
+        return prompt
+
+    def load_all(self) -> Dict[str, CompiledPrompt]:
+        """Compile every prompt file now (at startup) instead of on first use."""
+        with self._lock:
+            for filename in sorted(os.listdir(self.directory)):
+                if filename.endswith(".txt"):
+                    self._load(filename[:-4], os.path.join(self.directory, filename))
+            return {name: entry[0] for name, entry in self._entries.items()}
+
+    def register(self, name: str, source: str) -> CompiledPrompt:
+        """Add a template defined in code; it is never reloaded."""
+        prompt = compile_prompt(name, source.strip())
+        with self._lock:
+            self._entries[name] = (prompt, None, 0.0, 0.0)
+        return prompt
+
+    def get(self, name: str) -> CompiledPrompt:
+        entry = self._entries.get(name)
+        if entry is not None:
+            prompt, path, mtime, checked = entry
+            if path is None or self._clock() - checked < self.check_interval:
+                return prompt
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                path = self._path(name)
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"Prompt file not found: {path}")
+                return self._load(name, path)
+            prompt, path, mtime, _ = entry
+            try:
+                changed = os.path.getmtime(path) != mtime
+            except OSError:
+                changed = False  # Deleted or being replaced; keep serving the last good version
+            if changed:
+                self.reloads += 1
+                logger.info(f"Reloading prompt {name!r} from {path}")
+                return self._load(name, path)
+            self._entries[name] = (prompt, path, mtime, self._clock())
+            return prompt
+
+    def render(self, name: str, /, **values) -> str:
+        with span("prompt", name):
+            return self.get(name).render(**values)
+
+    def text(self, name: str) -> str:
+        """The template source, for prompts used verbatim (e.g. system prompts)."""
+        return self.get(name).source
+
+    def validate(self, expected: Dict[str, Iterable[str]]) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Compare templates with the inputs their callers pass. "missing" are
+        placeholders no caller fills (render would raise); "unused" are inputs the
+        template ignores. Returns only templates with a problem.
+        """
+        problems = {}
+        for name, inputs in expected.items():
+            inputs = set(inputs)
+            variables = set(self.get(name).input_variables)
+            missing, unused = sorted(variables - inputs), sorted(inputs - variables)
+            if missing or unused:
+                problems[name] = {"missing": missing, "unused": unused}
+        return problems
+
+    def check(self, expected: Dict[str, Iterable[str]] = PROMPT_INPUTS) -> Dict[str, Dict[str, List[str]]]:
+        """load_all() and validate(), logging what validate() finds."""
+        self.load_all()
+        problems = self.validate(expected)
+        for name, problem in problems.items():
+            if problem["missing"]:
+                logger.error(f"Prompt {name!r} needs variables no caller passes: {problem['missing']}")
+            if problem["unused"]:
+                logger.warning(f"Prompt {name!r} ignores inputs: {problem['unused']}")
+        return problems
+
+
+prompt_registry = PromptRegistry()
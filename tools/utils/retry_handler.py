@@ -1,17 +1,312 @@
-import time
+"""
+Retries and circuit breakers for calls to upstream services (Gemini, Google
+TTS, Sarvam, Firestore).
+
+Only transient failures are retried: HTTP 408/429/502/503/504 (including the
+google.api_core equivalents ResourceExhausted, ServiceUnavailable and
+DeadlineExceeded), timeouts and dropped connections. A JSON error or a 400
+fails on the first attempt. Delays use full-jitter exponential backoff, a
+uniform draw from [0, delay * 2**attempt], unless the upstream sent a
+Retry-After. All retries made while serving one API request draw from a shared
+budget (retry_budget()), and each upstream has a circuit breaker that fails
+fast once it keeps failing transiently. A call that gave up is marked, so outer
+retry layers (a tool wrapping a pooled LLM call) do not retry it again.
+"""
+import asyncio
+import contextvars
+import email.utils
 import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+import requests
+
+from tools.utils.metrics import UPSTREAM_RETRIES, annotate
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = frozenset({408, 429, 502, 503, 504})
+_EXHAUSTED = "_retries_exhausted"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+# ---------------- error classification ----------------
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of a requests/google.api_core/FastAPI error, if it carries one."""
+    for value in (getattr(exc, "status_code", None),
+                  getattr(getattr(exc, "response", None), "status_code", None),
+                  getattr(exc, "code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    if getattr(exc, _EXHAUSTED, False) or isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (TimeoutError, ConnectionError, requests.Timeout, requests.ConnectionError,
+                        httpx.TimeoutException, httpx.NetworkError)):
+        return True
+    return status_code(exc) in RETRYABLE_STATUS
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from the error's Retry-After header (delta-seconds or HTTP date)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(exc, "headers", None)
+    value = headers.get("Retry-After") if headers else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+# ---------------- per-request retry budget ----------------
+
+class RetryBudget:
+    def __init__(self, retries: int):
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+_budget: contextvars.ContextVar[Optional[RetryBudget]] = contextvars.ContextVar("retry_budget", default=None)
+
+
+@contextmanager
+def retry_budget(retries: int):
+    """
+    Share `retries` retries between every call made in this context, including
+    tasks and worker threads started from it (they copy the context).
+    """
+    budget = RetryBudget(retries)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+# ---------------- circuit breakers ----------------
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive transient failures and rejects
+    calls for `reset_timeout` seconds; then lets one trial call through, which
+    closes it again on success. Non-transient errors mean the upstream answered,
+    so they count as healthy.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                waited = self._clock() - self.opened_at
+                if waited < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout - waited)
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Circuit for %s closed", self.name)
+            self.state, self.failures, self._trial_in_flight = "closed", 0, False
+
+    def record_failure(self, exc: BaseException):
+        if not is_transient(exc):
+            self.record_success()
+            return
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Circuit for %s opened after %d transient failures", self.name, self.failures)
+                self.state, self.opened_at = "open", self._clock()
+
+    def record_cancelled(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    @contextmanager
+    def guard(self):
+        """before_call() and record the outcome; usable around sync and async calls alike."""
+        self.before_call()
+        try:
+            yield
+        except Exception as exc:
+            self.record_failure(exc)
+            raise
+        except BaseException:
+            self.record_cancelled()
+            raise
+        self.record_success()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(upstream)
+        if breaker is None:
+            breaker = _breakers[upstream] = CircuitBreaker(upstream)
+        return breaker
+
+
+def breaker_stats() -> Dict[str, dict]:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
+
+
+# ---------------- retry policy ----------------
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    retries: int = 3           # attempts in total, including the first
+    delay: float = 1.0         # backoff base: attempt n waits up to delay * 2**n
+    max_delay: float = 30.0    # cap per wait; a longer Retry-After gives up instead
+    deadline: Optional[float] = None  # seconds for all attempts of one call
+
+    def next_delay(self, attempt: int, exc: BaseException, started: float) -> Optional[float]:
+        """Seconds to wait before attempt `attempt + 1`, or None to give up (and mark `exc`)."""
+        delay = None
+        if is_transient(exc) and attempt + 1 < self.retries:
+            hinted = retry_after(exc)
+            if hinted is None:
+                delay = random.uniform(0, min(self.max_delay, self.delay * 2 ** attempt))
+            elif hinted <= self.max_delay:
+                delay = hinted
+            if delay is not None and self.deadline is not None and \
+                    time.monotonic() - started + delay > self.deadline:
+                delay = None
+            budget = _budget.get()
+            if delay is not None and budget is not None and not budget.take():
+                delay = None
+        if delay is None and is_transient(exc):
+            try:
+                setattr(exc, _EXHAUSTED, True)
+            except AttributeError:
+                pass
+        return delay
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def _count_retry(upstream: str, retries: int):
+    UPSTREAM_RETRIES.inc(upstream=upstream)
+    annotate(retries=retries)
+
+
+def _guard(upstream: Optional[str]):
+    return get_breaker(upstream).guard() if upstream else nullcontext()
+
+
+def call_with_retry(func: Callable[..., Any], *args, policy: RetryPolicy = DEFAULT_POLICY,
+                    upstream: Optional[str] = None, **kwargs) -> Any:
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            with _guard(upstream):
+                return func(*args, **kwargs)
+        except Exception as exc:
+            delay = policy.next_delay(attempt, exc, started)
+            if delay is None:
+                raise
+            logger.warning("%s failed (%s); retry %d in %.2fs", upstream or func.__name__, exc, attempt + 1, delay)
+            _count_retry(upstream or func.__name__, attempt + 1)
+            time.sleep(delay)
+            attempt += 1
+
+
+async def acall_with_retry(func: Callable[..., Any], *args, policy: RetryPolicy = DEFAULT_POLICY,
+                           upstream: Optional[str] = None, **kwargs) -> Any:
+    """call_with_retry() for coroutine functions; waits with asyncio.sleep."""
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            with _guard(upstream):
+                return await func(*args, **kwargs)
+        except Exception as exc:
+            delay = policy.next_delay(attempt, exc, started)
+            if delay is None:
+                raise
+            logger.warning("%s failed (%s); retry %d in %.2fs", upstream or func.__name__, exc, attempt + 1, delay)
+            _count_retry(upstream or func.__name__, attempt + 1)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def retry_with_backoff(retries=3, delay=1.0, max_delay=30.0, deadline=None, upstream=None):
+    """Decorator form of call_with_retry() / acall_with_retry()."""
+    policy = RetryPolicy(retries=retries, delay=delay, max_delay=max_delay, deadline=deadline)
 
-def retry_with_backoff(retries=3, delay=1.0):
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await acall_with_retry(func, *args, policy=policy, upstream=upstream, **kwargs)
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            for attempt in range(retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    if attempt < retries - 1:
-                        time.sleep(delay * (2 ** attempt))
-                    else:
-                        raise
+            return call_with_retry(func, *args, policy=policy, upstream=upstream, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
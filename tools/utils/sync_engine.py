@@ -0,0 +1,378 @@
+"""
+Incremental sync between a local document store and Firestore.
+
+Every synced document carries a `_sync` map with two entries:
+- `fields`: {field: client time in ms of the last write to that field}
+- `updated_at`: the server time of the last upload, used as the pull watermark
+
+Server-side writes to a synced collection go through server_write(), which sets
+both, so devices that already hold a watermark still pull them.
+
+Local edits are diffed against the local copy, and only the changed fields go
+into a persistent SQLite outbox. push() coalesces the outbox per document and
+uploads just those fields with merge writes, up to 500 documents per batch.
+pull() asks Firestore only for the documents past each collection's watermark
+and merges them field by field. For every field the newer write wins
+(last-writer-wins per field, not per document), so edits to different fields
+on two devices both survive.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from tools.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SYNC_FIELD = "_sync"
+
+# Stands in for a removed field in diffs and in the outbox
+DELETED = {"$sync": "deleted"}
+
+# Firestore rejects a WriteBatch with more than 500 operations
+MAX_BATCH_DOCS = 500
+
+# Per-student collections kept on the device: {collection: owner field(s)}.
+# Quiz results posted to a class (batch_writer) name the student in "student_id".
+SYNC_COLLECTIONS: Dict[str, Union[str, Tuple[str, ...]]] = {
+    "lesson_plans": "user_id",
+    "stories": "user_id",
+    "quiz_results": ("user_id", "student_id"),
+}
+
+# Watermark after a first pull that found no stamped documents: later rounds
+# only fetch documents stamped since, not the whole collection again
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _field_times(document: Optional[dict]) -> Dict[str, int]:
+    return dict(((document or {}).get(SYNC_FIELD) or {}).get("fields") or {})
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def server_write(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `data` with the `_sync` stamp of a server-side write: every field timed now
+    and `updated_at` set to the commit time, so the write reaches devices past
+    their watermark and takes part in the per-field merge.
+    """
+    from firebase_admin import firestore  # SERVER_TIMESTAMP sentinel
+
+    now = int(time.time() * 1000)
+    return {**data, SYNC_FIELD: {"fields": {key: now for key in data if key != SYNC_FIELD},
+                                 "updated_at": firestore.SERVER_TIMESTAMP}}
+
+
+def owner_fields(collections: Dict[str, Union[str, Tuple[str, ...]]], collection: str) -> Tuple[str, ...]:
+    fields = collections[collection]
+    return (fields,) if isinstance(fields, str) else tuple(fields)
+
+
+def diff_fields(old: Optional[dict], new: dict) -> Dict[str, Any]:
+    """Fields of `new` that differ from `old`, with DELETED for fields `new` dropped."""
+    old = old or {}
+    changes = {key: value for key, value in new.items() if key != SYNC_FIELD and old.get(key, DELETED) != value}
+    changes.update({key: DELETED for key in old if key != SYNC_FIELD and key not in new})
+    return changes
+
+
+def merge_documents(local: Optional[dict], remote: dict) -> dict:
+    """
+    Field-level last-writer-wins. A remote field replaces the local one unless the
+    local write is newer; ties go to the server. Fields the remote copy has no
+    time for (written outside the sync engine) only fill in fields the local copy
+    never wrote. A field present in the remote times but absent from the remote
+    document was deleted there.
+    """
+    local_times, remote_times = _field_times(local), _field_times(remote)
+    merged = {key: value for key, value in (local or {}).items() if key != SYNC_FIELD}
+    times = dict(local_times)
+    for key in (set(remote) | set(remote_times)) - {SYNC_FIELD}:
+        if remote_times.get(key, 0) < local_times.get(key, 0):
+            continue
+        if key in remote:
+            merged[key] = remote[key]
+        else:
+            merged.pop(key, None)
+        if key in remote_times:
+            times[key] = remote_times[key]
+    updated_at = ((remote.get(SYNC_FIELD) or {}).get("updated_at")
+                  or ((local or {}).get(SYNC_FIELD) or {}).get("updated_at"))
+    merged[SYNC_FIELD] = {"fields": times, "updated_at": _timestamp(updated_at)}
+    return merged
+
+
+@dataclass
+class PendingChange:
+    """Outbox rows for one document, coalesced: later writes to a field replace earlier ones."""
+    collection: str
+    doc_id: str
+    owner: Optional[str] = None
+    fields: Dict[str, Any] = field(default_factory=dict)
+    times: Dict[str, int] = field(default_factory=dict)
+    ids: List[int] = field(default_factory=list)
+
+
+class Outbox:
+    """
+    Durable queue of field-level changes waiting for upload, plus the pull
+    watermarks. Survives restarts, so edits made offline are never lost.
+    """
+
+    def __init__(self, path: str = "memory/sync_outbox.sqlite3"):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                times TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS watermarks (scope TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")]
+        if "owner" not in columns:  # outboxes created before pushes were per owner
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN owner TEXT")
+
+    def add(self, collection: str, doc_id: str, fields: Dict[str, Any], times: Dict[str, int],
+            owner: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO outbox (collection, doc_id, fields, times, owner) VALUES (?, ?, ?, ?, ?)",
+                (collection, doc_id, json.dumps(fields, default=str), json.dumps(times), owner),
+            )
+
+    def pending(self, owner: Optional[str] = None) -> List[PendingChange]:
+        """Queued changes, all of them or `owner`'s (plus rows queued without an owner)."""
+        query = "SELECT id, collection, doc_id, owner, fields, times FROM outbox"
+        params: Tuple[Any, ...] = ()
+        if owner is not None:
+            query += " WHERE owner = ? OR owner IS NULL"
+            params = (owner,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall()
+        changes: Dict[Tuple[str, str], PendingChange] = {}
+        for row_id, collection, doc_id, row_owner, fields, times in rows:
+            change = changes.setdefault((collection, doc_id), PendingChange(collection, doc_id, row_owner))
+            change.fields.update(json.loads(fields))
+            change.times.update(json.loads(times))
+            change.ids.append(row_id)
+        return list(changes.values())
+
+    def ack(self, ids: List[int]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in ids])
+
+    def counts(self) -> Dict[str, int]:
+        """Documents waiting for upload, per collection."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT collection, COUNT(DISTINCT doc_id) FROM outbox GROUP BY collection"
+            ).fetchall()
+        return dict(rows)
+
+    def get_watermark(self, scope: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM watermarks WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, scope: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO watermarks (scope, value) VALUES (?, ?)", (scope, value))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FirestoreRemote:
+    """Delta queries and merge-write uploads against a (sync) Firestore client."""
+
+    def __init__(self, client, page_size: int = 300):
+        self.client = client
+        self.page_size = page_size
+
+    def changes_since(self, collection: str, owner_field: str, owner: str,
+                      watermark: Optional[str]) -> Iterator[Tuple[str, dict]]:
+        """
+        (doc id, data) of the owner's documents stamped after `watermark` (by an
+        upload or server_write()), oldest first, a page at a time. Without a
+        watermark every document is returned, including ones never stamped.
+        """
+        query = self.client.collection(collection).where(owner_field, "==", owner)
+        if watermark:
+            # (owner, _sync.updated_at, __name__): an index in firestore.indexes.json
+            order_field = f"{SYNC_FIELD}.updated_at"
+            query = query.where(order_field, ">", datetime.fromisoformat(watermark)).order_by(order_field)
+        # A batch upload gives all its documents one commit time; the id keeps page cursors exact
+        query = query.order_by("__name__")
+        last = None
+        while True:
+            page_query = query.start_after(last) if last is not None else query
+            snapshots = list(page_query.limit(self.page_size).stream())
+            for snapshot in snapshots:
+                yield snapshot.id, snapshot.to_dict() or {}
+            if len(snapshots) < self.page_size:
+                return
+            last = snapshots[-1]
+
+    def apply(self, changes: List[Tuple[str, str, Dict[str, Any], Dict[str, int]]]):
+        """Upload (collection, doc id, fields, times) tuples as one batch of merge writes."""
+        from firebase_admin import firestore  # DELETE_FIELD and SERVER_TIMESTAMP sentinels
+
+        batch = self.client.batch()
+        for collection, doc_id, fields, times in changes:
+            data = {key: firestore.DELETE_FIELD if value == DELETED else value for key, value in fields.items()}
+            data[SYNC_FIELD] = {"fields": times, "updated_at": firestore.SERVER_TIMESTAMP}
+            batch.set(self.client.collection(collection).document(doc_id), data, merge=True)
+        batch.commit()
+
+
+class SyncEngine:
+    """
+    Offline-first sync of per-owner collections between `local` (anything with
+    get_document(key)/save_document(key, doc), keys being "<collection>/<id>")
+    and `remote` (FirestoreRemote). Local writes go through save_local() or
+    update_local(); sync(owner) pulls the owner's remote changes, then pushes
+    the owner's part of the outbox.
+    """
+
+    def __init__(self, local, remote, outbox: Outbox, collections: Dict[str, Union[str, Tuple[str, ...]]],
+                 batch_size: int = MAX_BATCH_DOCS, clock=time.time):
+        self.local = local
+        self.remote = remote
+        self.outbox = outbox
+        # {collection: field(s) naming the document's owner, e.g. "user_id"}
+        self.collections = collections
+        self.batch_size = min(batch_size, MAX_BATCH_DOCS)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_time = 0
+        self.last_sync: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @staticmethod
+    def key(collection: str, doc_id: str) -> str:
+        return f"{collection}/{doc_id}"
+
+    def _owner(self, collection: str, document: dict) -> Optional[str]:
+        for owner_field in owner_fields(self.collections, collection):
+            if document.get(owner_field) is not None:
+                return str(document[owner_field])
+        return None
+
+    def _now_ms(self) -> int:
+        # Strictly increasing, so two edits in the same millisecond still order
+        with self._lock:
+            self._last_time = max(int(self._clock() * 1000), self._last_time + 1)
+            return self._last_time
+
+    # -------- local writes --------
+
+    def save_local(self, collection: str, doc_id: str, document: dict) -> Dict[str, Any]:
+        """Replace the local document; queue only the fields that changed. Returns them."""
+        key = self.key(collection, doc_id)
+        current = self.local.get_document(key) or {}
+        changes = diff_fields(current, document)
+        if not changes:
+            return {}
+        now = self._now_ms()
+        times = {name: now for name in changes}
+        sync_meta = dict(current.get(SYNC_FIELD) or {})
+        sync_meta["fields"] = {**_field_times(current), **times}
+        self.local.save_document(key, {**{k: v for k, v in document.items() if k != SYNC_FIELD},
+                                       SYNC_FIELD: sync_meta})
+        self.outbox.add(collection, doc_id, changes, times, self._owner(collection, document))
+        return changes
+
+    def update_local(self, collection: str, doc_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        current = self.local.get_document(self.key(collection, doc_id)) or {}
+        return self.save_local(collection, doc_id, {**current, **fields})
+
+    # -------- sync rounds --------
+
+    def pull(self, owner: str) -> int:
+        """Merge remote changes for `owner` into the local store. Returns documents received."""
+        received = 0
+        for collection in self.collections:
+            scope = f"{collection}:{owner}"
+            watermark = self.outbox.get_watermark(scope)
+            latest = datetime.fromisoformat(watermark) if watermark else _EPOCH
+            seen = set()
+            for owner_field in owner_fields(self.collections, collection):
+                for doc_id, data in self.remote.changes_since(collection, owner_field, owner, watermark):
+                    if doc_id in seen:
+                        continue
+                    seen.add(doc_id)
+                    key = self.key(collection, doc_id)
+                    self.local.save_document(key, merge_documents(self.local.get_document(key), data))
+                    updated_at = (data.get(SYNC_FIELD) or {}).get("updated_at")
+                    if isinstance(updated_at, datetime) and updated_at > latest:
+                        latest = updated_at
+                    received += 1
+            if latest.isoformat() != watermark:
+                self.outbox.set_watermark(scope, latest.isoformat())
+        return received
+
+    def push(self, owner: Optional[str] = None) -> int:
+        """
+        Upload the outbox (or `owner`'s changes in it) in batches. A queued field
+        is skipped if a newer remote write reached the local copy since (its local
+        time no longer matches). Returns documents uploaded.
+        """
+        uploads, superseded = [], []
+        for change in self.outbox.pending(owner):
+            times = _field_times(self.local.get_document(self.key(change.collection, change.doc_id)))
+            fields = {name: value for name, value in change.fields.items() if times.get(name) == change.times[name]}
+            if fields:
+                uploads.append((change, fields))
+            else:
+                superseded.extend(change.ids)
+        if superseded:
+            self.outbox.ack(superseded)
+        for start in range(0, len(uploads), self.batch_size):
+            chunk = uploads[start:start + self.batch_size]
+            self.remote.apply([
+                (change.collection, change.doc_id, fields, {name: change.times[name] for name in fields})
+                for change, fields in chunk
+            ])
+            self.outbox.ack([row_id for change, _ in chunk for row_id in change.ids])
+        return len(uploads)
+
+    def sync(self, owner: str) -> Dict[str, Any]:
+        """Pull, then push. Errors are recorded, not raised; the outbox keeps what did not upload."""
+        report = {"owner": owner, "downloaded": 0, "uploaded": 0, "error": None}
+        try:
+            report["downloaded"] = self.pull(owner)
+            report["uploaded"] = self.push(owner)
+            self.last_sync = datetime.now().isoformat()
+            self.last_error = None
+        except Exception as e:
+            logger.exception("Sync failed for %s", owner)
+            report["error"] = self.last_error = str(e)
+        return {**report, **self.status()}
+
+    def status(self) -> Dict[str, Any]:
+        pending = self.outbox.counts()
+        return {
+            "pending_changes": sum(pending.values()),
+            "pending_by_collection": pending,
+            "last_sync_timestamp": self.last_sync,
+            "last_error": self.last_error,
+        }
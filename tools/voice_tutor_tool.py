@@ -1,39 +1,163 @@
+import asyncio
 import os
-import uuid
+import re
+from typing import AsyncIterator, List
 from google.cloud import texttospeech
+from tools.utils.audio_store import AudioStore
+from tools.utils.logger import get_logger
+from tools.utils.retry_handler import RetryPolicy, call_with_retry
+from tools.utils.metrics import traced_tool
 
+logger = get_logger(__name__)
+
+TTS_UPSTREAM = "google_tts"
+TTS_RETRY = RetryPolicy(retries=3, delay=0.5, max_delay=10.0)
+
+_SSML_TOKEN_RE = re.compile(r"(<[^>]+>)")
+_SSML_TAG_NAME_RE = re.compile(r"</?\s*([\w:-]+)")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?।])\s+")
+
+
+def _strip_tags(ssml: str) -> str:
+    return re.sub(r"<[^>]+>", "", ssml)
+
+
+def split_ssml(ssml: str) -> List[str]:
+    """
+    Split an SSML document into standalone <speak> chunks at sentence ends and
+    <break/> tags. Elements open across a split (e.g. <prosody>) are closed at the
+    end of one chunk and reopened at the start of the next.
+    """
+    body = ssml.strip()
+    match = re.fullmatch(r"<speak[^>]*>(.*)</speak>", body, re.S)
+    if match:
+        body = match.group(1)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    open_tags: List[tuple] = []
+
+    def flush():
+        text = "".join(current).strip()
+        closing = "".join(f"</{name}>" for name, _ in reversed(open_tags))
+        if _strip_tags(text).strip() or "<break" in text:
+            chunks.append(f"<speak>{text}{closing}</speak>")
+        current.clear()
+        current.extend(tag for _, tag in open_tags)
+
+    for token in _SSML_TOKEN_RE.split(body):
+        if not token:
+            continue
+        if token.startswith("<"):
+            name_match = _SSML_TAG_NAME_RE.match(token)
+            name = name_match.group(1) if name_match else ""
+            current.append(token)
+            if token.startswith("</"):
+                for index in range(len(open_tags) - 1, -1, -1):
+                    if open_tags[index][0] == name:
+                        del open_tags[index]
+                        break
+            elif token.endswith("/>"):
+                if name == "break":
+                    flush()
+            else:
+                open_tags.append((name, token))
+            continue
+        # A sentence that ended just before a tag (e.g. "Two.</prosody> Three.")
+        if token[:1].isspace() and re.search(r"[.!?।]$", _strip_tags("".join(current)).rstrip()):
+            flush()
+        sentences = _SENTENCE_END_RE.split(token)
+        for index, sentence in enumerate(sentences):
+            if index < len(sentences) - 1:
+                current.append(sentence)
+                flush()
+            else:
+                current.append(sentence)
+    flush()
+    return chunks
+
+
+@traced_tool
 class VoiceTutorTool:
-    def __init__(self):
+    def __init__(self, audio_output_dir: str = "generated_audio", max_cache_bytes: int = 512 * 1024 * 1024):
         self.client = texttospeech.TextToSpeechClient()
-        self.audio_output_dir = "generated_audio"
+        self.audio_output_dir = audio_output_dir
         os.makedirs(self.audio_output_dir, exist_ok=True)
+        # Content-addressed cache: identical SSML + voice + audio config reuse one file
+        self.audio_store = AudioStore(self.audio_output_dir, max_bytes=max_cache_bytes)
+
+    def run(self, inputs: dict) -> dict:
+        """Tool-contract entry point; expects 'text' (or 'prompt') and optional 'dialect'."""
+        text = inputs.get("text") or inputs.get("prompt", "")
+        return self.generate_voice_tutor(text, inputs.get("dialect", "default"))
 
     def generate_voice_tutor(self, text: str, dialect: str = "default") -> dict:
         # Build SSML with dialect-specific prosody or voice selection here
         ssml = self._build_ssml(text, dialect)
+        file_path, cached = self._synthesize(ssml, dialect)
+
+        return {
+            "ssml": ssml,
+            "audio_file": file_path,
+            "dialect": dialect,
+            "cached": cached
+        }
 
-        synthesis_input = texttospeech.SynthesisInput(ssml=ssml)
+    def synthesize_ssml(self, ssml: str, dialect: str = "default") -> bytes:
+        """Synthesize one SSML document to MP3 bytes, going through the audio store."""
+        file_path, _ = self._synthesize(ssml, dialect)
+        try:
+            with open(file_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted by another request's put() between lookup and open; the store
+            # now misses on this key, so the second pass synthesizes it again
+            logger.info("Cached audio %s was evicted before it was read; synthesizing again", file_path)
+            file_path, _ = self._synthesize(ssml, dialect)
+            with open(file_path, "rb") as f:
+                return f.read()
 
+    def _synthesize(self, ssml: str, dialect: str):
+        """Return (audio file path, cached) for the SSML, calling TTS only on a store miss."""
         voice_params = self._get_voice_params(dialect)
         audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
 
-        response = self.client.synthesize_speech(
-            input=synthesis_input,
-            voice=voice_params,
-            audio_config=audio_config
-        )
+        key = self.audio_store.key_for(ssml, voice_params, audio_config)
+        with self.audio_store.lock_for(key):
+            file_path = self.audio_store.get(key)
+            if file_path is not None:
+                return file_path, True
+            response = call_with_retry(
+                self.client.synthesize_speech,
+                input=texttospeech.SynthesisInput(ssml=ssml),
+                voice=voice_params,
+                audio_config=audio_config,
+                policy=TTS_RETRY,
+                upstream=TTS_UPSTREAM,
+            )
+            return self.audio_store.put(key, response.audio_content), False
 
-        file_name = f"{uuid.uuid4()}.mp3"
-        file_path = os.path.join(self.audio_output_dir, file_name)
+    async def astream_voice_tutor(self, text: str, dialect: str = "default",
+                                  max_concurrency: int = 4) -> AsyncIterator[bytes]:
+        """
+        Yield MP3 audio sentence by sentence, in order. Chunks are synthesized
+        concurrently (at most `max_concurrency` at a time) so the first chunk is
+        available after one sentence's worth of TTS latency.
+        """
+        chunks = split_ssml(self._build_ssml(text, dialect))
+        semaphore = asyncio.Semaphore(max_concurrency)
 
-        with open(file_path, "wb") as out:
-            out.write(response.audio_content)
+        async def synthesize(chunk: str) -> bytes:
+            async with semaphore:
+                return await asyncio.to_thread(self.synthesize_ssml, chunk, dialect)
 
-        return {
-            "ssml": ssml,
-            "audio_file": file_path,
-            "dialect": dialect
-        }
+        tasks = [asyncio.ensure_future(synthesize(chunk)) for chunk in chunks]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
 
     def _build_ssml(self, text: str, dialect: str) -> str:
         # Customize SSML here based on dialect